@@ -1,6 +1,4 @@
-from src.orchestador import EcommerceDataPipeline
+from src.cli import main
 
 if __name__ == "__main__":
-    config_path = "config/pipeline_config.yaml"
-    pipeline = EcommerceDataPipeline(config_path)
-    pipeline.run_pipeline()
+    raise SystemExit(main())
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Códigos HTTP que se consideran transitorios y se reintentan
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ProductCatalogClient:
+    """
+    Cliente HTTP para el catálogo de productos del API.
+
+    Reutiliza una sesión con pool de conexiones, aplica el timeout configurado,
+    reintenta errores transitorios con backoff exponencial con jitter y usa
+    peticiones condicionales (ETag / If-Modified-Since) con caché en disco.
+    """
+
+    def __init__(self, url, timeout=30, retries=3, backoff_factor=0.5, cache_dir=None, pool_size=10):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.cache_dir = cache_dir
+        self.pool_size = pool_size
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        """Cierra la sesión y libera las conexiones del pool."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Peticiones con reintentos
+    # ------------------------------------------------------------------
+    def _sleep_before_retry(self, attempt, response=None):
+        """Espera antes de reintentar: Retry-After si el servidor lo indica, si no backoff con jitter."""
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = int(retry_after)
+        else:
+            delay = self.backoff_factor * (2 ** attempt) * random.uniform(0.5, 1.5)
+        time.sleep(delay)
+
+    def _get(self, url, headers=None, params=None):
+        """GET con timeout y reintentos ante errores de conexión, timeouts y códigos transitorios."""
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(url, headers=headers, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                self._sleep_before_retry(attempt)
+                continue
+
+            if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                self._sleep_before_retry(attempt, response)
+                continue
+
+            response.raise_for_status()
+            return response
+
+    # ------------------------------------------------------------------
+    # Caché en disco para peticiones condicionales
+    # ------------------------------------------------------------------
+    def _cache_paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json"), os.path.join(self.cache_dir, f"{key}.body")
+
+    def _load_cache(self, url):
+        if not self.cache_dir:
+            return None, None
+        meta_path, body_path = self._cache_paths(url)
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None, None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            return meta, f.read()
+
+    def _save_cache(self, url, response):
+        if not self.cache_dir:
+            return
+        meta = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        if not (meta["etag"] or meta["last_modified"]):
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta_path, body_path = self._cache_paths(url)
+        with open(body_path, "wb") as f:
+            f.write(response.content)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def fetch_catalog(self):
+        """
+        Descarga el catálogo completo usando una petición condicional.
+
+        Returns:
+            tuple: (contenido en bytes, True si el servidor respondió 304 y se usó la caché)
+        """
+        meta, cached_body = self._load_cache(self.url)
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = self._get(self.url, headers=headers)
+        if response.status_code == 304 and cached_body is not None:
+            return cached_body, True
+
+        self._save_cache(self.url, response)
+        return response.content, False
+
+    def fetch_products(self, product_ids, max_workers=None):
+        """
+        Descarga productos concretos por id ({url}/{id}) en paralelo sobre el pool de conexiones.
+
+        Returns:
+            list: Productos en el mismo orden que product_ids
+        """
+        workers = max_workers or self.pool_size
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            responses = executor.map(lambda pid: self._get(f"{self.url}/{pid}"), product_ids)
+            return [r.json() for r in responses]
@@ -0,0 +1,202 @@
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Tamaños por defecto (filas de ventas) y tolerancia antes de marcar una regresión
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+DEFAULT_TOLERANCE = 0.25
+STAGES = ["ingesta", "transformacion", "calidad", "reporte"]
+
+
+@contextmanager
+def _serve_catalog(products_path):
+    """Sirve products.json por HTTP local para medir la ingesta con el cliente real del API."""
+    with open(products_path, "rb") as f:
+        body = f.read()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/products"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def benchmark_size(n_sales, n_products=None, seed=42, trace_memory=False, workdir=None):
+    """
+    Genera n_sales ventas sintéticas y mide ingesta, transformación, calidad y reporte.
+
+    Se ejecuta en un proceso propio (ver run_benchmarks) para que el pico de RSS del
+    proceso (process_rss_peak_mb) corresponda solo a este tamaño.
+
+    Returns:
+        dict: {etapa: {'wall_s', 'cpu_s', 'process_cpu_s', 'rss_peak_mb', 'process_rss_peak_mb',
+        'tracemalloc_peak_mb', 'rows_in', 'rows_out'}}
+    """
+    from src.ingestion import ingest_data
+    from src.instrumentation import StageMetrics
+    from src.quality_checks import run_quality_checks
+    from src.reporting import generate_report
+    from src.synthetic import generate_dataset, write_dataset
+    from src.tansformation import transform_data
+
+    n_products = n_products or max(100, min(n_sales // 100, 50_000))
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        paths = write_dataset(os.path.join(tmp, "raw"), *generate_dataset(n_sales, n_products, seed=seed))
+        output_path = os.path.join(tmp, "processed")
+
+        with StageMetrics(metrics_file=None, trace_memory=trace_memory) as metrics, \
+                _serve_catalog(paths["products"]) as url:
+            with metrics.stage("ingesta") as stage:
+                df_api, df_sales, df_inventory = ingest_data(
+                    url, paths["sales"], paths["inventory"], output_path, chunk_size=100_000, parallel=True
+                )
+                stage["rows_out"] = len(df_sales)
+            with metrics.stage("transformacion", rows_in=len(df_sales)) as stage:
+                results = transform_data(df_api, df_sales, df_inventory)
+                stage["rows_out"] = len(results["merged"])
+            with metrics.stage("calidad", rows_in=len(results["merged"])):
+                _, tests = run_quality_checks(results["merged"], sales=df_sales, catalogue=df_api,
+                                              inventory=df_inventory)
+            with metrics.stage("reporte", rows_in=len(results["merged"])):
+                generate_report(results, tests, os.path.join(tmp, "reports"))
+
+    keys = ("wall_s", "cpu_s", "process_cpu_s", "rss_peak_mb", "process_rss_peak_mb", "tracemalloc_peak_mb",
+            "rows_in", "rows_out")
+    return {r["stage"]: {k: r.get(k) for k in keys} for r in metrics.records if r["parent"] is None}
+
+
+def run_benchmarks(sizes=None, seed=42, trace_memory=False, workdir=None):
+    """
+    Ejecuta benchmark_size para cada tamaño, cada uno en un proceso nuevo.
+
+    Returns:
+        dict: {tamaño (str): resultados por etapa}
+    """
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for size in sizes or DEFAULT_SIZES:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results[str(size)] = executor.submit(
+                benchmark_size, size, None, seed, trace_memory, workdir
+            ).result()
+        print(f"✓ Benchmark {size:,} ventas: " + ", ".join(
+            f"{stage}={m['wall_s']:.3f}s" for stage, m in results[str(size)].items()
+        ))
+    return results
+
+
+def _upgrade_baseline_record(base):
+    """
+    Registro de línea base con las claves actuales.
+
+    Las líneas base anteriores a process_rss_peak_mb guardaban ru_maxrss (el pico del
+    proceso) como rss_peak_mb, que ahora es la RSS muestreada durante la etapa: ese valor
+    pasa a process_rss_peak_mb y rss_peak_mb queda sin referencia.
+    """
+    if "process_rss_peak_mb" in base or "rss_peak_mb" not in base:
+        return base
+    return {**base, "process_rss_peak_mb": base["rss_peak_mb"], "rss_peak_mb": None}
+
+
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE, metrics=("wall_s", "process_rss_peak_mb")):
+    """
+    Compara resultados con la línea base y devuelve las regresiones.
+
+    Una métrica es regresión si supera a la de la línea base en más de tolerance
+    (proporción). Los tamaños o etapas sin línea base se ignoran. Las líneas base
+    antiguas se leen con las claves actuales (ver _upgrade_baseline_record).
+
+    Returns:
+        list: dicts con size, stage, metric, baseline, current y ratio
+    """
+    regressions = []
+    for size, stages in results.items():
+        for stage, values in stages.items():
+            base = baseline.get(size, {}).get(stage)
+            if not base:
+                continue
+            base = _upgrade_baseline_record(base)
+            for metric in metrics:
+                current, reference = values.get(metric), base.get(metric)
+                if current is None or not reference:
+                    continue
+                ratio = current / reference
+                if ratio > 1 + tolerance:
+                    regressions.append({"size": size, "stage": stage, "metric": metric,
+                                        "baseline": reference, "current": current, "ratio": round(ratio, 3)})
+    return regressions
+
+
+def load_baseline(path=DEFAULT_BASELINE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=DEFAULT_BASELINE):
+    """Guarda los resultados como nueva línea base (conservando tamaños no medidos ahora)."""
+    baseline = load_baseline(path)
+    baseline.update(results)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline con datos sintéticos")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Filas de ventas por ejecución")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Archivo JSON con la línea base")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Aumento relativo permitido antes de marcar regresión (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Guarda los resultados como línea base")
+    parser.add_argument("--trace-memory", action="store_true", help="Registra también el pico de tracemalloc")
+    parser.add_argument("--output", help="Archivo JSON donde guardar los resultados de esta ejecución")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.seed, args.trace_memory)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"✓ Línea base actualizada: {args.baseline}")
+        return 0
+
+    regressions = compare_to_baseline(results, load_baseline(args.baseline), args.tolerance)
+    if not regressions:
+        print(" Sin regresiones respecto a la línea base.")
+        return 0
+    print(f" {len(regressions)} regresión(es) respecto a la línea base:")
+    for r in regressions:
+        print(f"    {r['size']} ventas / {r['stage']} / {r['metric']}: "
+              f"{r['baseline']} -> {r['current']} (x{r['ratio']})")
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+import argparse
+import glob
+import os
+import sys
+
+# Solo biblioteca estándar al importar: cada subcomando importa lo que necesita, de modo
+# que validate-config o report arrancan sin cargar pandas, requests ni pyarrow.
+
+DEFAULT_CONFIG = "config/pipeline_config.yaml"
+COMMANDS = ("run", "serve", "validate-config", "ingest", "report", "bench")
+REPORT_PATTERNS = {
+    "pipeline": "pipeline_report_*.txt",
+    "html": "pipeline_report_*.html",
+    "stock": "stock_report_*.txt",
+}
+
+
+def _pipeline(args):
+    from src.orchestador import EcommerceDataPipeline
+
+    return EcommerceDataPipeline(args.config)
+
+
+def cmd_run(args):
+    pipeline = _pipeline(args)
+    if args.inventory_only:
+        pipeline.run_inventory_check()
+    elif args.batch:
+        pipeline.run_batch()
+    else:
+        pipeline.run_pipeline(resume=args.resume)
+    return 0
+
+
+def cmd_serve(args):
+    from src.service import run_service
+
+    run_service(args.config, args.host, args.port)
+    return 0
+
+
+def cmd_validate_config(args):
+    from src.config import load_config, validate_config
+
+    errors, warnings = validate_config(load_config(args.config))
+    for message in warnings:
+        print(f"  Aviso:{message}")
+    for message in errors:
+        print(f"  Error:{message}")
+    if errors:
+        print(f" {args.config}: {len(errors)} errores")
+        return 1
+    print(f"✓ {args.config}: configuración válida")
+    return 0
+
+
+def cmd_ingest(args):
+    _pipeline(args).run_ingestion()
+    return 0
+
+
+def latest_report(reports_path, kind="pipeline"):
+    """Ruta del reporte más reciente de un tipo (el timestamp del nombre ordena), o None."""
+    files = sorted(glob.glob(os.path.join(reports_path, REPORT_PATTERNS[kind])))
+    return files[-1] if files else None
+
+
+def cmd_report(args):
+    from src.config import load_config
+
+    reports_path = (load_config(args.config).get("output") or {}).get("reports_path", "reports")
+    path = latest_report(reports_path, args.kind)
+    if path is None:
+        print(f" No hay reportes de tipo {args.kind} en {reports_path}")
+        return 1
+    if args.show:
+        with open(path, "r", encoding="utf-8") as f:
+            sys.stdout.write(f.read())
+    else:
+        print(path)
+    return 0
+
+
+def cmd_bench(args):
+    from src.benchmark import main as benchmark_main
+
+    benchmark_main(args.bench_args)
+    return 0
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--config", default=DEFAULT_CONFIG, help="Archivo YAML de configuración")
+
+    parser = argparse.ArgumentParser(
+        prog="run_pipeline.py",
+        description="Pipeline de e-commerce (sin subcomando se ejecuta 'run')"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", parents=[common], help="Ejecuta el pipeline")
+    mode = run.add_mutually_exclusive_group()
+    mode.add_argument("--resume", action="store_true",
+                      help="Reanuda la última ejecución fallida desde los checkpoints de las etapas completadas")
+    mode.add_argument("--batch", action="store_true",
+                      help="Procesa en paralelo las tiendas de batch.shards y genera un reporte global")
+    mode.add_argument("--inventory-only", action="store_true",
+                      help="Solo detecta stock crítico a partir del inventario (sin ventas ni API)")
+    run.set_defaults(handler=cmd_run)
+
+    serve = commands.add_parser("serve", parents=[common], help="Modo servicio con una API HTTP local")
+    serve.add_argument("--host", help="Por defecto service.host")
+    serve.add_argument("--port", type=int, help="Por defecto service.port")
+    serve.set_defaults(handler=cmd_serve)
+
+    validate = commands.add_parser("validate-config", parents=[common],
+                                   help="Revisa la configuración sin ejecutar el pipeline")
+    validate.set_defaults(handler=cmd_validate_config)
+
+    ingest = commands.add_parser("ingest", parents=[common], help="Solo ingesta: catálogo, ventas e inventario a Parquet")
+    ingest.set_defaults(handler=cmd_ingest)
+
+    report = commands.add_parser("report", parents=[common], help="Muestra la ruta del último reporte")
+    report.add_argument("--kind", choices=list(REPORT_PATTERNS), default="pipeline")
+    report.add_argument("--show", action="store_true", help="Imprime el contenido en lugar de la ruta")
+    report.set_defaults(handler=cmd_report)
+
+    # Sin --help propio: todos sus argumentos (incluido --help) se pasan a src.benchmark
+    bench = commands.add_parser("bench", add_help=False,
+                                help="Benchmark con datos sintéticos (argumentos de python -m src.benchmark)")
+    bench.set_defaults(handler=cmd_bench)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Compatibilidad: "run_pipeline.py --resume" equivale a "run_pipeline.py run --resume"
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ("-h", "--help")):
+        argv = ["run"] + argv
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command == "bench":
+        args.bench_args = extra
+    elif extra:
+        parser.error(f"argumentos no reconocidos: {' '.join(extra)}")
+    return args.handler(args)
@@ -0,0 +1,101 @@
+import os
+
+import yaml
+
+# Valores admitidos por la configuración. Se repiten aquí (en lugar de importarlos de
+# engines, exports y quality_checks) para validar sin cargar pandas ni pyarrow; un test
+# comprueba que coinciden con los de esos módulos.
+ENGINES = ("pandas", "polars", "duckdb")
+PLANS = ("rowlevel", "preaggregated")
+EXPORT_FORMATS = ("csv", "csv.gz", "csv.zst", "parquet")
+RULE_TYPES = ("not_null", "range", "dtype", "unique", "date", "foreign_key")
+
+# Cargador en C de libyaml si está disponible (mismo resultado que safe_load, ~10x más rápido)
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+REQUIRED_KEYS = [
+    ("api", "url"),
+    ("data_sources", "sales_file"),
+    ("data_sources", "inventory_file"),
+    ("processing", "output_path"),
+]
+
+
+def load_config(config_path):
+    """Carga el archivo YAML con las rutas y parámetros."""
+    with open(config_path, 'r', encoding='utf-8') as file:
+        return yaml.load(file, Loader=SafeLoader)
+
+
+def _get(config, *keys):
+    value = config
+    for key in keys:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _positive(value, allow_none=True):
+    if value is None:
+        return allow_none
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
+
+def validate_config(config):
+    """
+    Revisa una configuración ya cargada sin ejecutar el pipeline.
+
+    Returns:
+        tuple: (errores, avisos), listas de mensajes. Los errores impiden ejecutar el
+        pipeline; los avisos señalan, p. ej., archivos de entrada que aún no existen.
+    """
+    if not isinstance(config, dict):
+        return [" El archivo de configuración está vacío o no es un mapeo YAML"], []
+    errors, warnings = [], []
+
+    for keys in REQUIRED_KEYS:
+        if not _get(config, *keys):
+            errors.append(f" Falta la clave {'.'.join(keys)}")
+    for keys in (("data_sources", "sales_file"), ("data_sources", "inventory_file")):
+        path = _get(config, *keys)
+        if path and not os.path.exists(path):
+            warnings.append(f" {'.'.join(keys)}: no existe {path}")
+
+    proc_cfg = config.get("processing") or {}
+    if proc_cfg.get("engine", "pandas") not in ENGINES:
+        errors.append(f" processing.engine desconocido: {proc_cfg['engine']}. Opciones: {list(ENGINES)}")
+    if proc_cfg.get("plan", "rowlevel") not in PLANS:
+        errors.append(f" processing.plan desconocido: {proc_cfg['plan']}. Opciones: {list(PLANS)}")
+    for keys in (("api", "timeout"), ("processing", "chunk_size"), ("dag", "max_workers"),
+                 ("batch", "workers"), ("cache", "max_size_mb"), ("output", "export_workers")):
+        if not _positive(_get(config, *keys)):
+            errors.append(f" {'.'.join(keys)} debe ser un número positivo (o null)")
+    threshold = proc_cfg.get("critical_stock_threshold", 1.0)
+    if not isinstance(threshold, (int, float)) or threshold < 0:
+        errors.append(" processing.critical_stock_threshold debe ser un número >= 0")
+
+    windows = _get(config, "timeseries", "windows") or []
+    if not all(isinstance(w, int) and not isinstance(w, bool) and w > 0 for w in windows):
+        errors.append(" timeseries.windows debe ser una lista de enteros positivos (días)")
+
+    for name, export_cfg in (_get(config, "output", "exports") or {}).items():
+        fmt = (export_cfg or {}).get("format", "csv")
+        if fmt not in EXPORT_FORMATS:
+            errors.append(f" output.exports.{name}: formato desconocido {fmt}. Opciones: {list(EXPORT_FORMATS)}")
+
+    for i, rule in enumerate(_get(config, "quality_checks", "rules") or []):
+        if rule.get("type") not in RULE_TYPES:
+            errors.append(f" quality_checks.rules[{i}]: tipo desconocido {rule.get('type')}. "
+                          f"Opciones: {list(RULE_TYPES)}")
+
+    names = []
+    for i, shard in enumerate(_get(config, "batch", "shards") or []):
+        for key in ("name", "sales_file", "inventory_file"):
+            if not shard.get(key):
+                errors.append(f" batch.shards[{i}]: falta {key}")
+        names.append(shard.get("name"))
+    if len(set(names)) != len(names):
+        errors.append(f" batch.shards: los nombres deben ser únicos: {names}")
+
+    return errors, warnings
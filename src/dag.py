@@ -0,0 +1,151 @@
+import json
+import shutil
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+
+from src.stage_cache import StageCache, stage_key
+
+
+class Stage:
+    """
+    Nodo del grafo de ejecución.
+
+    fn recibe (inputs, record): inputs es {dependencia: salida} y record el registro de
+    métricas de la etapa (un dict vacío si no hay instrumentación). Debe devolver un dict
+    de DataFrames y valores serializables en JSON, para poder guardarse como checkpoint.
+
+    config es la configuración que determina la salida de la etapa y fingerprint, si se
+    indica, una función sin argumentos que describe sus entradas externas (p. ej. la
+    huella del CSV que lee). Ambos forman parte de la clave de su checkpoint, junto con
+    las claves de sus dependencias.
+    """
+
+    def __init__(self, name, fn, deps=(), config=None, fingerprint=None):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.config = config
+        self.fingerprint = fingerprint
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, deps={list(self.deps)})"
+
+
+def topological_order(stages):
+    """Ordena las etapas respetando sus dependencias; ValueError si hay dependencias desconocidas o ciclos."""
+    by_name = {stage.name: stage for stage in stages}
+    if len(by_name) != len(stages):
+        raise ValueError(f" Etapas duplicadas en el grafo: {[s.name for s in stages]}")
+    for stage in stages:
+        unknown = [d for d in stage.deps if d not in by_name]
+        if unknown:
+            raise ValueError(f" La etapa {stage.name} depende de etapas desconocidas: {unknown}")
+
+    order, visiting, visited = [], set(), set()
+
+    def visit(stage):
+        if stage.name in visited:
+            return
+        if stage.name in visiting:
+            raise ValueError(f" Ciclo en el grafo de etapas en: {stage.name}")
+        visiting.add(stage.name)
+        for dep in stage.deps:
+            visit(by_name[dep])
+        visiting.discard(stage.name)
+        visited.add(stage.name)
+        order.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return order
+
+
+class Checkpoints:
+    """
+    Salidas de las etapas de una ejecución guardadas en disco para poder reanudarla.
+
+    La clave de cada checkpoint incluye la configuración de la etapa, la huella de sus
+    entradas externas y las claves de sus dependencias: si cambia un CSV de entrada o se
+    corrige la configuración de una etapa, esa etapa y todas las que dependen de ella se
+    vuelven a ejecutar en lugar de restaurar salidas obsoletas.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.store = StageCache(path, max_size_mb=None)
+
+    def keys(self, stages):
+        """Claves de los checkpoints de stages (en orden topológico) para esta ejecución."""
+        keys = {}
+        for stage in stages:
+            inputs = [keys[dep] for dep in stage.deps]
+            if stage.fingerprint is not None:
+                inputs.append(json.dumps(stage.fingerprint(), sort_keys=True, default=str))
+            keys[stage.name] = stage_key(stage.name, inputs, config=stage.config)
+        return keys
+
+    def exists(self, key):
+        return self.store.has(key)
+
+    def load(self, key):
+        return self.store.get(key)
+
+    def save(self, key, output):
+        self.store.put(key, output)
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.store = StageCache(self.path, max_size_mb=None)
+
+
+def _run_stage(stage, inputs, metrics, checkpoints, key):
+    with (metrics.stage(stage.name) if metrics is not None else nullcontext({})) as record:
+        output = stage.fn(inputs, record)
+        if checkpoints is not None:
+            checkpoints.save(key, output)
+    return output
+
+
+def run_dag(stages, max_workers=None, checkpoints=None, resume=False, metrics=None, keep=()):
+    """
+    Ejecuta un grafo de etapas en un pool de hilos, lanzando cada etapa en cuanto
+    terminan sus dependencias.
+
+    Si se indican checkpoints, la salida de cada etapa se guarda al terminar. Con
+    resume=True, las etapas con checkpoint cuyas dependencias también lo tienen no se
+    vuelven a ejecutar; solo se cargan las salidas que necesitan las etapas pendientes
+    y las indicadas en keep.
+
+    Si una etapa falla, no se lanzan etapas nuevas, se espera a las que están en curso
+    (que guardan su checkpoint) y se re-lanza la excepción.
+
+    Returns:
+        dict: {etapa: salida} de las etapas ejecutadas y de las restauradas que se cargaron
+    """
+    order = topological_order(stages)
+    keys = checkpoints.keys(order) if checkpoints is not None else {}
+    restored = set()
+    if checkpoints is not None and resume:
+        for stage in order:
+            if all(dep in restored for dep in stage.deps) and checkpoints.exists(keys[stage.name]):
+                restored.add(stage.name)
+    pending = [stage for stage in order if stage.name not in restored]
+    needed = {dep for stage in pending for dep in stage.deps} | set(keep)
+    outputs = {stage.name: checkpoints.load(keys[stage.name]) for stage in order if stage.name in restored & needed}
+    for stage in order:
+        if stage.name in restored:
+            print(f"✓ Etapa {stage.name} restaurada desde checkpoint")
+
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers or max(len(pending), 1), thread_name_prefix="etapa") as executor:
+        while pending or running:
+            for stage in [s for s in pending if all(dep in outputs for dep in s.deps)]:
+                pending.remove(stage)
+                inputs = {dep: outputs[dep] for dep in stage.deps}
+                running[executor.submit(_run_stage, stage, inputs, metrics, checkpoints,
+                                        keys.get(stage.name))] = stage.name
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                outputs[name] = future.result()
+    return outputs
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+# Proporción máxima de valores distintos para convertir un texto en categórico
+CATEGORICAL_MAX_RATIO = 0.5
+
+# Entero más pequeño al que se reducen las columnas: la aritmética entre enteros nullable
+# conserva el tipo, así que con Int8/Int16 restas como min_stock - current_stock o
+# productos como quantity * unidades desbordarían sin aviso
+MIN_INTEGER_DTYPE = "Int32"
+
+
+def memory_usage_mb(df):
+    """Memoria total (incluyendo el contenido de los strings) de un DataFrame en MB."""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def _optimize_text(series, categorical_max_ratio):
+    """Textos repetidos -> category; el resto -> string respaldado por Arrow."""
+    if pd.api.types.infer_dtype(series, skipna=True) not in ("string", "empty"):
+        return series  # objetos no textuales (p. ej. 'rating' del API) se dejan igual
+    if len(series) and series.nunique(dropna=True) / len(series) <= categorical_max_ratio:
+        return series.astype("category")
+    return series.astype("string[pyarrow]")
+
+
+def _optimize_number(series):
+    """
+    Enteros al tipo nullable más pequeño, sin bajar de MIN_INTEGER_DTYPE; floats enteros
+    con NaN también a enteros nullable.
+
+    Se usan enteros nullable para que los left joins (filas sin pareja) no los
+    conviertan de nuevo en float64 con NaN.
+    """
+    if pd.api.types.is_float_dtype(series) and series.isna().any():
+        values = series.dropna()
+        if np.array_equal(values, np.floor(values)):
+            series = series.astype("Int64")
+    if pd.api.types.is_integer_dtype(series):
+        series = pd.to_numeric(series.astype("Int64"), downcast="integer")
+        if series.dtype.itemsize < pd.api.types.pandas_dtype(MIN_INTEGER_DTYPE).itemsize:
+            series = series.astype(MIN_INTEGER_DTYPE)
+    return series
+
+
+def optimize_dtypes(df, categorical_max_ratio=CATEGORICAL_MAX_RATIO):
+    """
+    Reduce la memoria de un DataFrame sin cambiar sus valores.
+
+    - Textos con pocos valores distintos (category, title, sale_date...) -> category
+    - Resto de textos -> string[pyarrow]
+    - Enteros -> el entero nullable más pequeño que los contiene, como mínimo Int32
+    - Floats que solo son float por tener NaN -> enteros nullable
+
+    Las columnas ya respaldadas por Arrow y los floats con decimales no se modifican.
+
+    Returns:
+        DataFrame optimizado (copia)
+    """
+    optimized = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, (pd.ArrowDtype, pd.CategoricalDtype)):
+            optimized[col] = series
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            optimized[col] = _optimize_text(series, categorical_max_ratio)
+        elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            optimized[col] = _optimize_number(series)
+        else:
+            optimized[col] = series
+    return pd.DataFrame(optimized, index=df.index)
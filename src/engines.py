@@ -0,0 +1,219 @@
+from src.tansformation import prepare_inputs, transform_data
+
+# Columnas del catálogo que se unen a las ventas
+API_COLUMNS = ["product_id", "title", "category", "price"]
+
+
+def _print_summary(engine, resultados):
+    merged = resultados["merged"]
+    print(f"✓ Transformación con motor {engine}: {len(merged)} registros, "
+          f"{len(resultados['top_productos'])} productos, {len(resultados['ventas_categoria'])} categorías, "
+          f"{len(resultados['stock_critico'])} con stock crítico")
+
+
+def transform_polars(df_api, df_sales, df_inventory):
+    """
+    Misma transformación que transform_data ejecutada con Polars en modo lazy.
+
+    Las cuatro salidas se calculan con un único collect_all, de modo que Polars
+    comparte el plan común (joins y métricas) y lo ejecuta en paralelo.
+
+    Returns:
+        dict con 'merged', 'stock_critico', 'top_productos', 'ventas_categoria' (pandas)
+    """
+    import polars as pl
+
+    df_api, df_sales, df_inventory = prepare_inputs(df_api, df_sales, df_inventory)
+
+    key = pl.col("product_id").cast(pl.Int64, strict=False)
+    sales = pl.from_pandas(df_sales).lazy().with_row_index("__row").with_columns(key)
+    inventory = pl.from_pandas(df_inventory).lazy().with_columns(key)
+    api = pl.from_pandas(df_api[API_COLUMNS]).lazy().with_columns(key)
+
+    merged = (
+        sales.join(inventory, on="product_id", how="left")
+        .join(api, on="product_id", how="left")
+        .filter(pl.col("price").is_not_null() & pl.col("quantity").is_not_null())
+        .with_columns((pl.col("quantity") * pl.col("price")).alias("total_sale_value"))
+        .with_columns(
+            (pl.col("total_sale_value") - pl.col("cost") * pl.col("quantity")).alias("rentabilidad"),
+            pl.when(pl.col("category").is_not_null())
+            .then(pl.col("quantity").sum().over("category"))
+            .alias("ventas_totales_categoria"),
+        )
+        .sort("__row")
+    )
+
+    stock_critico = merged.filter(
+        pl.col("current_stock").is_not_null()
+        & pl.col("min_stock").is_not_null()
+        & (pl.col("current_stock") < pl.col("min_stock"))
+    ).unique(subset="product_id", keep="first", maintain_order=True)
+
+    top_productos = (
+        merged.filter(pl.col("title").is_not_null())
+        .group_by(["product_id", "title"])
+        .agg(pl.col("quantity").sum().alias("total_vendido"))
+        .sort(["total_vendido", "product_id"], descending=[True, False])
+    )
+
+    ventas_categoria = (
+        merged.filter(pl.col("category").is_not_null())
+        .group_by("category")
+        .agg(
+            pl.col("quantity").sum().alias("unidades_vendidas"),
+            pl.col("total_sale_value").sum().alias("ventas_totales"),
+            pl.col("rentabilidad").sum().alias("rentabilidad_total"),
+        )
+        .sort(["unidades_vendidas", "category"], descending=[True, False])
+    )
+
+    metricas = [pl.col(c).sum() for c in ("quantity", "total_sale_value", "rentabilidad")]
+    agregados_producto = merged.group_by("product_id", maintain_order=True).agg(
+        pl.col("title").first(), pl.col("category").first(), *metricas
+    )
+    agregados_categoria = (
+        agregados_producto.filter(pl.col("category").is_not_null())
+        .group_by("category", maintain_order=True)
+        .agg(*metricas)
+    )
+
+    frames = pl.collect_all([
+        merged.drop("__row"), stock_critico.drop("__row"), top_productos, ventas_categoria,
+        agregados_producto, agregados_categoria,
+    ])
+    merged_df, stock_df, top_df, categoria_df, producto_df, agr_categoria_df = (f.to_pandas() for f in frames)
+
+    resultados = {
+        "merged": merged_df,
+        "stock_critico": stock_df,
+        "top_productos": top_df,
+        "ventas_categoria": categoria_df,
+        "agregados_producto": producto_df,
+        "agregados_categoria": agr_categoria_df,
+    }
+    _print_summary("polars", resultados)
+    return resultados
+
+
+def transform_duckdb(df_api, df_sales, df_inventory):
+    """
+    Misma transformación que transform_data ejecutada como consultas SQL en DuckDB embebido.
+
+    Los DataFrames se registran sin copia; el frame unido se materializa una sola vez
+    como tabla temporal y las agregaciones se ejecutan sobre ella en paralelo.
+
+    Returns:
+        dict con 'merged', 'stock_critico', 'top_productos', 'ventas_categoria' (pandas)
+    """
+    import duckdb
+
+    df_api, df_sales, df_inventory = prepare_inputs(df_api, df_sales, df_inventory)
+
+    con = duckdb.connect()
+    try:
+        # Índice de fila explícito: el escaneo paralelo de DuckDB no garantiza el orden original
+        con.register("sales", df_sales.assign(__row=range(len(df_sales))))
+        con.register("inventory", df_inventory)
+        con.register("api", df_api[API_COLUMNS])
+
+        con.execute("""
+            CREATE TEMP TABLE merged AS
+            WITH joined AS (
+                SELECT s.*, i.* EXCLUDE (product_id), a.title, a.category, a.price
+                FROM sales s
+                LEFT JOIN inventory i ON s.product_id = i.product_id
+                LEFT JOIN api a ON s.product_id = a.product_id
+                WHERE a.price IS NOT NULL AND s.quantity IS NOT NULL
+            )
+            SELECT *,
+                   quantity * price AS total_sale_value,
+                   quantity * price - cost * quantity AS rentabilidad,
+                   CASE WHEN category IS NOT NULL
+                        THEN sum(quantity) OVER (PARTITION BY category) END AS ventas_totales_categoria
+            FROM joined
+        """)
+
+        merged = con.execute("SELECT * EXCLUDE (__row) FROM merged ORDER BY __row").df()
+
+        stock_critico = con.execute("""
+            SELECT * EXCLUDE (__row, __rank) FROM (
+                SELECT *, row_number() OVER (PARTITION BY product_id ORDER BY __row) AS __rank
+                FROM merged
+                WHERE current_stock IS NOT NULL AND min_stock IS NOT NULL AND current_stock < min_stock
+            )
+            WHERE __rank = 1
+            ORDER BY __row
+        """).df()
+
+        top_productos = con.execute("""
+            SELECT product_id, title, sum(quantity) AS total_vendido
+            FROM merged
+            WHERE title IS NOT NULL
+            GROUP BY product_id, title
+            ORDER BY total_vendido DESC, product_id
+        """).df()
+
+        ventas_categoria = con.execute("""
+            SELECT category,
+                   sum(quantity) AS unidades_vendidas,
+                   sum(total_sale_value) AS ventas_totales,
+                   sum(rentabilidad) AS rentabilidad_total
+            FROM merged
+            WHERE category IS NOT NULL
+            GROUP BY category
+            ORDER BY unidades_vendidas DESC, category
+        """).df()
+
+        con.execute("""
+            CREATE TEMP TABLE agregados_producto AS
+            SELECT product_id,
+                   arg_min(title, __row) AS title,
+                   arg_min(category, __row) AS category,
+                   sum(quantity) AS quantity,
+                   sum(total_sale_value) AS total_sale_value,
+                   sum(rentabilidad) AS rentabilidad,
+                   min(__row) AS __first
+            FROM merged
+            GROUP BY product_id
+        """)
+        agregados_producto = con.execute(
+            "SELECT * EXCLUDE (__first) FROM agregados_producto ORDER BY __first"
+        ).df()
+
+        agregados_categoria = con.execute("""
+            SELECT category, sum(quantity) AS quantity,
+                   sum(total_sale_value) AS total_sale_value, sum(rentabilidad) AS rentabilidad
+            FROM agregados_producto
+            WHERE category IS NOT NULL
+            GROUP BY category
+            ORDER BY min(__first)
+        """).df()
+    finally:
+        con.close()
+
+    resultados = {
+        "merged": merged,
+        "stock_critico": stock_critico,
+        "top_productos": top_productos,
+        "ventas_categoria": ventas_categoria,
+        "agregados_producto": agregados_producto,
+        "agregados_categoria": agregados_categoria,
+    }
+    _print_summary("duckdb", resultados)
+    return resultados
+
+
+# Motores disponibles para la transformación (processing.engine en la configuración)
+TRANSFORM_ENGINES = {
+    "pandas": transform_data,
+    "polars": transform_polars,
+    "duckdb": transform_duckdb,
+}
+
+
+def get_transform(engine="pandas"):
+    """Devuelve la función de transformación del motor indicado."""
+    if engine not in TRANSFORM_ENGINES:
+        raise ValueError(f" Motor de transformación desconocido: {engine}. Opciones: {list(TRANSFORM_ENGINES)}")
+    return TRANSFORM_ENGINES[engine]
@@ -0,0 +1,108 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.instrumentation import inherit, step
+
+# Formatos de exportación y su extensión
+EXPORT_FORMATS = {
+    "csv": ".csv",
+    "csv.gz": ".csv.gz",
+    "csv.zst": ".csv.zst",
+    "parquet": ".parquet",
+}
+
+# Códec de Arrow usado por cada CSV comprimido
+CSV_CODECS = {"csv.gz": "gzip", "csv.zst": "zstd"}
+
+# Configuración por defecto (equivalente al comportamiento original: todo en CSV)
+DEFAULT_EXPORTS = {
+    "stock_critico": {"format": "csv"},
+    "top_productos": {"format": "csv"},
+    "ventas_categoria": {"format": "csv"},
+    "datos_procesados": {"format": "csv"},
+    "velocidad_productos": {"format": "csv"},
+    "ventas_diarias_categoria": {"format": "csv"},
+}
+
+DEFAULT_CHUNK_SIZE = 250_000
+
+
+def export_settings(exports_cfg=None):
+    """Combina la sección output.exports con los valores por defecto y valida los formatos."""
+    settings = {}
+    for name, defaults in DEFAULT_EXPORTS.items():
+        cfg = {"enabled": True, **defaults, **((exports_cfg or {}).get(name) or {})}
+        if cfg["format"] not in EXPORT_FORMATS:
+            raise ValueError(f" Formato de exportación desconocido para {name}: {cfg['format']}. "
+                             f"Opciones: {list(EXPORT_FORMATS)}")
+        settings[name] = cfg
+    return settings
+
+
+def export_path(output_path, name, timestamp, fmt):
+    return f"{output_path}/{name}_{timestamp}{EXPORT_FORMATS[fmt]}"
+
+
+def _write_csv(df, path, fmt, chunk_size):
+    """CSV en UTF-8 con BOM (para Excel), escrito por bloques y comprimido en streaming si se pide."""
+    codec = CSV_CODECS.get(fmt)
+    raw = pa.CompressedOutputStream(path, codec) if codec else open(path, "wb")
+    with io.TextIOWrapper(raw, encoding="utf-8-sig", newline="") as handle:
+        # pandas formatea y vuelca chunksize filas cada vez, sin construir todo el texto en memoria
+        df.to_csv(handle, index=False, chunksize=chunk_size)
+
+
+def _write_parquet(df, path, chunk_size):
+    """
+    Parquet comprimido con zstd, con un row group cada chunk_size filas.
+
+    Cada bloque se convierte a Arrow y se escribe por separado con un único ParquetWriter,
+    de modo que nunca hay en memoria una copia Arrow del DataFrame completo. El esquema se
+    infiere del DataFrame entero para que todos los bloques lo compartan.
+    """
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for start in range(0, len(df), chunk_size):
+            chunk = df.iloc[start:start + chunk_size]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def export_frame(df, path, fmt="csv", chunk_size=None, name=None):
+    """Escribe un DataFrame en el formato indicado (ver EXPORT_FORMATS)."""
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    with step(f"export_{name or os.path.basename(path)}", rows_in=len(df)):
+        if fmt == "parquet":
+            _write_parquet(df, path, chunk_size)
+        else:
+            _write_csv(df, path, fmt, chunk_size)
+    return path
+
+
+def export_frames(frames, paths, settings, max_workers=None):
+    """
+    Exporta varios DataFrames en paralelo (un hilo por archivo).
+
+    La compresión y la escritura Parquet liberan el GIL, por lo que las
+    exportaciones pequeñas se completan mientras se escribe el dataset completo.
+
+    Args:
+        frames: {nombre: DataFrame}; los nombres deben existir en settings y paths
+        paths: {nombre: ruta de destino}
+        settings: Resultado de export_settings
+
+    Returns:
+        dict: {nombre: ruta escrita}
+    """
+    if not frames:
+        return {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(frames), thread_name_prefix="export") as executor:
+        futures = {
+            name: executor.submit(inherit(export_frame), df, paths[name], settings[name]["format"],
+                                  settings[name].get("chunk_size"), name)
+            for name, df in frames.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
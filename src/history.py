@@ -0,0 +1,145 @@
+import os
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+# Productos del ranking que se guardan por ejecución (suficiente para comparar el top del reporte)
+DEFAULT_TOP_N = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    registros INTEGER,
+    productos INTEGER,
+    categorias INTEGER,
+    unidades REAL,
+    ventas REAL,
+    rentabilidad REAL,
+    stock_critico INTEGER,
+    tests_passed INTEGER
+);
+CREATE TABLE IF NOT EXISTS category_metrics (
+    run_id TEXT,
+    category TEXT,
+    unidades REAL,
+    ventas REAL,
+    rentabilidad REAL,
+    PRIMARY KEY (run_id, category)
+);
+CREATE TABLE IF NOT EXISTS top_products (
+    run_id TEXT,
+    rank INTEGER,
+    product_id INTEGER,
+    title TEXT,
+    total_vendido REAL,
+    PRIMARY KEY (run_id, rank)
+);
+CREATE TABLE IF NOT EXISTS quality_results (
+    run_id TEXT,
+    test TEXT,
+    passed INTEGER,
+    failed_rows INTEGER,
+    PRIMARY KEY (run_id, test)
+);
+"""
+
+
+def _connect(db_path):
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _rows(df, columns):
+    """Filas de df como tuplas de tipos nativos de Python (sqlite3 no acepta escalares de numpy)."""
+    values = df[columns].astype(object).where(df[columns].notna(), None).to_numpy().tolist()
+    return [tuple(v.item() if hasattr(v, "item") else v for v in row) for row in values]
+
+
+def record_run(db_path, run_id, stats, results, tests, top_n=DEFAULT_TOP_N):
+    """
+    Guarda en el historial los agregados de una ejecución y sus resultados de calidad.
+
+    Solo se guardan agregados (totales, categorías, top N productos), nunca las ventas,
+    de modo que el historial crece poco aunque el volumen de datos sea grande.
+    """
+    ventas_categoria = results.get("ventas_categoria", pd.DataFrame())
+    top = results["top_productos"].head(top_n).reset_index(drop=True)
+    cantidad_col = "total_vendido" if "total_vendido" in top.columns else "quantity"
+    top = top.assign(rank=range(1, len(top) + 1), total_vendido=top[cantidad_col])
+
+    with closing(_connect(db_path)) as conn, conn:
+        for table in ("runs", "category_metrics", "top_products", "quality_results"):
+            conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+        conn.execute(
+            "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (run_id, int(stats["registros"]), int(stats["productos"]), int(stats["categorias"]),
+             float(stats.get("quantity", 0)), float(stats.get("total_sale_value", 0)),
+             float(stats.get("rentabilidad", 0)), len(results["stock_critico"]),
+             int(all(t["passed"] for t in tests.values()))),
+        )
+        if not ventas_categoria.empty:
+            conn.executemany(
+                "INSERT INTO category_metrics VALUES (?, ?, ?, ?, ?)",
+                [(run_id, *row) for row in _rows(
+                    ventas_categoria, ["category", "unidades_vendidas", "ventas_totales", "rentabilidad_total"]
+                )],
+            )
+        conn.executemany(
+            "INSERT INTO top_products VALUES (?, ?, ?, ?, ?)",
+            [(run_id, *row) for row in _rows(top, ["rank", "product_id", "title", "total_vendido"])],
+        )
+        conn.executemany(
+            "INSERT INTO quality_results VALUES (?, ?, ?, ?)",
+            [(run_id, name, int(t["passed"]), int(t.get("failed_rows", 0))) for name, t in tests.items()],
+        )
+
+
+def previous_run_id(db_path, run_id):
+    """Ejecución inmediatamente anterior a run_id en el historial (None si no hay)."""
+    if not os.path.exists(db_path):
+        return None
+    with closing(_connect(db_path)) as conn:
+        row = conn.execute("SELECT max(run_id) FROM runs WHERE run_id < ?", (run_id,)).fetchone()
+    return row[0]
+
+
+def category_deltas(db_path, run_id, previous_id):
+    """
+    Cambios por categoría entre dos ejecuciones, a partir de los agregados guardados.
+
+    Returns:
+        DataFrame con category, unidades, ventas, sus valores anteriores y delta_unidades / delta_ventas
+    """
+    query = "SELECT category, unidades, ventas FROM category_metrics WHERE run_id = ?"
+    with closing(_connect(db_path)) as conn:
+        actual = pd.read_sql_query(query, conn, params=(run_id,))
+        anterior = pd.read_sql_query(query, conn, params=(previous_id,))
+    df = actual.merge(anterior, on="category", how="outer", suffixes=("", "_anterior")).fillna(0)
+    df["delta_unidades"] = df["unidades"] - df["unidades_anterior"]
+    df["delta_ventas"] = df["ventas"] - df["ventas_anterior"]
+    return df.sort_values(["delta_ventas", "category"], ascending=[False, True]).reset_index(drop=True)
+
+
+def top_product_deltas(db_path, run_id, previous_id, limit=10):
+    """
+    Posición actual y anterior de los productos del top de la ejecución actual.
+
+    Returns:
+        DataFrame con rank, product_id, title, total_vendido, rank_anterior, delta_vendido
+        (rank_anterior y delta_vendido son nulos para productos que entran al top)
+    """
+    with closing(_connect(db_path)) as conn:
+        return pd.read_sql_query(
+            """
+            SELECT a.rank, a.product_id, a.title, a.total_vendido, b.rank AS rank_anterior,
+                   a.total_vendido - b.total_vendido AS delta_vendido
+            FROM top_products a
+            LEFT JOIN top_products b ON b.run_id = :anterior AND b.product_id = a.product_id
+            WHERE a.run_id = :actual AND a.rank <= :limit
+            ORDER BY a.rank
+            """,
+            conn, params={"actual": run_id, "anterior": previous_id, "limit": limit},
+        )
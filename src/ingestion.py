@@ -1,22 +1,644 @@
+import numpy as np
 import pandas as pd
-import requests
+import pyarrow as pa
+import pyarrow.parquet as pq
+import json
 import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from src.api_client import ProductCatalogClient
+from src.instrumentation import step
+from src.manifest import (
+    appended_offset, fingerprint_bytes, fingerprint_file, has_changed, is_fresh, load_manifest, record_snapshot,
+    save_manifest
+)
+from src.storage import read_files, read_parquet_projected, read_sales, reset_dataset, write_sales_dataset
 
-def ingest_data(api_url, sales_path, inventory_path, output_path):
-    """Descarga datos del API, carga CSV locales y guarda todo en Parquet."""
-    os.makedirs(output_path, exist_ok=True)
+# Tipos explícitos para las columnas conocidas de cada CSV (claves normalizadas), tanto
+# al leer por bloques como de una vez, para que chunk_size no cambie el resultado.
+# Las columnas que no aparecen aquí se infieren (con un tipo común a todos los bloques);
+# las cantidades y el stock quedan así como int64, o float64 si faltan valores, igual que
+# en la versión original (con Int64 los agregados pasarían a Float64).
+SALES_DTYPES = {
+    "product_id": "Int64",
+    "sale_date": "string",
+    "cost": "float64",
+    "price": "float64",
+    "category": "string",
+}
 
-    # --- Datos del API ---
-    response = requests.get(api_url)
-    response.raise_for_status()
-    products = response.json()
-    df_api = pd.DataFrame(products)
-    df_api.to_parquet(f"{output_path}/products.parquet", index=False)
+INVENTORY_DTYPES = {
+    "product_id": "Int64",
+    "category": "string",
+}
 
-    # --- CSV locales ---
-    df_sales = pd.read_csv(sales_path)
-    df_inventory = pd.read_csv(inventory_path)
-    df_sales.to_parquet(f"{output_path}/sales.parquet", index=False)
-    df_inventory.to_parquet(f"{output_path}/inventory.parquet", index=False)
+# Tamaño de bloque usado cuando se convierte en otro proceso sin chunk_size configurado
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Columnas que usa transform_data de cada fuente (proyección al leer Parquet existente)
+TRANSFORM_SALES_COLUMNS = ["product_id", "quantity", "sale_date", "cost"]
+TRANSFORM_INVENTORY_COLUMNS = ["product_id", "current_stock", "min_stock"]
+TRANSFORM_API_COLUMNS = ["id", "product_id", "title", "price", "category"]
+
+
+def _resolve_dtypes(csv_path, dtypes):
+    """Asocia los tipos explícitos a los encabezados reales del CSV (sin importar mayúsculas/espacios)."""
+    header = pd.read_csv(csv_path, nrows=0).columns
+    return {col: dtypes[col.lower().strip()] for col in header if col.lower().strip() in dtypes}
+
+
+# Evento de cancelación de la ingesta en curso en cada hilo (ver IngestionPlan._timed)
+_cancel = threading.local()
+
+
+class IngestionCancelled(RuntimeError):
+    """La ingesta de una fuente se detuvo porque falló otra fuente de la misma ejecución."""
+
+
+def _check_cancelled():
+    """Lanza IngestionCancelled si otra fuente de la ingesta en curso en este hilo falló."""
+    event = getattr(_cancel, "event", None)
+    if event is not None and event.is_set():
+        raise IngestionCancelled(" Ingesta cancelada: falló otra fuente")
+
+
+def _iter_csv(csv_path, dtype, chunk_size, offset=0, usecols=None):
+    """
+    Itera el CSV por bloques (o como un único bloque), desde el byte offset si se indica.
+
+    Antes de entregar cada bloque comprueba si la ingesta se canceló.
+    """
+    if not offset:
+        reader = pd.read_csv(csv_path, dtype=dtype, chunksize=chunk_size, usecols=usecols)
+        yield from _unless_cancelled(reader if chunk_size else [reader])
+        return
+
+    names = list(pd.read_csv(csv_path, nrows=0).columns)
+    with open(csv_path, "rb") as f:
+        f.seek(offset)
+        try:
+            reader = pd.read_csv(f, header=None, names=names, dtype=dtype, chunksize=chunk_size, usecols=usecols)
+            yield from _unless_cancelled(reader if chunk_size else [reader])
+        except pd.errors.EmptyDataError:
+            return
+
+
+def _unless_cancelled(chunks):
+    for chunk in chunks:
+        _check_cancelled()
+        yield chunk
+
+
+def _widen(a, b):
+    """Tipo que admite los valores inferidos en dos bloques: el numérico más amplio o texto."""
+    if a == b:
+        return a
+    if all(isinstance(t, np.dtype) and t.kind in "iuf" for t in (a, b)):
+        return np.result_type(a, b)
+    return object
+
+
+def _common_dtypes(csv_path, known, chunk_size, offset=0):
+    """
+    Tipo común en todos los bloques de las columnas sin tipo explícito.
+
+    Cada bloque se infiere por separado (una columna puede tener enteros en un bloque y
+    decimales o texto en el siguiente), así que se recorre una vez el CSV leyendo solo
+    esas columnas; las que mezclan tipos incompatibles se leen como texto.
+
+    Coste: es una segunda pasada completa sobre el archivo (parseando solo esas columnas)
+    antes de la lectura real; con los tipos actuales ocurre siempre, porque quantity,
+    current_stock y min_stock se infieren. No se infiere del primer bloque ensanchando
+    sobre la marcha porque los bloques ya escritos (row groups del Parquet o archivos
+    de partición) no se pueden ensanchar sin reescribirlos.
+    """
+    others = [c for c in pd.read_csv(csv_path, nrows=0).columns if c not in known]
+    if not others:
+        return {}
+    common = {}
+    for chunk in _iter_csv(csv_path, None, chunk_size, offset, usecols=others):
+        for col in others:
+            dtype = chunk[col].dtype
+            common[col] = dtype if col not in common else _widen(common[col], dtype)
+    return {col: str if dtype == object else dtype for col, dtype in common.items()}
+
+
+def _read_csv_chunks(csv_path, dtypes, chunk_size, offset=0):
+    """
+    Itera el CSV por bloques (o como un único bloque si no hay chunk_size).
+
+    Las columnas de dtypes usan su tipo explícito y, al leer por bloques, las demás el
+    tipo común a todos los bloques (ver _common_dtypes, que recorre antes el CSV una vez
+    más), de modo que todos los bloques tienen el mismo esquema. Con offset > 0 se leen solo las filas que empiezan en ese
+    byte (las agregadas al final desde la ejecución anterior), con los encabezados de
+    la primera línea.
+    """
+    dtype = _resolve_dtypes(csv_path, dtypes)
+    if chunk_size:
+        dtype.update(_common_dtypes(csv_path, dtype, chunk_size, offset))
+    yield from _iter_csv(csv_path, dtype, chunk_size, offset)
+
+
+def _empty_frame(csv_path, dtypes):
+    """DataFrame vacío con los encabezados y tipos del CSV."""
+    return pd.read_csv(csv_path, dtype=_resolve_dtypes(csv_path, dtypes), nrows=0)
+
+
+def _project(df, columns):
+    """Columnas de df cuyo nombre normalizado está en columns (todas si columns es None)."""
+    if columns is None:
+        return df
+    wanted = {c.lower().strip() for c in columns}
+    return df[[c for c in df.columns if c.lower().strip() in wanted]]
+
+
+def _stream_chunks(csv_path, parquet_path, dtypes, chunk_size, offset=0):
+    """
+    Convierte un CSV a Parquet por bloques y entrega cada bloque después de escribirlo.
+
+    Cada bloque se escribe como un row group con un único ParquetWriter, de modo que
+    la memoria usada depende de chunk_size y no del tamaño total del archivo. Todos los
+    bloques se leen con los mismos tipos (ver _read_csv_chunks) y se escriben con el
+    esquema del primero. Con offset solo se convierten las filas a partir de ese byte.
+    """
+    writer = None
+    schema = None
+
+    try:
+        for chunk in _read_csv_chunks(csv_path, dtypes, chunk_size, offset):
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                writer = pq.ParquetWriter(parquet_path, schema)
+            writer.write_table(table, row_group_size=chunk_size)
+            yield chunk
+    finally:
+        if writer is not None:
+            writer.close()
+
+    # CSV vacío: se escribe igualmente un Parquet con los encabezados
+    if writer is None:
+        _empty_frame(csv_path, dtypes).to_parquet(parquet_path, index=False)
+
+
+def stream_csv_to_parquet(csv_path, parquet_path, dtypes, chunk_size, offset=0):
+    """
+    Convierte un CSV a Parquet por bloques de tamaño acotado (ver _stream_chunks).
+
+    Returns:
+        int: Número de filas escritas
+    """
+    return sum(len(chunk) for chunk in _stream_chunks(csv_path, parquet_path, dtypes, chunk_size, offset))
+
+
+def _stream_and_collect(csv_path, parquet_path, dtypes, chunk_size, offset=0, columns=None):
+    """
+    Convierte un CSV a Parquet por bloques y devuelve a la vez las filas escritas.
+
+    Se conservan los bloques ya parseados (proyectados a columns) en lugar de volver a
+    leer el Parquet completo después de escribirlo.
+    """
+    chunks = [_project(chunk, columns) for chunk in _stream_chunks(csv_path, parquet_path, dtypes, chunk_size, offset)]
+    if not chunks:
+        return _project(_empty_frame(csv_path, dtypes), columns)
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+
+def _log_late_rows(df_delta, watermark):
+    """Avisa de las ventas nuevas con fecha anterior al watermark (se incorporan igual)."""
+    dates = pd.to_datetime(df_delta["sale_date"], errors="coerce", format="mixed")
+    if watermark is not None:
+        late = int((dates < pd.Timestamp(watermark)).sum())
+        if late:
+            print(f"  {late} ventas nuevas tienen sale_date anterior al watermark ({watermark}): "
+                  f"llegaron tarde y se incorporan igual")
+    return dates.max()
+
+
+def _ingest_sales_delta(sales_path, output_path, manifest, chunk_size, partition_by=None, catalogue=None):
+    """
+    Agrega al dataset de ventas solo las filas nuevas del CSV.
+
+    Las filas nuevas son las agregadas al final del archivo desde la ejecución anterior:
+    se leen a partir del byte donde terminaba el archivo ya ingerido, sin importar su
+    sale_date (las ventas que llegan tarde se registran en el log y se incorporan). Si el
+    CSV se reescribió en lugar de crecer, se descarta el histórico acumulado (agregados y
+    rollup diario) y se vuelve a ingerir completo.
+
+    Sin partition_by, el delta se guarda como un único part file en {output_path}/sales/;
+    con partition_by, se reparte en las particiones correspondientes del dataset. El
+    watermark es la sale_date más reciente ingerida y solo se usa como referencia.
+
+    Returns:
+        DataFrame con las ventas nuevas (vacío si el archivo no cambió)
+    """
+    previous = manifest["sources"].get("sales")
+    fingerprint = fingerprint_file(sales_path, previous)
+    sales_dir = f"{output_path}/sales"
+    os.makedirs(sales_dir, exist_ok=True)
+
+    if not has_changed(manifest, "sales", fingerprint):
+        print("✓ sales sin cambios: se omite la ingesta")
+        return _empty_frame(sales_path, SALES_DTYPES)
+
+    offset = appended_offset(sales_path, previous) if previous else 0
+    if offset is None:
+        print("  sales se reescribió (no solo se agregaron filas al final): se reconstruye el histórico completo")
+        reset_dataset(sales_dir)
+        manifest.update(watermark=None, aggregates_file=None, daily_file=None)
+        offset = 0
+
+    # El nombre del part depende del byte de inicio: reintentar una ejecución fallida lo sobrescribe
+    part_name = f"part-{offset:012d}"
+    part_path = f"{sales_dir}/{part_name}.parquet"
+    if partition_by:
+        written = []
+        for n, chunk in enumerate(_read_csv_chunks(sales_path, SALES_DTYPES, chunk_size, offset)):
+            written += write_sales_dataset(chunk, sales_dir, partition_by, f"{part_name}-{n}", catalogue)
+        df_delta = read_files(written) if written else _empty_frame(sales_path, SALES_DTYPES)
+    elif chunk_size:
+        df_delta = _stream_and_collect(sales_path, part_path, SALES_DTYPES, chunk_size, offset)
+    else:
+        df_delta = next(_read_csv_chunks(sales_path, SALES_DTYPES, None, offset),
+                        _empty_frame(sales_path, SALES_DTYPES))
+        df_delta.to_parquet(part_path, index=False)
+
+    if not partition_by and df_delta.empty:
+        os.remove(part_path)
+    if not df_delta.empty:
+        newest = _log_late_rows(df_delta, manifest["watermark"])
+        if pd.notna(newest) and (manifest["watermark"] is None or newest > pd.Timestamp(manifest["watermark"])):
+            manifest["watermark"] = newest.isoformat()
+    manifest["sources"]["sales"] = fingerprint
+
+    print(f"✓ Ingesta incremental de ventas: {len(df_delta)} filas nuevas (watermark: {manifest['watermark']})")
+    return df_delta
+
+
+def write_sales_partitioned(sales_path, sales_dir, chunk_size, partition_by, catalogue=None):
+    """
+    Reescribe completo el dataset de ventas particionado a partir del CSV.
+
+    Es una función de módulo para poder ejecutarse en un proceso aparte.
+
+    Returns:
+        int: Número de filas escritas
+    """
+    reset_dataset(sales_dir)
+    rows = 0
+    for n, chunk in enumerate(_read_csv_chunks(sales_path, SALES_DTYPES, chunk_size)):
+        write_sales_dataset(chunk, sales_dir, partition_by, f"part-{n}", catalogue)
+        rows += len(chunk)
+    return rows
+
+
+def _run(process_pool, fn, *args):
+    """Ejecuta fn en el pool de procesos si existe; si no, en el hilo actual."""
+    if process_pool is None:
+        return fn(*args)
+    return process_pool.submit(fn, *args).result()
+
+
+def _ingest_sales_partitioned(sales_path, output_path, chunk_size, partition_by, catalogue, sales_filters,
+                              process_pool=None):
+    """
+    Reescribe el dataset de ventas particionado y devuelve solo lo que necesita transform_data.
+
+    La lectura aplica los filtros de sales_filters (start_date, end_date, product_ids)
+    y la proyección TRANSFORM_SALES_COLUMNS directamente en el lector Parquet.
+    """
+    sales_dir = f"{output_path}/sales"
+    rows = _run(process_pool, write_sales_partitioned, sales_path, sales_dir, chunk_size, partition_by, catalogue)
+
+    if rows == 0:
+        return _empty_frame(sales_path, SALES_DTYPES)
+
+    df_sales = read_sales(sales_dir, columns=TRANSFORM_SALES_COLUMNS, **(sales_filters or {}))
+    print(f"✓ Dataset de ventas particionado por {list(partition_by)}: {rows} filas escritas, {len(df_sales)} leídas")
+    return df_sales
+
+
+def _read_existing(parquet_path, columns=None):
+    """Lee un Parquet ya generado; con columns, proyectado y con memory-map (ver read_parquet_projected)."""
+    if columns:
+        return read_parquet_projected(parquet_path, columns)
+    return pd.read_parquet(parquet_path)
+
+
+def _ingest_table(csv_path, parquet_path, dtypes, chunk_size, manifest, source, process_pool=None, columns=None):
+    """
+    Carga un CSV a Parquet, reutilizando el Parquet existente si la fuente no cambió.
+
+    Con columns se devuelven solo esas columnas, tanto si se reutiliza el Parquet como
+    si se convierte el CSV, de modo que ambos caminos devuelven el mismo frame.
+    """
+    if manifest is not None:
+        fingerprint = fingerprint_file(csv_path, manifest["sources"].get(source))
+        if not has_changed(manifest, source, fingerprint) and os.path.exists(parquet_path):
+            print(f"✓ {source} sin cambios: se reutiliza {parquet_path}")
+            return _read_existing(parquet_path, columns)
+        manifest["sources"][source] = fingerprint
+
+    if process_pool is not None:
+        # La conversión corre en otro proceso: se lee el resultado (solo las columnas pedidas)
+        _run(process_pool, stream_csv_to_parquet, csv_path, parquet_path, dtypes, chunk_size or DEFAULT_CHUNK_SIZE)
+        return _read_existing(parquet_path, columns)
+    if chunk_size:
+        return _stream_and_collect(csv_path, parquet_path, dtypes, chunk_size, columns=columns)
+
+    df = next(_read_csv_chunks(csv_path, dtypes, None))
+    df.to_parquet(parquet_path, index=False)
+    return _project(df, columns)
+
+
+def _from_memory(warm, source, key, load):
+    """
+    Modo servicio: reutiliza la dimensión guardada en warm si su clave no cambió; si no,
+    la carga con load y la guarda. Se devuelve una copia superficial, de modo que los
+    renombres en su lugar de prepare_inputs no alteran la copia en memoria.
+    """
+    if warm is None:
+        return load()
+    cached = warm.get(source)
+    if cached is not None and cached[0] == key:
+        print(f"✓ {source} sin cambios: se usa la copia en memoria")
+    else:
+        cached = warm[source] = (key, load())
+    return cached[1].copy(deep=False)
+
+
+def _ingest_api(client, output_path, manifest, fast_path=False, warm=None, response=None):
+    """
+    Descarga el catálogo del API y lo guarda en products.parquet.
+
+    response es una respuesta de client.fetch_catalog() ya obtenida en esta ejecución
+    (p. ej. para calcular la huella del catálogo); si se indica, no se vuelve a pedir.
+    """
+    content, not_modified = response or client.fetch_catalog()
+    if warm is not None and manifest is None:
+        return _from_memory(warm, "api", fingerprint_bytes(content)["sha256"],
+                            lambda: _catalog_frame(content, not_modified, output_path, None, fast_path))
+    return _catalog_frame(content, not_modified, output_path, manifest, fast_path)
+
+
+def _catalog_frame(content, not_modified, output_path, manifest, fast_path):
+    products_path = f"{output_path}/products.parquet"
+    # En modo rápido el catálogo se proyecta siempre, se lea del Parquet o de la respuesta
+    columns = TRANSFORM_API_COLUMNS if fast_path else None
+    if not_modified and fast_path and os.path.exists(products_path):
+        print("✓ Catálogo del API sin cambios (304): se lee products.parquet")
+        return _read_existing(products_path, columns)
+    if not_modified:
+        print("✓ Catálogo del API sin cambios (304): se usa la respuesta en caché")
+    api_fingerprint = fingerprint_bytes(content)
+    if manifest is not None and not has_changed(manifest, "api", api_fingerprint) and os.path.exists(products_path):
+        print("✓ Catálogo del API sin cambios: se reutiliza products.parquet")
+        df_api = _read_existing(products_path, columns)
+    else:
+        df_api = pd.DataFrame(json.loads(content))
+        df_api.to_parquet(products_path, index=False)
+        df_api = _project(df_api, columns)
+    if manifest is not None:
+        manifest["sources"]["api"] = api_fingerprint
+    return df_api
+
+
+def _fresh_or_ingest(snapshots, source, csv_path, layout, target_path, read_existing, ingest):
+    """
+    Ruta rápida: si el Parquet de la fuente se generó a partir del mismo CSV (y layout),
+    lo lee directamente sin parsear el CSV; si no, ejecuta ingest y registra la huella.
+    """
+    if snapshots is None:
+        return ingest()
+
+    previous = snapshots.get("snapshots", {}).get(source, {}).get("fingerprint")
+    fingerprint = fingerprint_file(csv_path, previous)
+    if is_fresh(snapshots, source, fingerprint, layout) and os.path.exists(target_path):
+        print(f"✓ {target_path} vigente: se omite el parseo de {os.path.basename(csv_path)}")
+        return read_existing()
+
+    df = ingest()
+    record_snapshot(snapshots, source, fingerprint, layout)
+    return df
+
+
+def ingest_data(api_url, sales_path, inventory_path, output_path, chunk_size=None, manifest=None,
+                partition_by=None, sales_filters=None, api_client=None, parallel=False,
+                csv_process_workers=0, timings=None, fast_path=False):
+    """
+    Descarga datos del API, carga CSV locales y guarda todo en Parquet.
+
+    Si se indica chunk_size, los CSV se procesan en modo streaming: se leen por bloques
+    con tipos explícitos y se escriben incrementalmente como row groups de Parquet.
+
+    Si se indica manifest (ver src/manifest.py), la ingesta es incremental: las fuentes
+    sin cambios no se reescriben y de sales solo se agregan a {output_path}/sales/ las
+    filas añadidas al final del CSV desde la ejecución anterior. En ese caso df_sales
+    contiene solo el delta.
+    El manifiesto se actualiza en memoria; confirmarlo es responsabilidad del llamador.
+
+    Si se indica partition_by (p. ej. ["year", "month", "day"]), las ventas se guardan en
+    {output_path}/sales/ como dataset particionado por sale_date y df_sales se lee desde
+    ahí aplicando sales_filters (rango de fechas, product_ids) y solo las columnas necesarias.
+
+    api_client es un ProductCatalogClient ya configurado (timeout, reintentos, caché);
+    si no se indica, se crea uno con los valores por defecto para api_url.
+
+    Con parallel=True las tres fuentes se descargan, parsean y escriben en hilos
+    concurrentes; con csv_process_workers > 0 la conversión CSV -> Parquet completa
+    (no incremental) se ejecuta además en un pool de procesos. Si se pasa un dict en
+    timings, se completa con la duración en segundos de cada fuente. Si una fuente falla,
+    las demás se detienen en su siguiente bloque (IngestionCancelled) y se re-lanza el
+    error de la fuente que falló.
+
+    Con fast_path=True, si el Parquet de una fuente ya existe y se generó a partir del
+    mismo CSV (huella registrada en el manifiesto), se lee directamente con memory-map
+    y proyectado a las columnas que usa transform_data, sin volver a parsear el CSV. Lo
+    mismo aplica al catálogo cuando el API responde 304. Cuando sí hay que convertir la
+    fuente, el resultado se proyecta igual: ambos caminos devuelven las mismas columnas
+    con los mismos tipos.
+    """
+    with IngestionPlan(api_url, sales_path, inventory_path, output_path, chunk_size=chunk_size, manifest=manifest,
+                       partition_by=partition_by, sales_filters=sales_filters, api_client=api_client,
+                       csv_process_workers=csv_process_workers, timings=timings, fast_path=fast_path) as plan:
+        if parallel:
+            with ThreadPoolExecutor(max_workers=3, thread_name_prefix="ingesta") as executor:
+                api_future = executor.submit(plan.load_api)
+                sales_future = executor.submit(plan.load_sales, api_future.result)
+                inventory_future = executor.submit(plan.load_inventory)
+            # La primera fuente que falla cancela las demás: se re-lanza su error, no el de las canceladas
+            futures = (api_future, sales_future, inventory_future)
+            errors = [future.exception() for future in futures if future.exception() is not None]
+            if errors:
+                raise next((e for e in errors if not isinstance(e, IngestionCancelled)), errors[0])
+            df_api, df_sales, df_inventory = (future.result() for future in futures)
+        else:
+            df_api = plan.load_api()
+            df_sales = plan.load_sales(lambda: df_api)
+            df_inventory = plan.load_inventory()
+        plan.finish(df_sales, df_inventory)
 
     return df_api, df_sales, df_inventory
+
+
+class IngestionPlan:
+    """
+    Ingesta dividida en una tarea por fuente (api, sales, inventory).
+
+    ingest_data la usa en sus modos secuencial y paralelo; el orquestador por grafo la
+    usa para ejecutar cada fuente como una etapa propia. Los parámetros son los de
+    ingest_data. Como context manager, al salir cierra el cliente del API (si lo creó)
+    y el pool de procesos.
+
+    warm es un dict que se conserva entre ejecuciones (modo servicio): catálogo e
+    inventario se reutilizan desde memoria mientras el contenido del API y el CSV de
+    inventario no cambien. No se usa en modo incremental.
+    """
+
+    def __init__(self, api_url, sales_path, inventory_path, output_path, chunk_size=None, manifest=None,
+                 partition_by=None, sales_filters=None, api_client=None, csv_process_workers=0, timings=None,
+                 fast_path=False, warm=None):
+        os.makedirs(output_path, exist_ok=True)
+        self.sales_path = sales_path
+        self.inventory_path = inventory_path
+        self.output_path = output_path
+        self.chunk_size = chunk_size
+        self.manifest = manifest
+        self.partition_by = partition_by
+        self.sales_filters = sales_filters
+        self.fast_path = fast_path
+        self.warm = warm if manifest is None else None
+        self.timings = {} if timings is None else timings
+        # Sin api_url ni cliente (p. ej. shards que reciben el catálogo ya descargado) no se crea cliente
+        self.owns_client = api_client is None and api_url is not None
+        self.client = api_client or (ProductCatalogClient(api_url) if api_url is not None else None)
+        self.process_pool = ProcessPoolExecutor(max_workers=csv_process_workers) if csv_process_workers else None
+        # Solo particionar por categoría obliga a que las ventas esperen al catálogo
+        self.needs_catalogue = bool(partition_by) and "category" in partition_by
+        # En modo completo, la ruta rápida usa su propio registro de huellas en el manifiesto
+        self.snapshots = load_manifest(output_path) if fast_path and manifest is None else None
+        self.layout = list(partition_by) if partition_by else None
+        self.fingerprints = {}
+        self.catalog_response = None
+        # Se activa cuando falla una fuente; las demás lo consultan entre bloque y bloque
+        self.cancelled = threading.Event()
+        self.sales_dir = f"{output_path}/sales"
+        self.sales_file = f"{output_path}/sales.parquet"
+        self.inventory_file = f"{output_path}/inventory.parquet"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        if self.owns_client:
+            self.client.close()
+        if self.process_pool is not None:
+            self.process_pool.shutdown()
+
+    def fingerprint(self, source):
+        """
+        Huella actual de una fuente (api, sales o inventory) sin ingerirla, calculada una
+        vez por ejecución.
+
+        Para los CSV se reutiliza el hash de la huella que ya registraron la ruta rápida o
+        el manifiesto si el tamaño y el mtime no cambiaron. Para el API se pide el catálogo
+        (petición condicional) y load_api reutiliza esa misma respuesta.
+        """
+        if source not in self.fingerprints:
+            if source == "api":
+                self.catalog_response = self.client.fetch_catalog()
+                self.fingerprints[source] = fingerprint_bytes(self.catalog_response[0])["sha256"]
+            else:
+                path = self.sales_path if source == "sales" else self.inventory_path
+                self.fingerprints[source] = fingerprint_file(path, self._known_fingerprint(source))["sha256"]
+        return self.fingerprints[source]
+
+    def _known_fingerprint(self, source):
+        if self.snapshots is not None:
+            return self.snapshots.get("snapshots", {}).get(source, {}).get("fingerprint")
+        if self.manifest is not None:
+            return self.manifest["sources"].get(source)
+        return None
+
+    def projection(self, columns):
+        """Columnas a devolver: en modo rápido, las mismas que lee la ruta rápida (si no, todas)."""
+        return columns if self.fast_path else None
+
+    def _timed(self, source, fn, *args):
+        """
+        Ejecuta fn registrando su duración en timings[source] (segundos) y como sub-paso
+        instrumentado. Si fn falla, cancela la ingesta de las demás fuentes.
+        """
+        start = time.perf_counter()
+        _cancel.event = self.cancelled
+        try:
+            _check_cancelled()
+            with step(f"ingesta_{source}") as record:
+                df = fn(*args)
+                record["rows_out"] = len(df)
+            return df
+        except BaseException:
+            self.cancelled.set()
+            raise
+        finally:
+            _cancel.event = None
+            self.timings[source] = time.perf_counter() - start
+
+    def load_api(self):
+        return self._timed("api", _ingest_api, self.client, self.output_path, self.manifest, self.fast_path,
+                           self.warm, self.catalog_response)
+
+    def load_sales(self, api_result):
+        """Ingesta de ventas; api_result es un callable que devuelve el catálogo (solo se usa si hace falta)."""
+        catalogue = api_result().rename(columns={"id": "product_id"}) if self.needs_catalogue else None
+        if self.manifest is not None:
+            return self._timed("sales", _ingest_sales_delta, self.sales_path, self.output_path,
+                               self.manifest, self.chunk_size, self.partition_by, catalogue)
+        if self.partition_by:
+            return self._timed("sales", _fresh_or_ingest, self.snapshots, "sales", self.sales_path,
+                               self.layout, self.sales_dir,
+                               lambda: read_sales(self.sales_dir, columns=TRANSFORM_SALES_COLUMNS,
+                                                  **(self.sales_filters or {})),
+                               lambda: _ingest_sales_partitioned(self.sales_path, self.output_path, self.chunk_size,
+                                                                 self.partition_by, catalogue, self.sales_filters,
+                                                                 self.process_pool))
+        return self._timed("sales", _fresh_or_ingest, self.snapshots, "sales", self.sales_path, self.layout,
+                           self.sales_file,
+                           lambda: read_parquet_projected(self.sales_file, TRANSFORM_SALES_COLUMNS),
+                           lambda: _ingest_table(self.sales_path, self.sales_file, SALES_DTYPES, self.chunk_size, None,
+                                                 "sales", self.process_pool, self.projection(TRANSFORM_SALES_COLUMNS)))
+
+    def load_inventory(self):
+        def ingest():
+            return _fresh_or_ingest(
+                self.snapshots, "inventory", self.inventory_path, None, self.inventory_file,
+                lambda: read_parquet_projected(self.inventory_file, TRANSFORM_INVENTORY_COLUMNS),
+                lambda: _ingest_table(self.inventory_path, self.inventory_file, INVENTORY_DTYPES, self.chunk_size,
+                                      self.manifest, "inventory", self.process_pool,
+                                      self.projection(TRANSFORM_INVENTORY_COLUMNS))
+            )
+
+        if self.warm is None:
+            return self._timed("inventory", ingest)
+        stat = os.stat(self.inventory_path)
+        return self._timed("inventory", _from_memory, self.warm, "inventory",
+                           (self.inventory_path, stat.st_size, stat.st_mtime_ns), ingest)
+
+    def save_snapshots(self):
+        """Guarda en el manifiesto las huellas registradas por la ruta rápida (si está activa)."""
+        if self.snapshots is not None:
+            save_manifest(self.output_path, self.snapshots)
+
+    def finish(self, df_sales, df_inventory):
+        """Guarda las huellas de la ruta rápida e informa tiempos; llamar cuando las tres fuentes terminaron bien."""
+        self.save_snapshots()
+
+        if self.chunk_size:
+            print(f"✓ Ingesta streaming: {len(df_sales)} ventas, {len(df_inventory)} registros de inventario "
+                  f"(bloques de {self.chunk_size} filas)")
+        print("✓ Tiempos de ingesta: " + ", ".join(f"{k}={v:.3f}s" for k, v in self.timings.items()))
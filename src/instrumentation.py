@@ -0,0 +1,264 @@
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows: sin getrusage, no se registra el pico de RSS
+    resource = None
+
+# Registrador activo; step() no hace nada mientras no haya uno
+_active = None
+
+
+def _rss_peak_mb():
+    """Pico de memoria residente del proceso en MB (ru_maxrss está en KB en Linux y en bytes en macOS)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024, 3)
+
+
+def _rss_mb():
+    """Memoria residente actual del proceso en MB (None si el sistema no expone /proc/self/statm)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2, 3)
+
+
+class StageMetrics:
+    """
+    Registra por etapa y sub-paso: tiempo de pared, tiempo de CPU, RSS, pico de
+    tracemalloc (si trace_memory=True) y filas de entrada/salida.
+
+    Las etapas del DAG pueden correr en paralelo, así que se distingue lo que es de la
+    etapa de lo que es del proceso:
+
+    - cpu_s es el tiempo de CPU del hilo que ejecuta la etapa (no incluye sus hilos o
+      procesos auxiliares); process_cpu_s es el del proceso y solo se registra si
+      ninguna otra etapa de primer nivel se solapó con ella (concurrent=False).
+    - rss_peak_mb es el máximo de la RSS muestreada mientras la etapa está abierta (cada
+      rss_interval segundos, además de al entrar y al salir) y rss_delta_mb la variación
+      entre la entrada y la salida. Con concurrent=True incluyen la memoria de las otras
+      etapas. process_rss_peak_mb es el pico de toda la vida del proceso (ru_maxrss).
+    - tracemalloc_peak_mb queda en None si otra etapa de otro hilo estuvo abierta a la
+      vez: el pico de tracemalloc es global y reset_peak lo borra para todas.
+
+    Cada registro se escribe como una línea JSON en metrics_file. Las etapas de
+    profile_stages se ejecutan además bajo cProfile y se guardan en profile_dir.
+    """
+
+    def __init__(self, metrics_file="pipeline_metrics.jsonl", trace_memory=False,
+                 profile_stages=(), profile_dir="profiles", rss_interval=0.05):
+        self.run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.metrics_file = metrics_file
+        self.trace_memory = trace_memory
+        self.profile_stages = set(profile_stages or ())
+        self.profile_dir = profile_dir
+        self.records = []
+        self._lock = threading.Lock()
+        self._stacks = {}
+        self._inherited = {}
+        self._open = []
+        self._profiling = False
+        self.rss_interval = rss_interval
+        self._sampler = None
+        self._stop_sampling = threading.Event()
+
+    def current(self):
+        """Registro de la etapa abierta en el hilo actual (None si no hay)."""
+        stack = self._stacks.get(threading.get_ident())
+        return stack[-1] if stack else self._inherited.get(threading.get_ident())
+
+    def _parent(self, stack):
+        """
+        Registro de la etapa abierta en el hilo actual; para hilos auxiliares, la heredada
+        con inherit() o, si no hay, la abierta en el hilo principal (ingesta paralela).
+        """
+        if stack:
+            return stack[-1]
+        if threading.get_ident() in self._inherited:
+            return self._inherited[threading.get_ident()]
+        main_stack = self._stacks.get(threading.main_thread().ident)
+        return main_stack[-1] if main_stack else None
+
+    def __enter__(self):
+        global _active
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.rss_interval and _rss_mb() is not None:
+            self._stop_sampling.clear()
+            self._sampler = threading.Thread(target=self._sample_rss, name="rss-sampler", daemon=True)
+            self._sampler.start()
+        _active = self
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        _active = None
+        if self._sampler is not None:
+            self._stop_sampling.set()
+            self._sampler.join()
+            self._sampler = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return False
+
+    def _sample_rss(self):
+        """Hilo muestreador: actualiza el pico de RSS de las etapas abiertas."""
+        while not self._stop_sampling.wait(self.rss_interval):
+            rss = _rss_mb()
+            with self._lock:
+                for record in self._open:
+                    record["_rss_peak"] = max(record["_rss_peak"], rss)
+
+    def _open_stage(self, record):
+        """
+        Registra la etapa como abierta y marca los solapes con las de otros hilos: con
+        cualquier etapa que no sea su ancestro, el pico de tracemalloc deja de ser suyo
+        (también para sus ancestros, cuyo pico borra su reset_peak); con una etapa de
+        otra rama del primer nivel, tampoco lo son los contadores del proceso.
+        """
+        ident = threading.get_ident()
+        with self._lock:
+            for other in self._open:
+                if other["_thread"] == ident or any(other is a for a in _lineage(record)):
+                    continue
+                for r in _lineage(other) + _lineage(record):
+                    r["_shared"] = True
+                if _lineage(other)[-1] is not _lineage(record)[-1]:
+                    other["concurrent"] = record["concurrent"] = True
+            self._open.append(record)
+
+    def _close_stage(self, record):
+        with self._lock:
+            self._open = [r for r in self._open if r is not record]
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        Mide el bloque como etapa 'name'. El llamador puede completar record['rows_out'].
+
+        Las etapas anidadas registran su etapa padre en 'parent'.
+        """
+        stack = self._stacks.setdefault(threading.get_ident(), [])
+        parent = self._parent(stack)
+        rss = _rss_mb()
+        record = {"run_id": self.run_id, "stage": name, "parent": parent["stage"] if parent else None,
+                  "rows_in": rows_in, "rows_out": None, "concurrent": False, "_up": parent,
+                  "_thread": threading.get_ident(), "_shared": False, "_child_peak": 0,
+                  "_rss_start": rss, "_rss_peak": rss}
+        stack.append(record)
+        self._open_stage(record)
+
+        # cProfile solo admite un perfilador activo a la vez: si ya hay uno, la etapa no se perfila
+        profiler = None
+        if name in self.profile_stages:
+            with self._lock:
+                if not self._profiling:
+                    self._profiling = True
+                    profiler = cProfile.Profile()
+        # reset_peak es global: con otra etapa abierta en otro hilo se deja el pico intacto
+        if self.trace_memory and tracemalloc.is_tracing() and not record["_shared"]:
+            tracemalloc.reset_peak()
+
+        status = "ok"
+        wall, cpu, process_cpu = time.perf_counter(), time.thread_time(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+            record["wall_s"] = round(time.perf_counter() - wall, 6)
+            record["cpu_s"] = round(time.thread_time() - cpu, 6)
+            self._close_stage(record)
+            record["process_cpu_s"] = None if record["concurrent"] else round(time.process_time() - process_cpu, 6)
+            rss = _rss_mb()
+            record["rss_peak_mb"] = None if rss is None else max(record["_rss_peak"], rss)
+            record["rss_delta_mb"] = None if rss is None else round(rss - record["_rss_start"], 3)
+            record["process_rss_peak_mb"] = _rss_peak_mb()
+            if self.trace_memory and tracemalloc.is_tracing():
+                record["tracemalloc_peak_mb"] = None
+                if not record["_shared"]:
+                    # reset_peak en las etapas hijas borra el pico del padre: se combina con el de ellas
+                    peak = max(tracemalloc.get_traced_memory()[1], record["_child_peak"])
+                    record["tracemalloc_peak_mb"] = round(peak / 1024 ** 2, 3)
+                    if record["_up"] is not None:
+                        record["_up"]["_child_peak"] = max(record["_up"]["_child_peak"], peak)
+            record["status"] = status
+            if profiler is not None:
+                record["profile"] = self._dump_profile(profiler, name)
+            stack.pop()
+            self._write(record)
+
+    def _dump_profile(self, profiler, name):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"{name}_{self.run_id}.prof")
+        profiler.dump_stats(path)
+        return path
+
+    def _write(self, record):
+        record = {k: v for k, v in record.items() if not k.startswith("_")}
+        with self._lock:
+            self.records.append(record)
+            if self.metrics_file:
+                with open(self.metrics_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _lineage(record):
+    """El registro y sus ancestros, del más interno a la etapa de primer nivel."""
+    chain = [record]
+    while chain[-1]["_up"] is not None:
+        chain.append(chain[-1]["_up"])
+    return chain
+
+
+@contextmanager
+def step(name, rows_in=None):
+    """
+    Sub-paso instrumentado con el registrador activo (merges, groupbys, exportaciones...).
+
+    Sin registrador activo solo devuelve un dict vacío, de modo que las funciones
+    de transformación y reporte se pueden usar fuera del pipeline sin coste.
+    """
+    if _active is None:
+        yield {}
+        return
+    with _active.stage(name, rows_in) as record:
+        yield record
+
+
+def inherit(fn):
+    """
+    Envuelve fn para ejecutarla en otro hilo (p. ej. con executor.submit) de modo que sus
+    sub-pasos cuelguen de la etapa abierta en el hilo que llama a inherit.
+    """
+    recorder = _active
+    parent = recorder.current() if recorder is not None else None
+    if parent is None:
+        return fn
+
+    def run(*args, **kwargs):
+        ident = threading.get_ident()
+        recorder._inherited[ident] = parent
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            recorder._inherited.pop(ident, None)
+    return run
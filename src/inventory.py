@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+# Valor usado cuando el inventario no trae min_stock (igual que prepare_inputs)
+DEFAULT_MIN_STOCK = 5
+
+# Columnas del resultado de critical_stock_from_inventory
+STOCK_COLUMNS = ["product_id", "title", "category", "current_stock", "min_stock", "umbral", "deficit", "cobertura"]
+
+
+def index_inventory(df_inventory):
+    """
+    Inventario indexado por product_id, con una fila por producto (se conserva la primera).
+
+    Returns:
+        DataFrame con índice product_id y columnas current_stock, min_stock
+    """
+    df = df_inventory.rename(columns=lambda c: c.lower().strip())
+    if "min_stock" not in df.columns:
+        print(f"  Columna 'min_stock' no encontrada. Usando valor por defecto = {DEFAULT_MIN_STOCK}")
+        df = df.assign(min_stock=DEFAULT_MIN_STOCK)
+    df = df[df["product_id"].notna()]
+    df = df[~df["product_id"].duplicated()]
+    return df.set_index("product_id")[["current_stock", "min_stock"]]
+
+
+def index_catalogue(df_api):
+    """Catálogo indexado por product_id (acepta la clave 'id' del API)."""
+    df = df_api.rename(columns=lambda c: c.lower().strip())
+    if "product_id" not in df.columns:
+        df = df.rename(columns={"id": "product_id"})
+    df = df[~df["product_id"].duplicated()]
+    return df.set_index("product_id")
+
+
+def critical_stock_from_inventory(df_inventory, df_api=None, threshold=1.0):
+    """
+    Productos con stock crítico calculados solo a partir del inventario.
+
+    Un producto es crítico si current_stock < min_stock * threshold (p. ej. 1.2 avisa
+    con un 20% de margen sobre el mínimo). A diferencia de critical_stock, no depende
+    de las ventas: también aparecen los productos sin ventas. El catálogo es opcional
+    y solo aporta título y categoría (búsqueda por índice, sin merge).
+
+    Returns:
+        DataFrame con STOCK_COLUMNS, ordenado por cobertura (current_stock / min_stock)
+    """
+    inventario = index_inventory(df_inventory)
+    current = inventario["current_stock"].astype("float64")
+    minimum = inventario["min_stock"].astype("float64")
+    umbral = minimum * threshold
+    criticos = (current < umbral).to_numpy(dtype=bool, na_value=False)
+
+    ids = inventario.index[criticos]
+    result = pd.DataFrame({
+        "product_id": ids,
+        "current_stock": current.to_numpy()[criticos],
+        "min_stock": minimum.to_numpy()[criticos],
+        "umbral": umbral.to_numpy()[criticos],
+    })
+    result = result.astype({"current_stock": "int64", "min_stock": "int64"})
+    result["deficit"] = result["min_stock"] - result["current_stock"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result["cobertura"] = (result["current_stock"] / result["min_stock"]).round(3)
+
+    if df_api is not None:
+        catalogo = index_catalogue(df_api)
+        for col in ("title", "category"):
+            if col in catalogo.columns:
+                result[col] = catalogo[col].reindex(ids).to_numpy()
+    for col in ("title", "category"):
+        if col not in result.columns:
+            result[col] = None
+
+    return result[STOCK_COLUMNS].sort_values(["cobertura", "product_id"]).reset_index(drop=True)
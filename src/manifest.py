@@ -0,0 +1,152 @@
+import glob
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+MANIFEST_FILE = "_manifest.json"
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def fingerprint_bytes(data):
+    """Huella de un contenido en memoria (por ejemplo, la respuesta del API)."""
+    return {"size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+
+
+def fingerprint_file(path, previous=None):
+    """
+    Calcula la huella (tamaño, mtime y hash SHA-256) de un archivo.
+
+    Si el tamaño y el mtime coinciden con la huella anterior, se reutiliza su hash
+    para no releer el archivo completo.
+    """
+    stat = os.stat(path)
+    fingerprint = {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    if previous and previous.get("size") == stat.st_size and previous.get("mtime") == stat.st_mtime:
+        fingerprint["sha256"] = previous["sha256"]
+        return fingerprint
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    fingerprint["sha256"] = digest.hexdigest()
+    return fingerprint
+
+
+def appended_offset(path, previous):
+    """
+    Indica desde qué byte empiezan las filas nuevas de un archivo que solo creció.
+
+    Si los primeros previous["size"] bytes del archivo son exactamente los que produjeron
+    la huella anterior, devuelve el byte donde empieza la primera línea agregada; si el
+    archivo se truncó o se reescribió, devuelve None.
+    """
+    remaining = previous["size"]
+    if os.path.getsize(path) < remaining:
+        return None
+    digest = hashlib.sha256()
+    last = b""
+    with open(path, "rb") as f:
+        while remaining:
+            block = f.read(min(HASH_BLOCK_SIZE, remaining))
+            digest.update(block)
+            remaining -= len(block)
+            last = block[-1:]
+        if digest.hexdigest() != previous["sha256"]:
+            return None
+        if not previous["size"] or last == b"\n":
+            return previous["size"]
+        # Sin salto de línea final, lo agregado debe empezar con uno; si no, continúa la última fila
+        following = f.read(2)
+    for newline in (b"\n", b"\r\n"):
+        if following.startswith(newline):
+            return previous["size"] + len(newline)
+    return None
+
+
+def has_changed(manifest, source, fingerprint):
+    """Indica si una fuente cambió respecto a lo registrado en el manifiesto."""
+    previous = manifest["sources"].get(source)
+    return previous is None or previous.get("sha256") != fingerprint["sha256"]
+
+
+def load_manifest(output_path):
+    """Carga el manifiesto de ingesta incremental (o uno vacío si no existe)."""
+    path = os.path.join(output_path, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"sources": {}, "watermark": None, "aggregates_file": None}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(output_path, manifest):
+    """Guarda el manifiesto de forma atómica (archivo temporal + os.replace)."""
+    path = os.path.join(output_path, MANIFEST_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def is_fresh(manifest, source, fingerprint, layout=None):
+    """Indica si el Parquet derivado de una fuente sigue vigente (misma huella y mismo layout)."""
+    snapshot = manifest.get("snapshots", {}).get(source)
+    return (
+        snapshot is not None
+        and snapshot["fingerprint"].get("sha256") == fingerprint["sha256"]
+        and snapshot.get("layout") == layout
+    )
+
+
+def record_snapshot(manifest, source, fingerprint, layout=None):
+    """Registra que el Parquet de una fuente se generó a partir de la huella indicada."""
+    manifest.setdefault("snapshots", {})[source] = {"fingerprint": fingerprint, "layout": layout}
+
+
+def _load_state(output_path, manifest, key):
+    if not manifest.get(key):
+        return None
+    return pd.read_parquet(os.path.join(output_path, manifest[key]))
+
+
+def load_aggregates(output_path, manifest):
+    """Carga los agregados acumulados por producto referenciados por el manifiesto."""
+    return _load_state(output_path, manifest, "aggregates_file")
+
+
+def load_daily(output_path, manifest):
+    """Carga el rollup diario por producto (series temporales) referenciado por el manifiesto."""
+    return _load_state(output_path, manifest, "daily_file")
+
+
+def commit(output_path, manifest, aggregates, daily=None):
+    """
+    Confirma una ejecución incremental.
+
+    Los agregados (y el rollup diario, si se indica) se escriben primero en archivos
+    nuevos y el manifiesto se reemplaza de forma atómica apuntando a ellos, de modo que
+    una ejecución fallida nunca deja un watermark adelantado respecto a los agregados
+    guardados. Cada confirmación usa un número de secuencia propio en el nombre de sus
+    archivos, así que nunca se sobrescribe el estado que referencia el manifiesto vigente.
+    """
+    manifest["commits"] = manifest.get("commits", 0) + 1
+    suffix = f"{manifest['commits']:06d}.parquet"
+    states = {"aggregates_file": ("_sales_aggregates_", aggregates), "daily_file": ("_sales_daily_", daily)}
+    for key, (prefix, df) in states.items():
+        if df is None:
+            # Un rollup que no incorporó este delta ya no está al día: se descarta
+            manifest[key] = None
+            continue
+        df.to_parquet(os.path.join(output_path, prefix + suffix), index=False)
+        manifest[key] = prefix + suffix
+
+    save_manifest(output_path, manifest)
+
+    # Estado anterior y restos de ejecuciones fallidas: todo lo que el manifiesto ya no referencia
+    current = {manifest.get(key) for key in states}
+    for prefix, _ in states.values():
+        for path in glob.glob(os.path.join(output_path, f"{prefix}*.parquet")):
+            if os.path.basename(path) not in current:
+                os.remove(path)
@@ -1,20 +1,23 @@
-import yaml
+import os
 import logging
-from src.ingestion import ingest_data
-from src.tansformation import transform_data  # ← CORREGIDO: era "tansformation"
-from src.quality_checks import run_quality_checks
-from src.reporting import generate_report  # ← AGREGADO: para generar reportes
+from contextlib import contextmanager
+from src.config import load_config
+from src.instrumentation import StageMetrics
+
+# pandas, requests y pyarrow se importan dentro de los métodos y etapas que los usan:
+# importar este módulo (p. ej. desde la CLI para validar la configuración) es barato.
 
 class EcommerceDataPipeline:
     def __init__(self, config_path):
         """Inicializa el pipeline cargando la configuración y los logs."""
         self.config = self.load_config(config_path)
         self.setup_logging()
+        # Dimensiones en memoria entre ejecuciones (las activa el modo servicio, ver src/service.py)
+        self.dimensions = None
 
     def load_config(self, config_path):
         """Carga el archivo YAML con las rutas y parámetros."""
-        with open(config_path, 'r', encoding='utf-8') as file:
-            return yaml.safe_load(file)
+        return load_config(config_path)
 
     def setup_logging(self):
         """Configura el sistema de logging."""
@@ -28,80 +31,558 @@ class EcommerceDataPipeline:
         )
         self.logger = logging.getLogger(__name__)
 
-    def run_pipeline(self):
-        """Ejecuta todo el flujo del pipeline."""
-        self.logger.info(" Iniciando pipeline de e-commerce...")
+    def optimize_frame(self, name, df):
+        """Compacta los tipos de un DataFrame y registra la memoria antes y después."""
+        from src.dtypes import memory_usage_mb, optimize_dtypes
 
-        try:
-            # --- Cargar configuración ---
-            api_cfg = self.config["api"]
-            data_cfg = self.config["data_sources"]
-            proc_cfg = self.config["processing"]
-            qc_cfg = self.config.get("quality_checks", {})  # ← CORREGIDO: usar .get() para evitar KeyError
-            output_cfg = self.config.get("output", {})
+        before = memory_usage_mb(df)
+        df = optimize_dtypes(df)
+        after = memory_usage_mb(df)
+        self.logger.info(f"   Memoria de {name}: {before:.3f} MB -> {after:.3f} MB")
+        return df
 
-            # --- FASE 1: INGESTA ---
-            self.logger.info(" Iniciando ingesta de datos...")
-            df_api, df_sales, df_inventory = ingest_data(
-                api_cfg["url"],
-                data_cfg["sales_file"],
-                data_cfg["inventory_file"],
-                proc_cfg["output_path"]
-            )
+    def create_metrics(self):
+        """Crea el registrador de métricas por etapa según la sección 'instrumentation'."""
+        inst_cfg = self.config.get("instrumentation", {})
+        return StageMetrics(
+            metrics_file=inst_cfg.get("metrics_file", "pipeline_metrics.jsonl") if inst_cfg.get("enabled", True) else None,
+            trace_memory=inst_cfg.get("trace_memory", False),
+            profile_stages=inst_cfg.get("profile_stages", []),
+            profile_dir=inst_cfg.get("profile_dir", "profiles")
+        )
+
+    def create_cache(self):
+        """Crea la caché de etapas según la sección 'cache' (None si está deshabilitada)."""
+        from src.stage_cache import DEFAULT_MAX_SIZE_MB, StageCache
+
+        cache_cfg = self.config.get("cache", {})
+        if not cache_cfg.get("enabled", False):
+            return None
+        return StageCache(
+            cache_cfg.get("path", "data/processed/_stage_cache"),
+            max_size_mb=cache_cfg.get("max_size_mb", DEFAULT_MAX_SIZE_MB)
+        )
+
+    def log_failure(self, e, resumable=False):
+        """Registra el error que detuvo una ejecución, con una indicación según su tipo."""
+        if isinstance(e, FileNotFoundError):
+            self.logger.error(f" Archivo no encontrado: {e}")
+            self.logger.error(" Verifica que los archivos CSV existan en la ruta especificada.")
+        elif isinstance(e, KeyError):
+            self.logger.error(f" Clave faltante en configuración: {e}")
+            self.logger.error(" Revisa tu archivo pipeline_config.yaml")
+        elif isinstance(e, ValueError):
+            self.logger.error(f" Error de validación de datos: {e}")
+        else:
+            self.logger.error(f" Error inesperado durante la ejecución del pipeline: {e}")
+            self.logger.error(" Revisa el archivo pipeline_execution.log para más detalles")
+            if resumable:
+                self.logger.error(" Corrige el error y reanuda con: python run_pipeline.py --resume")
+
+    def create_checkpoints(self, incremental):
+        """Crea los checkpoints de etapas según la sección 'dag' (None si están deshabilitados)."""
+        dag_cfg = self.config.get("dag", {})
+        # El modo incremental actualiza el manifiesto en memoria durante la ingesta: no se reanuda
+        if incremental or not dag_cfg.get("checkpoints", False):
+            return None
+        from src.dag import Checkpoints
+
+        return Checkpoints(dag_cfg.get("checkpoint_path", "data/processed/_checkpoints"))
+
+    @contextmanager
+    def open_ingestion(self, manifest=None):
+        """Cliente del API y plan de ingesta (IngestionPlan) según la configuración."""
+        from src.api_client import ProductCatalogClient
+        from src.ingestion import IngestionPlan
+
+        api_cfg = self.config["api"]
+        data_cfg = self.config["data_sources"]
+        proc_cfg = self.config["processing"]
+        api_client = ProductCatalogClient(
+            api_cfg["url"],
+            timeout=api_cfg.get("timeout", 30),
+            retries=api_cfg.get("retries", 3),
+            backoff_factor=api_cfg.get("backoff_factor", 0.5),
+            cache_dir=api_cfg.get("cache_dir")
+        )
+        with api_client, IngestionPlan(
+            api_cfg["url"],
+            data_cfg["sales_file"],
+            data_cfg["inventory_file"],
+            proc_cfg["output_path"],
+            chunk_size=proc_cfg.get("chunk_size"),
+            manifest=manifest,
+            partition_by=proc_cfg.get("partition_by"),
+            sales_filters=proc_cfg.get("sales_window"),
+            api_client=api_client,
+            csv_process_workers=proc_cfg.get("csv_process_workers", 0),
+            fast_path=proc_cfg.get("parquet_fast_path", False),
+            warm=self.dimensions
+        ) as plan:
+            yield plan
+
+    def build_stages(self, plan, cache, manifest):
+        """
+        Grafo de etapas del pipeline:
+
+            ingesta_api ─┐
+            ingesta_sales ├─> ingesta ─> transformacion ─┬─> calidad ──────┬─> reporte
+            ingesta_inventory ┘                          ├─> exportaciones ┘
+                                                         └─> (calidad) ─> reporte_html
+
+        Con timeseries.enabled, series_temporales se ejecuta entre ingesta y transformacion
+        (prepare_inputs normaliza las entradas en su lugar y, en modo incremental, su rollup
+        se confirma junto con el watermark) y alimenta exportaciones y reporte.
+        """
+        from src.dag import Stage
+
+        proc_cfg = self.config["processing"]
+        qc_cfg = self.config.get("quality_checks", {})  # ← CORREGIDO: usar .get() para evitar KeyError
+        output_cfg = self.config.get("output", {})
+        reports_path = output_cfg.get("reports_path", "reports")
+        ts_cfg = self.config.get("timeseries", {})
+        incremental = manifest is not None
+        sources = ("ingesta_api", "ingesta_sales", "ingesta_inventory")
+        series = ("series_temporales",) if ts_cfg.get("enabled", False) else ()
+
+        def source_keys(*names):
+            """Huellas de las fuentes de las que dependen las salidas de una etapa."""
+            if "sales" in names and plan.needs_catalogue:
+                names += ("api",)
+            return tuple(plan.fingerprint(name) for name in sorted(set(names)))
+
+        def cache_key(stage, *names):
+            """
+            Clave de caché de una etapa a partir de las huellas de sus fuentes (no del contenido
+            de los frames), la configuración de ingesta y procesamiento y el código que los produce.
+            El modo incremental confirma el manifiesto al ingerir y transformar: no se cachea.
+            """
+            if cache is None or incremental:
+                return None
+            from src import dtypes, engines, ingestion, storage, tansformation
+            from src.stage_cache import code_version, stage_key
+
+            return stage_key(stage, source_keys(*names), ingest_cfg,
+                             code_version(ingestion, storage, dtypes, tansformation, engines))
+
+        def ingest(source, load):
+            def run(inputs, record):
+                key = cache_key(f"ingesta_{source}", source)
+                cached = cache.get(key) if key else None
+                if cached is not None:
+                    record["cache"] = "hit"
+                    df = cached["df"]
+                else:
+                    df = load(inputs)
+                    if proc_cfg.get("optimize_dtypes", False):
+                        df = self.optimize_frame(source, df)
+                    if key:
+                        record["cache"] = "miss"
+                        cache.put(key, {"df": df})
+                record["rows_out"] = len(df)
+                return {"df": df}
+            return run
+
+        def finish_ingestion(inputs, record):
+            plan.finish(inputs["ingesta_sales"]["df"], inputs["ingesta_inventory"]["df"])
+            for source, seconds in plan.timings.items():
+                self.logger.info(f"   Ingesta de {source}: {seconds:.3f}s")
             self.logger.info(" Ingesta completada.")
+            return {}
+
+        def frames(inputs):
+            return (inputs["ingesta_api"]["df"], inputs["ingesta_sales"]["df"], inputs["ingesta_inventory"]["df"])
+
+        def timeseries_stage(inputs, record):
+            from src import manifest as ingest_manifest
+            from src.timeseries import DEFAULT_WINDOWS, build_timeseries
+
+            df_api, df_sales, df_inventory = frames(inputs)
+            record["rows_in"] = len(df_sales)
+            previous = None
+            if incremental:
+                previous = ingest_manifest.load_daily(proc_cfg["output_path"], manifest)
+                if previous is None and manifest.get("aggregates_file"):
+                    self.logger.warning(" El rollup diario no tiene histórico previo: empieza con las ventas nuevas "
+                                        "(una ejecución no incremental lo reconstruye completo)")
+            results = build_timeseries(df_api, df_sales, df_inventory, previous,
+                                       ts_cfg.get("windows", DEFAULT_WINDOWS))
+            record["rows_out"] = len(results["ventas_diarias"])
+            return results
+
+        def with_series(inputs):
+            """Resultados de la transformación más los de series temporales (si están activas)."""
+            return {**inputs["transformacion"], **inputs.get("series_temporales", {})}
+
+        def transform_stage(inputs, record):
+            from src import manifest as ingest_manifest
+            from src.dtypes import memory_usage_mb
+            from src.engines import get_transform
+            from src.tansformation import transform_incremental, transform_preaggregated
 
-            # --- FASE 2: TRANSFORMACIÓN ---
             self.logger.info(" Aplicando transformaciones...")
-            results = transform_data(df_api, df_sales, df_inventory)
+            df_api, df_sales, df_inventory = frames(inputs)
+            record["rows_in"] = len(df_sales)
+            transform_key = cache_key("transformacion", "api", "sales", "inventory")
+            results = cache.get(transform_key) if transform_key else None
+            if results is not None:
+                record["cache"] = "hit"
+                self.logger.info(" Transformación restaurada desde caché.")
+            elif incremental:
+                previous = ingest_manifest.load_aggregates(proc_cfg["output_path"], manifest)
+                results = transform_incremental(df_api, df_sales, df_inventory, previous)
+                # Confirmar watermark y agregados solo después de transformar con éxito
+                daily = inputs["series_temporales"]["ventas_diarias"] if series else None
+                ingest_manifest.commit(proc_cfg["output_path"], manifest, results["agregados_incrementales"], daily)
+                self.logger.info(f" Ingesta incremental confirmada (watermark: {manifest['watermark']})")
+            elif proc_cfg.get("plan") == "preaggregated" and proc_cfg.get("engine", "pandas") == "pandas":
+                results = transform_preaggregated(
+                    df_api, df_sales, df_inventory,
+                    by_day=proc_cfg.get("preaggregate_by_day", False),
+                    materialize_merged=proc_cfg.get("materialize_merged", True)
+                )
+            else:
+                transform = get_transform(proc_cfg.get("engine", "pandas"))
+                results = transform(df_api, df_sales, df_inventory)
+            if transform_key and record.get("cache") != "hit":
+                record["cache"] = "miss"
+                cache.put(transform_key, results)
+            record["rows_out"] = len(results["merged"])
             self.logger.info(" Transformación completada.")
+            self.logger.info(f"   Memoria del frame unido: {memory_usage_mb(results['merged']):.3f} MB")
+            return {**results, "transform_key": transform_key}
+
+        def quality_stage(inputs, record):
+            from src import quality_checks
+            from src.quality_checks import run_quality_checks
+            from src.stage_cache import code_version, stage_key
 
-            # --- FASE 3: PRUEBAS DE CALIDAD ---
             self.logger.info("🔍 Ejecutando verificaciones de calidad...")
-            passed, tests = run_quality_checks(results["merged"])
+            df_api, df_sales, df_inventory = frames(inputs)
+            results = inputs["transformacion"]
+            record["rows_in"] = len(results["merged"])
+            # Las entradas de calidad están cubiertas por la clave de la transformación
+            qc_key = None
+            if results.get("transform_key"):
+                qc_key = stage_key("calidad", (results["transform_key"],), qc_cfg, code_version(quality_checks))
+            cached = cache.get(qc_key) if qc_key else None
+            if cached is not None:
+                record["cache"] = "hit"
+                passed, tests = cached["passed"], cached["tests"]
+            else:
+                passed, tests = run_quality_checks(
+                    results["merged"], qc_cfg, sales=df_sales, catalogue=df_api, inventory=df_inventory
+                )
+                if qc_key:
+                    record["cache"] = "miss"
+                    cache.put(qc_key, {"passed": passed, "tests": tests})
 
             if passed:
                 self.logger.info(" Todos los tests de calidad pasaron.")
             else:
-                self.logger.warning(f" Algunos tests fallaron: {tests}")
+                failed = {name: t["failed_rows"] for name, t in tests.items() if not t["passed"]}
+                self.logger.warning(f" Algunos tests fallaron (filas con error): {failed}")
                 # Opcional: Puedes decidir si detener el pipeline aquí
                 # raise ValueError("Tests de calidad fallaron. Pipeline detenido.")
+            return {"passed": passed, "tests": tests}
+
+        def export_stage(inputs, record):
+            from src.reporting import export_results
+
+            results = with_series(inputs)
+            record["rows_in"] = len(results["merged"])
+            exported = export_results(results, reports_path, exports=output_cfg.get("exports"),
+                                      export_workers=output_cfg.get("export_workers"))
+            return {"exported": exported}
+
+        def report_stage(inputs, record):
+            from src.reporting import generate_report
 
-            # --- FASE 4: GENERACIÓN DE REPORTES ---
             self.logger.info(" Generando reportes...")
-            reports_path = output_cfg.get("reports_path", "reports")
-            report_file = generate_report(results, tests, reports_path)
+            results = with_series(inputs)
+            record["rows_in"] = len(results["merged"])
+            report_file = generate_report(
+                results, inputs["calidad"]["tests"], reports_path,
+                max_rows=output_cfg.get("report_max_rows"),
+                exports=output_cfg.get("exports"),
+                history_path=output_cfg.get("history_path"),
+                exported=inputs["exportaciones"]["exported"]
+            )
             self.logger.info(f" Reporte generado: {report_file}")
+            return {"report_file": report_file}
+
+        def html_report_stage(inputs, record):
+            from src.reporting import generate_html_report
+
+            html_file = generate_html_report(inputs["transformacion"], inputs["calidad"]["tests"], reports_path)
+            self.logger.info(f" Reporte HTML generado: {html_file}")
+            return {"html_file": html_file}
+
+        # Configuración que determina la salida de cada grupo de etapas; con la huella de cada
+        # fuente forma la clave de sus checkpoints
+        ingest_cfg = {name: self.config.get(name) for name in ("api", "data_sources", "processing")}
+        # Sin ingesta paralela las fuentes se encadenan: api -> sales -> inventory
+        serial = not proc_cfg.get("parallel_ingestion", False)
+        stages = [
+            Stage("ingesta_api", ingest("api", lambda inputs: plan.load_api()), config=ingest_cfg,
+                  fingerprint=lambda: plan.fingerprint("api")),
+            Stage("ingesta_sales", ingest("sales", lambda inputs: plan.load_sales(lambda: inputs["ingesta_api"]["df"])),
+                  deps=("ingesta_api",) if plan.needs_catalogue or serial else (), config=ingest_cfg,
+                  fingerprint=lambda: plan.fingerprint("sales")),
+            Stage("ingesta_inventory", ingest("inventory", lambda inputs: plan.load_inventory()),
+                  deps=("ingesta_sales",) if serial else (), config=ingest_cfg,
+                  fingerprint=lambda: plan.fingerprint("inventory")),
+            Stage("ingesta", finish_ingestion, deps=("ingesta_sales", "ingesta_inventory"), config=ingest_cfg),
+            Stage("transformacion", transform_stage, deps=sources + ("ingesta",) + series, config=proc_cfg),
+            Stage("calidad", quality_stage, deps=sources + ("transformacion",), config=qc_cfg),
+            Stage("exportaciones", export_stage, deps=("transformacion",) + series, config=output_cfg),
+            Stage("reporte", report_stage, deps=("transformacion", "calidad", "exportaciones") + series,
+                  config=output_cfg),
+        ]
+        if series:
+            stages.append(Stage("series_temporales", timeseries_stage, deps=sources + ("ingesta",),
+                                config={"processing": proc_cfg, "timeseries": ts_cfg}))
+        if output_cfg.get("html_report", False):
+            stages.append(Stage("reporte_html", html_report_stage, deps=("transformacion", "calidad"),
+                                config=output_cfg))
+        return stages
+
+    def run_pipeline(self, resume=False):
+        """
+        Ejecuta todo el flujo del pipeline como un grafo de etapas (ver build_stages).
+
+        Las etapas independientes se ejecutan en paralelo. Con resume=True se reanuda una
+        ejecución fallida a partir de los checkpoints de las etapas que terminaron bien.
+
+        Returns:
+            dict: results (salida de la transformación), tests y report_file
+        """
+        self.logger.info(" Iniciando pipeline de e-commerce...")
+
+        from src import manifest as ingest_manifest
+        from src.dag import run_dag
+
+        try:
+            # --- Cargar configuración ---
+            proc_cfg = self.config["processing"]
+            dag_cfg = self.config.get("dag", {})
+
+            incremental = proc_cfg.get("incremental", False)
+            manifest = ingest_manifest.load_manifest(proc_cfg["output_path"]) if incremental else None
+            checkpoints = self.create_checkpoints(incremental)
+            if resume and checkpoints is None:
+                self.logger.warning(" Reanudación no disponible (modo incremental o dag.checkpoints: false); "
+                                    "se ejecuta el pipeline completo.")
+            elif checkpoints is not None and not resume:
+                checkpoints.clear()
+
+            with self.create_metrics() as metrics, self.open_ingestion(manifest) as plan:
+                self.logger.info(" Iniciando ingesta de datos...")
+                outputs = run_dag(
+                    self.build_stages(plan, self.create_cache(), manifest),
+                    max_workers=dag_cfg.get("max_workers"),
+                    checkpoints=checkpoints,
+                    resume=resume,
+                    metrics=metrics,
+                    keep=("transformacion", "series_temporales", "calidad", "reporte")
+                )
+            results = {**outputs["transformacion"], **outputs.get("series_temporales", {})}
+            report_file = outputs["reporte"]["report_file"]
+            if checkpoints is not None:
+                checkpoints.clear()
 
             # --- RESUMEN FINAL ---
             self.logger.info("=" * 60)
             self.logger.info(" PIPELINE EJECUTADO EXITOSAMENTE")
             self.logger.info("=" * 60)
-            self.logger.info(f" Registros procesados: {len(results['merged'])}")
+            self.logger.info(f" Registros procesados: {results.get('registros', len(results['merged']))}")
             self.logger.info(f"  Productos con stock crítico: {len(results['stock_critico'])}")
             self.logger.info(f" Top productos: {len(results['top_productos'])}")
             self.logger.info(f" Reporte guardado en: {report_file}")
+            for record in metrics.records:
+                if record["parent"] is None:
+                    # Con etapas solapadas la RSS es la del proceso y la CPU solo la del hilo
+                    cpu = record["process_cpu_s"] if record["process_cpu_s"] is not None else record["cpu_s"]
+                    self.logger.info(f"   Etapa {record['stage']}: {record['wall_s']:.3f}s "
+                                     f"(CPU {cpu:.3f}s, RSS pico {record['rss_peak_mb']} MB"
+                                     f"{', en paralelo con otras etapas' if record['concurrent'] else ''})")
+            if metrics.metrics_file:
+                self.logger.info(f" Métricas por etapa: {metrics.metrics_file}")
             self.logger.info("=" * 60)
+            return {"results": results, "tests": outputs["calidad"]["tests"], "report_file": report_file}
 
-        except FileNotFoundError as e:
-            self.logger.error(f" Archivo no encontrado: {e}")
-            self.logger.error(" Verifica que los archivos CSV existan en la ruta especificada.")
-            raise
+        except Exception as e:
+            self.log_failure(e, resumable=True)
+            raise  # Re-lanzar para ver el traceback completo
 
-        except KeyError as e:
-            self.logger.error(f" Clave faltante en configuración: {e}")
-            self.logger.error(" Revisa tu archivo pipeline_config.yaml")
-            raise
+    def run_ingestion(self):
+        """
+        Solo la fase de ingesta: descarga el catálogo y convierte ventas e inventario a
+        Parquet (sin transformar). En modo incremental no se avanza el watermark.
 
-        except ValueError as e:
-            self.logger.error(f" Error de validación de datos: {e}")
+        Returns:
+            dict: DataFrames api, sales e inventory
+        """
+        from src.dag import run_dag
+
+        self.logger.info(" Iniciando ingesta de datos...")
+        try:
+            with self.create_metrics() as metrics, self.open_ingestion() as plan:
+                stages = [s for s in self.build_stages(plan, None, None) if s.name.startswith("ingesta")]
+                outputs = run_dag(stages, max_workers=self.config.get("dag", {}).get("max_workers"), metrics=metrics)
+            frames = {source: outputs[f"ingesta_{source}"]["df"] for source in ("api", "sales", "inventory")}
+            for source, df in frames.items():
+                self.logger.info(f"   {source}: {len(df)} filas")
+            self.logger.info(f" Parquet guardado en: {self.config['processing']['output_path']}")
+            return frames
+
+        except Exception as e:
+            self.log_failure(e)
             raise
 
+
+    def run_batch(self):
+        """
+        Modo por lotes: procesa cada shard de batch.shards (tienda o región con sus propios
+        CSV de ventas e inventario) en un proceso aparte y genera un reporte global a
+        partir de sus agregados parciales, sin concatenar los frames unidos.
+
+        Returns:
+            dict: results (resultados globales), tests y report_file
+        """
+        from src.api_client import ProductCatalogClient
+        from src.ingestion import IngestionPlan
+        from src.reporting import generate_html_report, generate_report
+        from src.sharding import merge_shard_results, merge_tests, run_shards
+
+        self.logger.info(" Iniciando pipeline por lotes (multi-tienda)...")
+
+        try:
+            api_cfg = self.config["api"]
+            proc_cfg = self.config["processing"]
+            qc_cfg = self.config.get("quality_checks", {})
+            output_cfg = self.config.get("output", {})
+            batch_cfg = self.config.get("batch", {})
+            shards = batch_cfg.get("shards") or []
+            if not shards:
+                raise ValueError(" No hay shards configurados en batch.shards")
+            reports_path = output_cfg.get("reports_path", "reports")
+
+            with self.create_metrics() as metrics:
+                # El catálogo es común a todas las tiendas: se descarga una sola vez
+                with metrics.stage("catalogo") as stage, ProductCatalogClient(
+                    api_cfg["url"],
+                    timeout=api_cfg.get("timeout", 30),
+                    retries=api_cfg.get("retries", 3),
+                    backoff_factor=api_cfg.get("backoff_factor", 0.5),
+                    cache_dir=api_cfg.get("cache_dir")
+                ) as api_client, IngestionPlan(api_cfg["url"], None, None, proc_cfg["output_path"],
+                                               api_client=api_client,
+                                               fast_path=proc_cfg.get("parquet_fast_path", False)) as plan:
+                    df_api = plan.load_api()
+                    stage["rows_out"] = len(df_api)
+
+                with metrics.stage("shards") as stage:
+                    partials = run_shards(self.config, shards, df_api, max_workers=batch_cfg.get("workers"))
+                    stage["rows_out"] = sum(p["registros"] for p in partials)
+                for partial in partials:
+                    self.logger.info(f"   Shard {partial['name']}: {partial['registros']} ventas, "
+                                     f"{len(partial['agregados_producto'])} productos en {partial['wall_s']:.3f}s")
+
+                with metrics.stage("fusion", rows_in=sum(len(p["agregados_producto"]) for p in partials)) as stage:
+                    results = merge_shard_results(partials)
+                    tests = merge_tests(partials, qc_cfg.get("sample_size", 5))
+                    stage["rows_out"] = len(results["agregados_producto"])
+
+                if not all(p["passed"] for p in partials):
+                    failed = {name: t["failed_rows"] for name, t in tests.items() if not t["passed"]}
+                    self.logger.warning(f" Algunos tests fallaron (filas con error): {failed}")
+
+                with metrics.stage("reporte", rows_in=len(results["merged"])):
+                    report_file = generate_report(
+                        results, tests, reports_path,
+                        max_rows=output_cfg.get("report_max_rows"),
+                        exports=output_cfg.get("exports"),
+                        export_workers=output_cfg.get("export_workers"),
+                        history_path=output_cfg.get("history_path")
+                    )
+                if output_cfg.get("html_report", False):
+                    with metrics.stage("reporte_html"):
+                        html_file = generate_html_report(results, tests, reports_path)
+                    self.logger.info(f" Reporte HTML generado: {html_file}")
+
+            self.logger.info("=" * 60)
+            self.logger.info(" PIPELINE POR LOTES EJECUTADO EXITOSAMENTE")
+            self.logger.info("=" * 60)
+            self.logger.info(f" Tiendas procesadas: {len(partials)}")
+            self.logger.info(f" Registros procesados: {results['registros']}")
+            self.logger.info(f"  Productos con stock crítico: {len(results['stock_critico'])}")
+            self.logger.info(f" Reporte guardado en: {report_file}")
+            self.logger.info("=" * 60)
+            return {"results": results, "tests": tests, "report_file": report_file}
+
         except Exception as e:
-            self.logger.error(f" Error inesperado durante la ejecución del pipeline: {e}")
-            self.logger.error(" Revisa el archivo pipeline_execution.log para más detalles")
+            self.log_failure(e)
             raise  # Re-lanzar para ver el traceback completo
 
 
+    def run_inventory_check(self):
+        """
+        Ruta solo de inventario, para ejecutarse con frecuencia: detecta stock crítico con
+        processing.critical_stock_threshold sin cargar ventas ni consultar el API (título y
+        categoría se toman de products.parquet si ya existe).
+
+        Returns:
+            dict: stock_critico y report_file
+        """
+        from src.ingestion import TRANSFORM_API_COLUMNS, IngestionPlan
+        from src.inventory import critical_stock_from_inventory
+        from src.reporting import generate_stock_report
+        from src.storage import read_parquet_projected
+
+        self.logger.info(" Iniciando verificación de stock (solo inventario)...")
+
+        try:
+            data_cfg = self.config["data_sources"]
+            proc_cfg = self.config["processing"]
+            output_cfg = self.config.get("output", {})
+            threshold = proc_cfg.get("critical_stock_threshold", 1.0)
+            products_file = f"{proc_cfg['output_path']}/products.parquet"
+
+            with self.create_metrics() as metrics:
+                with metrics.stage("ingesta_inventory") as stage, IngestionPlan(
+                    None, None, data_cfg["inventory_file"], proc_cfg["output_path"],
+                    chunk_size=proc_cfg.get("chunk_size"),
+                    fast_path=proc_cfg.get("parquet_fast_path", False),
+                    warm=self.dimensions
+                ) as plan:
+                    df_inventory = plan.load_inventory()
+                    plan.save_snapshots()
+                    stage["rows_out"] = len(df_inventory)
+                df_api = read_parquet_projected(products_file, TRANSFORM_API_COLUMNS) \
+                    if os.path.exists(products_file) else None
+
+                with metrics.stage("stock_critico", rows_in=len(df_inventory)) as stage:
+                    stock_critico = critical_stock_from_inventory(df_inventory, df_api, threshold)
+                    stage["rows_out"] = len(stock_critico)
+
+                with metrics.stage("reporte_stock", rows_in=len(stock_critico)):
+                    report_file = generate_stock_report(
+                        stock_critico, output_cfg.get("reports_path", "reports"), threshold,
+                        total_productos=len(df_inventory),
+                        max_rows=output_cfg.get("report_max_rows"),
+                        exports=output_cfg.get("exports")
+                    )
+
+            self.logger.info(f" Productos bajo el umbral ({threshold:g} x mínimo): {len(stock_critico)}")
+            self.logger.info(f" Reporte de stock: {report_file}")
+            return {"stock_critico": stock_critico, "report_file": report_file}
+
+        except Exception as e:
+            self.log_failure(e)
+            raise
+
+
 if __name__ == "__main__":
     # Ejecutar el pipeline
     pipeline = EcommerceDataPipeline("config/pipeline_config.yaml")
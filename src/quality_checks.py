@@ -1,22 +1,189 @@
 import pandas as pd
 
-def run_quality_checks(df: pd.DataFrame, qc_cfg: dict = None):
-    """Ejecuta pruebas de control de calidad sobre el DataFrame final."""
+from src.timeseries import parse_sale_days
 
-    tests = {
-        "precios_no_negativos": (df["price"] >= 0).all(),
-        "stock_valido": (df["current_stock"].apply(lambda x: isinstance(x, (int, float)) and x >= 0)).all(),
-        "categorias_no_nulas": df["category"].notna().all()
+# Valores por defecto equivalentes a la sección quality_checks de pipeline_config.yaml
+DEFAULT_QC_CONFIG = {
+    "required_columns": ["product_id", "price", "category"],
+    "price_min": 0,
+    "stock_min": 0,
+    "sample_size": 5,
+}
+
+# Reglas que se agregan siempre (además de las compiladas desde required_columns/price_min/stock_min)
+DEFAULT_RULES = [
+    {"name": "fechas_validas", "type": "date", "table": "sales", "column": "sale_date"},
+    {"name": "producto_unico_en_catalogo", "type": "unique", "table": "catalogue", "columns": ["product_id"]},
+    {"name": "ventas_con_producto_en_catalogo", "type": "foreign_key", "table": "sales", "column": "product_id",
+     "ref_table": "catalogue", "ref_column": "product_id"},
+]
+
+
+class _Table:
+    """Acceso a columnas por nombre normalizado (minúsculas, sin espacios) sin copiar el DataFrame."""
+
+    ALIASES = {"product_id": ["id"]}
+
+    def __init__(self, df):
+        self.df = df
+        self.names = {str(c).lower().strip(): c for c in df.columns}
+
+    def has(self, name):
+        return name in self.names or any(a in self.names for a in self.ALIASES.get(name, []))
+
+    def __getitem__(self, name):
+        for candidate in [name] + self.ALIASES.get(name, []):
+            if candidate in self.names:
+                return self.df[self.names[candidate]]
+        raise KeyError(name)
+
+
+# ------------------------------------------------------------------
+# Compiladores: cada tipo de regla devuelve una máscara de filas que fallan
+# ------------------------------------------------------------------
+def _fail_not_null(table, rule, tables):
+    return table[rule["column"]].isna()
+
+
+def _fail_range(table, rule, tables):
+    values = pd.to_numeric(table[rule["column"]], errors="coerce")
+    failing = values.isna()
+    if rule.get("min") is not None:
+        failing |= values < rule["min"]
+    if rule.get("max") is not None:
+        failing |= values > rule["max"]
+    return failing.fillna(True).astype(bool)
+
+
+def _fail_dtype(table, rule, tables):
+    series = table[rule["column"]]
+    if rule.get("dtype") == "numeric":
+        return pd.to_numeric(series, errors="coerce").isna() & series.notna()
+    if rule.get("dtype") == "datetime":
+        return parse_sale_days(series).isna() & series.notna()
+    raise ValueError(f" Tipo no soportado en regla dtype: {rule.get('dtype')}")
+
+
+def _fail_unique(table, rule, tables):
+    if len(rule["columns"]) == 1:
+        return table[rule["columns"][0]].duplicated(keep="first")
+    columns = pd.concat({c: table[c] for c in rule["columns"]}, axis=1)
+    return columns.duplicated(keep="first")
+
+
+def _fail_date(table, rule, tables):
+    return parse_sale_days(table[rule["column"]]).isna()
+
+
+def _fail_foreign_key(table, rule, tables):
+    reference = tables[rule["ref_table"]][rule.get("ref_column", rule["column"])]
+    values = table[rule["column"]]
+    return values.notna() & ~values.isin(reference.dropna().unique())
+
+
+RULE_TYPES = {
+    "not_null": _fail_not_null,
+    "range": _fail_range,
+    "dtype": _fail_dtype,
+    "unique": _fail_unique,
+    "date": _fail_date,
+    "foreign_key": _fail_foreign_key,
+}
+
+
+def compile_rules(qc_cfg=None):
+    """
+    Traduce la configuración de calidad a una lista de reglas declarativas.
+
+    - required_columns: la columna debe existir y no tener nulos en el frame unido
+    - price_min / stock_min: rangos mínimos de price y current_stock
+    - rules: reglas adicionales con el mismo formato que DEFAULT_RULES
+    """
+    cfg = {**DEFAULT_QC_CONFIG, **(qc_cfg or {})}
+    rules = [{"name": "columnas_requeridas", "type": "columns", "table": "merged",
+              "columns": list(cfg["required_columns"])}]
+    rules += [{"name": f"{col}_no_nulo", "type": "not_null", "table": "merged", "column": col}
+              for col in cfg["required_columns"]]
+    if cfg.get("price_min") is not None:
+        rules.append({"name": "precios_no_negativos", "type": "range", "table": "merged",
+                      "column": "price", "min": cfg["price_min"]})
+    if cfg.get("stock_min") is not None:
+        rules.append({"name": "stock_valido", "type": "range", "table": "merged",
+                      "column": "current_stock", "min": cfg["stock_min"]})
+    return rules + DEFAULT_RULES + list(cfg.get("rules", []))
+
+
+def _sample_keys(table, failing, sample_size):
+    """Primeras claves (product_id si existe, si no el índice) de las filas que fallan."""
+    keys = table["product_id"] if table.has("product_id") else table.df.index.to_series()
+    sample = keys[failing.to_numpy()].head(sample_size).tolist()
+    return [k.item() if hasattr(k, "item") else k for k in sample]
+
+
+def evaluate_rule(rule, tables, sample_size=5):
+    """
+    Evalúa una regla de forma vectorizada.
+
+    Returns:
+        dict con passed, failed_rows, sample (claves de ejemplo) y detail
+    """
+    if rule["table"] not in tables:
+        return None
+    table = tables[rule["table"]]
+
+    if rule["type"] == "columns":
+        missing = [c for c in rule["columns"] if not table.has(c)]
+        return {"passed": not missing, "failed_rows": 0, "sample": missing,
+                "detail": f"columnas faltantes: {missing}" if missing else ""}
+
+    needed = [rule[k] for k in ("column",) if k in rule] + rule.get("columns", [])
+    if rule["type"] == "foreign_key" and rule["ref_table"] not in tables:
+        return None
+    missing = [c for c in needed if not table.has(c)]
+    if missing:
+        return {"passed": False, "failed_rows": len(table.df), "sample": [],
+                "detail": f"columnas faltantes: {missing}"}
+
+    failing = RULE_TYPES[rule["type"]](table, rule, tables)
+    failed_rows = int(failing.sum())
+    return {
+        "passed": failed_rows == 0,
+        "failed_rows": failed_rows,
+        "sample": _sample_keys(table, failing, sample_size) if failed_rows else [],
+        "detail": f"{failed_rows} de {len(table.df)} filas en {rule['table']}" if failed_rows else "",
     }
 
-    passed = all(tests.values())
+
+def run_quality_checks(df: pd.DataFrame, qc_cfg: dict = None, sales: pd.DataFrame = None,
+                       catalogue: pd.DataFrame = None, inventory: pd.DataFrame = None):
+    """
+    Ejecuta pruebas de control de calidad con reglas vectorizadas compiladas desde qc_cfg.
+
+    Las reglas se evalúan sobre el DataFrame final ('merged') y, si se indican, sobre
+    las ventas, el catálogo y el inventario de origen (integridad referencial, unicidad, fechas).
+    Las reglas cuyas tablas no se proporcionan se omiten.
+
+    Returns:
+        tuple: (passed, tests) donde tests[nombre] = {'passed', 'failed_rows', 'sample', 'detail'}
+    """
+    cfg = {**DEFAULT_QC_CONFIG, **(qc_cfg or {})}
+    frames = {"merged": df, "sales": sales, "catalogue": catalogue, "inventory": inventory}
+    tables = {name: _Table(frame) for name, frame in frames.items() if frame is not None}
+
+    tests = {}
+    for rule in compile_rules(cfg):
+        result = evaluate_rule(rule, tables, cfg["sample_size"])
+        if result is not None:
+            tests[rule["name"]] = result
+
+    passed = all(t["passed"] for t in tests.values())
 
     if passed:
         print(" Todos los tests de calidad pasaron correctamente.")
     else:
         print(" Algunos tests de calidad fallaron:")
         for test, result in tests.items():
-            if not result:
-                print(f"    {test}")
+            if not result["passed"]:
+                print(f"    {test}: {result['detail']} (ej.: {result['sample']})")
 
     return passed, tests
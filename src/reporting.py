@@ -1,8 +1,120 @@
+import io
+import itertools
+import json
+import numpy as np
 import pandas as pd
 import os
 from datetime import datetime
 
-def generate_report(results, tests, output_path):
+from src.exports import export_frames, export_path, export_settings
+from src.history import category_deltas, previous_run_id, record_run, top_product_deltas
+
+# Exportaciones que se listan en el pie del reporte (si se escribieron), en este orden
+FOOTER_EXPORTS = {
+    "stock_critico": "Stock crítico",
+    "top_productos": "Top productos",
+    "ventas_categoria": "Ventas por categoría",
+    "velocidad_productos": "Velocidad de ventas",
+}
+
+
+def _text(values, width, cut=None):
+    """Columna de texto recortada a 'cut' caracteres y alineada a la izquierda en 'width'."""
+    return values.astype(str).str.slice(0, cut).str.ljust(width)
+
+
+def _number(values, fmt):
+    """Columna numérica pre-formateada con un formato de str.format (p. ej. '{:>12,}')."""
+    return values.map(fmt.format).astype(str)
+
+
+def _rows(*columns):
+    """Une columnas ya formateadas en líneas de texto (un solo join por sección)."""
+    line = pd.Series(np.asarray(columns[0], dtype=object))
+    for col in columns[1:]:
+        line = line + " " + np.asarray(col, dtype=object)
+    return "".join(line + "\n")
+
+
+def _capped(df, max_rows):
+    """Primeras max_rows filas de df y cuántas quedan fuera (None = sin límite)."""
+    if max_rows is None or len(df) <= max_rows:
+        return df, 0
+    return df.head(max_rows), len(df) - max_rows
+
+
+def _more_footer(remaining):
+    return f"  ... y {remaining:,} más\n" if remaining else ""
+
+
+def _section(f, numbers, title):
+    """Encabezado de sección numerado en orden: las secciones opcionales omitidas no dejan huecos."""
+    f.write("-" * 70 + "\n")
+    f.write(f"{next(numbers)}. {title}\n")
+    f.write("-" * 70 + "\n\n")
+
+
+def summary_stats(df, total_registros):
+    """Estadísticas generales del reporte, calculadas una sola vez sobre el frame unido."""
+    sum_cols = [c for c in ("quantity", "total_sale_value", "rentabilidad") if c in df.columns]
+    sums = df[sum_cols].sum()
+    return {
+        "registros": total_registros,
+        "productos": df["product_id"].nunique(),
+        "categorias": df["category"].nunique(),
+        **{col: sums[col] for col in sum_cols},
+    }
+
+
+def export_results(results, output_path, timestamp=None, exports=None, export_workers=None):
+    """
+    Exporta los resultados tabulares (stock crítico, top productos, ventas por categoría,
+    dataset procesado y, si hay series temporales, velocidad de ventas y ventas diarias por
+    categoría) en paralelo, con el formato de output.exports.
+
+    Returns:
+        dict: {nombre: ruta escrita}
+    """
+    os.makedirs(output_path, exist_ok=True)
+    timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+    settings = export_settings(exports)
+    paths = {name: export_path(output_path, name, timestamp, cfg["format"]) for name, cfg in settings.items()}
+    stock_critico = results["stock_critico"]
+    ventas_categoria = results.get("ventas_categoria", pd.DataFrame())
+    frames = {}
+    
+    # 1: Stock crítico
+    if len(stock_critico) > 0:
+        # En modo por lotes el stock crítico es por tienda
+        columnas = ['tienda'] * ('tienda' in stock_critico.columns) + ['product_id', 'title', 'category',
+                                                                        'current_stock', 'min_stock']
+        stock_critico_export = stock_critico[columnas].copy()
+        stock_critico_export['deficit'] = stock_critico_export['min_stock'] - stock_critico_export['current_stock']
+        frames["stock_critico"] = stock_critico_export
+    
+    # 2: Top productos
+    frames["top_productos"] = results["top_productos"]
+    
+    # 3: Ventas por categoría
+    if not ventas_categoria.empty:
+        frames["ventas_categoria"] = ventas_categoria
+    
+    # 4: Dataset completo procesado (opcional, útil para análisis posteriores)
+    # Con el plan pre-agregado sin materializar, 'merged' tiene una fila por producto
+    if results.get("merged_materializado", True):
+        frames["datos_procesados"] = results["merged"]
+    
+    # 5: Series temporales (etapa series_temporales)
+    for name in ("velocidad_productos", "ventas_diarias_categoria"):
+        if name in results:
+            frames[name] = results[name]
+    
+    frames = {name: frame for name, frame in frames.items() if settings[name]["enabled"]}
+    return export_frames(frames, paths, settings, max_workers=export_workers)
+
+
+def generate_report(results, tests, output_path, max_rows=None, exports=None, export_workers=None,
+                    history_path=None, exported=None):
     """
     Genera un reporte completo en formato texto y exporta CSVs con los resultados del pipeline.
     
@@ -14,6 +126,13 @@ def generate_report(results, tests, output_path):
             - 'ventas_categoria': DataFrame con ventas agregadas por categoría
         tests: Diccionario con resultados de tests de calidad
         output_path: Ruta donde guardar el reporte
+        max_rows: Máximo de filas por tabla del reporte (el resto se resume como "... y N más")
+        exports: Sección output.exports (formato, enabled y chunk_size por archivo)
+        export_workers: Hilos para escribir las exportaciones en paralelo
+        history_path: Base SQLite del historial; si se indica, se registra la ejecución y se
+            agregan los cambios respecto a la anterior
+        exported: Resultado de export_results si las exportaciones ya se escribieron
+            (p. ej. en una etapa paralela); en ese caso no se vuelven a exportar
     
     Returns:
         str: Ruta del archivo de reporte generado
@@ -30,199 +149,280 @@ def generate_report(results, tests, output_path):
     stock_critico = results["stock_critico"]
     top_productos = results["top_productos"]
     ventas_categoria = results.get("ventas_categoria", pd.DataFrame())
+    stats = summary_stats(df, results.get("registros", len(df)))
+    settings = export_settings(exports)
     
     # ============================================================
     # GENERAR REPORTE EN TEXTO
     # ============================================================
-    with open(report_file, 'w', encoding='utf-8') as f:
-        # --- ENCABEZADO ---
-        f.write("=" * 70 + "\n")
-        f.write("         REPORTE DE EJECUCIÓN - PIPELINE E-COMMERCE\n")
-        f.write("=" * 70 + "\n")
-        f.write(f"Fecha de ejecución: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Timestamp: {timestamp}\n")
-        f.write("=" * 70 + "\n\n")
-        
-        # --- SECCIÓN 1: TESTS DE CALIDAD DE DATOS ---
+    # Las secciones se escriben en memoria y se vuelcan al archivo de una sola vez
+    f = io.StringIO()
+    sections = itertools.count(1)
+    
+    # --- ENCABEZADO ---
+    f.write("=" * 70 + "\n")
+    f.write("         REPORTE DE EJECUCIÓN - PIPELINE E-COMMERCE\n")
+    f.write("=" * 70 + "\n")
+    f.write(f"Fecha de ejecución: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+    f.write(f"Timestamp: {timestamp}\n")
+    f.write("=" * 70 + "\n\n")
+    
+    # --- SECCIÓN 1: TESTS DE CALIDAD DE DATOS ---
+    _section(f, sections, "TESTS DE CALIDAD DE DATOS")
+    
+    all_passed = all(t["passed"] for t in tests.values())
+    if all_passed:
+        f.write("✓ ESTADO GENERAL: TODOS LOS TESTS PASARON\n\n")
+    else:
+        f.write("✗ ESTADO GENERAL: ALGUNOS TESTS FALLARON\n\n")
+    
+    f.write("Resultados detallados:\n")
+    for test_name, result in tests.items():
+        status = "✓ PASÓ" if result["passed"] else "✗ FALLÓ"
+        status_symbol = "  [OK]" if result["passed"] else "  [FALLO]"
+        f.write(f"  {status_symbol} {test_name.replace('_', ' ').title()}: {status}\n")
+        if not result["passed"]:
+            f.write(f"          {result['detail']}; ejemplos: {result['sample']}\n")
+    
+    f.write("\n")
+    
+    # --- SECCIÓN 2: ESTADÍSTICAS GENERALES ---
+    _section(f, sections, "ESTADÍSTICAS GENERALES DEL PIPELINE")
+    
+    f.write(f"  Total de registros procesados: {stats['registros']:,}\n")
+    f.write(f"  Productos únicos: {stats['productos']:,}\n")
+    f.write(f"  Categorías distintas: {stats['categorias']:,}\n")
+    f.write(f"  Total de unidades vendidas: {stats['quantity']:,.0f}\n")
+    
+    if 'total_sale_value' in stats:
+        f.write(f"  Valor total de ventas: ${stats['total_sale_value']:,.2f}\n")
+    
+    if 'rentabilidad' in stats:
+        rentabilidad_total = stats['rentabilidad']
+        f.write(f"  Rentabilidad total: ${rentabilidad_total:,.2f}\n")
+        if rentabilidad_total > 0:
+            f.write(f"  Margen promedio: {(rentabilidad_total / stats['total_sale_value'] * 100):.2f}%\n")
+    
+    f.write("\n")
+    
+    # --- SECCIÓN 3: PRODUCTOS CON STOCK CRÍTICO ---
+    _section(f, sections, "ALERTA: PRODUCTOS CON STOCK CRÍTICO")
+    
+    if len(stock_critico) > 0:
+        f.write(f"  ATENCIÓN: {len(stock_critico)} producto(s) con stock por debajo del mínimo\n\n")
+        f.write(f"{'Producto':<40} {'Stock Actual':>12} {'Stock Mínimo':>12} {'Déficit':>10}\n")
         f.write("-" * 70 + "\n")
-        f.write("1. TESTS DE CALIDAD DE DATOS\n")
-        f.write("-" * 70 + "\n\n")
         
-        all_passed = all(tests.values())
-        if all_passed:
-            f.write("✓ ESTADO GENERAL: TODOS LOS TESTS PASARON\n\n")
+        filas, restantes = _capped(stock_critico, max_rows)
+        if 'title' in filas.columns:
+            nombres, corte = filas['title'], 38
         else:
-            f.write("✗ ESTADO GENERAL: ALGUNOS TESTS FALLARON\n\n")
-        
-        f.write("Resultados detallados:\n")
-        for test_name, result in tests.items():
-            status = "✓ PASÓ" if result else "✗ FALLÓ"
-            status_symbol = "  [OK]" if result else "  [FALLO]"
-            f.write(f"  {status_symbol} {test_name.replace('_', ' ').title()}: {status}\n")
+            nombres, corte = "ID: " + filas['product_id'].astype(str), 40
+        if 'tienda' in filas.columns:
+            nombres, corte = "[" + filas['tienda'].astype(str) + "] " + nombres.astype(str), 38
+        nombres = _text(nombres, 40, corte)
+        current = filas['current_stock'].astype('int64')
+        minimum = filas['min_stock'].astype('int64')
+        f.write(_rows(
+            nombres,
+            _number(current, "{:>12}"),
+            _number(minimum, "{:>12}"),
+            _number(minimum - current, "{:>10}"),
+        ))
+        f.write(_more_footer(restantes))
         
-        f.write("\n")
-        
-        # --- SECCIÓN 2: ESTADÍSTICAS GENERALES ---
+        f.write("\n RECOMENDACIÓN: Reabastecer estos productos urgentemente.\n")
+    else:
+        f.write("✓ Excelente: No hay productos con stock crítico.\n")
+        f.write("  Todos los productos tienen inventario por encima del mínimo requerido.\n")
+    
+    f.write("\n")
+    
+    # --- SECCIÓN 4: TOP PRODUCTOS MÁS VENDIDOS ---
+    _section(f, sections, "TOP 10 PRODUCTOS MÁS VENDIDOS")
+    
+    top_10 = top_productos.head(10 if max_rows is None else min(10, max_rows))
+    f.write(f"{'#':<4} {'Producto':<45} {'Unidades':>15}\n")
+    f.write("-" * 70 + "\n")
+    
+    if len(top_10) > 0:
+        if 'title' in top_10.columns:
+            nombres = _text(top_10['title'], 45, 43)
+        else:
+            nombres = _text("ID: " + top_10['product_id'].astype(str), 45, 45)
+        cantidad_col = 'total_vendido' if 'total_vendido' in top_10.columns else 'quantity'
+        ranks = pd.Series(range(1, len(top_10) + 1), index=top_10.index)
+        f.write(_rows(
+            _number(ranks, "{:<4}"),
+            nombres,
+            _number(top_10[cantidad_col].astype('int64'), "{:>15,}"),
+        ))
+    
+    f.write("\n")
+    
+    # --- SECCIÓN 5: VENTAS POR CATEGORÍA ---
+    _section(f, sections, "ANÁLISIS DE VENTAS POR CATEGORÍA")
+    
+    if not ventas_categoria.empty:
+        f.write(f"{'Categoría':<25} {'Unidades':>12} {'Valor Total':>15} {'Rentabilidad':>15}\n")
         f.write("-" * 70 + "\n")
-        f.write("2. ESTADÍSTICAS GENERALES DEL PIPELINE\n")
-        f.write("-" * 70 + "\n\n")
-        
-        f.write(f"  Total de registros procesados: {len(df):,}\n")
-        f.write(f"  Productos únicos: {df['product_id'].nunique():,}\n")
-        f.write(f"  Categorías distintas: {df['category'].nunique():,}\n")
-        f.write(f"  Total de unidades vendidas: {df['quantity'].sum():,.0f}\n")
-        
-        if 'total_sale_value' in df.columns:
-            f.write(f"  Valor total de ventas: ${df['total_sale_value'].sum():,.2f}\n")
         
-        if 'rentabilidad' in df.columns:
-            rentabilidad_total = df['rentabilidad'].sum()
-            f.write(f"  Rentabilidad total: ${rentabilidad_total:,.2f}\n")
-            if rentabilidad_total > 0:
-                f.write(f"  Margen promedio: {(rentabilidad_total / df['total_sale_value'].sum() * 100):.2f}%\n")
+        filas, restantes = _capped(ventas_categoria, max_rows)
+        f.write(_rows(
+            _text(filas['category'], 25, 23),
+            _number(filas['unidades_vendidas'].astype('int64'), "{:>12,}"),
+            "$" + _number(filas['ventas_totales'].astype('float64'), "{:>14,.2f}"),
+            "$" + _number(filas['rentabilidad_total'].astype('float64'), "{:>14,.2f}"),
+        ))
+        f.write(_more_footer(restantes))
+    else:
+        # Si no existe el dataframe de ventas_categoria, calcularlo desde merged
+        ventas_cat = df.groupby('category', observed=True).agg({
+            'quantity': 'sum',
+            'total_sale_value': 'sum' if 'total_sale_value' in df.columns else 'count'
+        }).sort_values('quantity', ascending=False)
         
-        f.write("\n")
-        
-        # --- SECCIÓN 3: PRODUCTOS CON STOCK CRÍTICO ---
+        f.write(f"{'Categoría':<40} {'Unidades Vendidas':>25}\n")
         f.write("-" * 70 + "\n")
-        f.write("3. ALERTA: PRODUCTOS CON STOCK CRÍTICO\n")
-        f.write("-" * 70 + "\n\n")
         
-        if len(stock_critico) > 0:
-            f.write(f"  ATENCIÓN: {len(stock_critico)} producto(s) con stock por debajo del mínimo\n\n")
-            f.write(f"{'Producto':<40} {'Stock Actual':>12} {'Stock Mínimo':>12} {'Déficit':>10}\n")
-            f.write("-" * 70 + "\n")
-            
-            for _, row in stock_critico.iterrows():
-                product_name = str(row['title'])[:38] if 'title' in row else f"ID: {row['product_id']}"
-                current = int(row['current_stock'])
-                minimum = int(row['min_stock'])
-                deficit = minimum - current
-                
-                f.write(f"{product_name:<40} {current:>12} {minimum:>12} {deficit:>10}\n")
-            
-            f.write("\n RECOMENDACIÓN: Reabastecer estos productos urgentemente.\n")
-        else:
-            f.write("✓ Excelente: No hay productos con stock crítico.\n")
-            f.write("  Todos los productos tienen inventario por encima del mínimo requerido.\n")
-        
-        f.write("\n")
+        filas, restantes = _capped(ventas_cat, max_rows)
+        if len(filas) > 0:
+            f.write(_rows(
+                _text(filas.index.to_series(), 40),
+                _number(filas['quantity'].astype('int64'), "{:>25,}"),
+            ))
+        f.write(_more_footer(restantes))
+    
+    f.write("\n")
+    
+    # --- SECCIÓN OPCIONAL: RESUMEN DE RENTABILIDAD ---
+    if 'rentabilidad' in df.columns:
+        _section(f, sections, "ANÁLISIS DE RENTABILIDAD")
         
-        # --- SECCIÓN 4: TOP PRODUCTOS MÁS VENDIDOS ---
-        f.write("-" * 70 + "\n")
-        f.write("4. TOP 10 PRODUCTOS MÁS VENDIDOS\n")
-        f.write("-" * 70 + "\n\n")
+        # Reutilizar los agregados por producto de la transformación si están disponibles
+        agregados_producto = results.get("agregados_producto")
+        if agregados_producto is not None:
+            rentabilidad_por_producto = (
+                agregados_producto[agregados_producto['title'].notna()]
+                .set_index('title')['rentabilidad']
+                .nlargest(5)
+            )
+        else:
+            rentabilidad_por_producto = df.groupby('title', observed=True)['rentabilidad'].sum().nlargest(5)
         
-        top_10 = top_productos.head(10)
-        f.write(f"{'#':<4} {'Producto':<45} {'Unidades':>15}\n")
+        f.write("Top 5 productos más rentables:\n")
+        f.write(f"{'Producto':<45} {'Rentabilidad':>20}\n")
         f.write("-" * 70 + "\n")
         
-        for idx, row in top_10.iterrows():
-            rank = idx + 1
-            product_name = str(row['title'])[:43] if 'title' in row else f"ID: {row['product_id']}"
-            cantidad_col = 'total_vendido' if 'total_vendido' in row else 'quantity'
-            cantidad = int(row[cantidad_col])
-            
-            f.write(f"{rank:<4} {product_name:<45} {cantidad:>15,}\n")
+        if len(rentabilidad_por_producto) > 0:
+            f.write(_rows(
+                _text(rentabilidad_por_producto.index.to_series(), 45, 43),
+                "$" + _number(rentabilidad_por_producto.astype('float64'), "{:>19,.2f}"),
+            ))
         
         f.write("\n")
+    
+    # --- SECCIÓN OPCIONAL: CAMBIOS RESPECTO A LA EJECUCIÓN ANTERIOR ---
+    if history_path:
+        record_run(history_path, timestamp, stats, results, tests)
+        anterior = previous_run_id(history_path, timestamp)
         
-        # --- SECCIÓN 5: VENTAS POR CATEGORÍA ---
-        f.write("-" * 70 + "\n")
-        f.write("5. ANÁLISIS DE VENTAS POR CATEGORÍA\n")
-        f.write("-" * 70 + "\n\n")
+        _section(f, sections, "CAMBIOS RESPECTO A LA EJECUCIÓN ANTERIOR")
         
-        if not ventas_categoria.empty:
-            f.write(f"{'Categoría':<25} {'Unidades':>12} {'Valor Total':>15} {'Rentabilidad':>15}\n")
-            f.write("-" * 70 + "\n")
-            
-            for _, row in ventas_categoria.iterrows():
-                categoria = str(row['category'])[:23]
-                unidades = int(row['unidades_vendidas'])
-                ventas = float(row['ventas_totales'])
-                rentab = float(row['rentabilidad_total'])
-                
-                f.write(f"{categoria:<25} {unidades:>12,} ${ventas:>14,.2f} ${rentab:>14,.2f}\n")
+        if anterior is None:
+            f.write("  Primera ejecución registrada en el historial.\n")
         else:
-            # Si no existe el dataframe de ventas_categoria, calcularlo desde merged
-            ventas_cat = df.groupby('category').agg({
-                'quantity': 'sum',
-                'total_sale_value': 'sum' if 'total_sale_value' in df.columns else 'count'
-            }).sort_values('quantity', ascending=False)
+            f.write(f"  Ejecución anterior: {anterior}\n\n")
             
-            f.write(f"{'Categoría':<40} {'Unidades Vendidas':>25}\n")
+            deltas = category_deltas(history_path, timestamp, anterior)
+            f.write(f"{'Categoría':<25} {'Unidades':>10} {'Δ Unidades':>11} {'Δ Ventas':>20}\n")
             f.write("-" * 70 + "\n")
+            filas, restantes = _capped(deltas, max_rows)
+            if len(filas) > 0:
+                f.write(_rows(
+                    _text(filas['category'], 25, 23),
+                    _number(filas['unidades'], "{:>10,.0f}"),
+                    _number(filas['delta_unidades'], "{:>+11,.0f}"),
+                    _number(filas['delta_ventas'], "{:>+20,.2f}"),
+                ))
+            f.write(_more_footer(restantes))
             
-            for categoria, row in ventas_cat.iterrows():
-                f.write(f"{str(categoria):<40} {int(row['quantity']):>25,}\n")
+            top = top_product_deltas(history_path, timestamp, anterior)
+            f.write(f"\n{'#':<4} {'Producto':<35} {'Unidades':>10} {'Antes':>6} {'Δ Unidades':>11}\n")
+            f.write("-" * 70 + "\n")
+            if len(top) > 0:
+                f.write(_rows(
+                    _number(top['rank'], "{:<4}"),
+                    _text(top['title'], 35, 33),
+                    _number(top['total_vendido'], "{:>10,.0f}"),
+                    top['rank_anterior'].map("{:>6.0f}".format).where(top['rank_anterior'].notna(), f"{'nuevo':>6}"),
+                    top['delta_vendido'].map("{:>+11,.0f}".format).where(top['delta_vendido'].notna(), f"{'-':>11}"),
+                ))
         
         f.write("\n")
-        
-        # --- SECCIÓN 6: RESUMEN DE RENTABILIDAD ---
-        if 'rentabilidad' in df.columns:
-            f.write("-" * 70 + "\n")
-            f.write("6. ANÁLISIS DE RENTABILIDAD\n")
-            f.write("-" * 70 + "\n\n")
-            
-            rentabilidad_por_producto = df.groupby('title')['rentabilidad'].sum().sort_values(ascending=False)
-            
-            f.write("Top 5 productos más rentables:\n")
-            f.write(f"{'Producto':<45} {'Rentabilidad':>20}\n")
+    
+    # --- SECCIÓN OPCIONAL: RESUMEN POR TIENDA (modo por lotes) ---
+    tiendas = results.get("tiendas")
+    if tiendas is not None and len(tiendas) > 0:
+        _section(f, sections, "RESUMEN POR TIENDA")
+        f.write(f"{'Tienda':<20} {'Registros':>10} {'Unidades':>10} {'Ventas':>16} {'Stock crít.':>11}\n")
+        f.write("-" * 70 + "\n")
+        filas, restantes = _capped(tiendas, max_rows)
+        f.write(_rows(
+            _text(filas['tienda'].astype(str), 20, 18),
+            _number(filas['registros'], "{:>10,}"),
+            _number(filas['unidades'], "{:>10,.0f}"),
+            "$" + _number(filas['ventas'].astype('float64'), "{:>15,.2f}"),
+            _number(filas['stock_critico'], "{:>11}"),
+        ))
+        f.write(_more_footer(restantes))
+        f.write("\n")
+    
+    # --- SECCIÓN OPCIONAL: VELOCIDAD DE VENTAS Y DÍAS DE STOCK (series temporales) ---
+    velocidad = results.get("velocidad_productos")
+    if velocidad is not None:
+        ventanas = [c for c in velocidad.columns if c.startswith("velocidad_")]
+        _section(f, sections, "VELOCIDAD DE VENTAS Y DÍAS DE STOCK")
+        f.write(f"  Fecha de corte: {results.get('fecha_corte') or '-'} (velocidad = unidades/día)\n\n")
+        estimados = velocidad[velocidad['dias_stock'].notna()]
+        if len(estimados) > 0:
+            f.write(f"{'Producto':<23} {'Stock':>7} " + " ".join(f"{'Vel. ' + c[10:]:>9}" for c in ventanas)
+                    + f" {'Días':>7} {'Quiebre':>10}\n")
             f.write("-" * 70 + "\n")
-            
-            for producto, rentab in rentabilidad_por_producto.head(5).items():
-                producto_name = str(producto)[:43]
-                f.write(f"{producto_name:<45} ${rentab:>19,.2f}\n")
-            
-            f.write("\n")
-        
-        # --- PIE DE PÁGINA ---
-        f.write("=" * 70 + "\n")
-        f.write("FIN DEL REPORTE\n")
-        f.write("=" * 70 + "\n")
-        f.write(f"\nArchivos exportados:\n")
-        f.write(f"  - Reporte principal: {report_file}\n")
-        f.write(f"  - Stock crítico: {output_path}/stock_critico_{timestamp}.csv\n")
-        f.write(f"  - Top productos: {output_path}/top_productos_{timestamp}.csv\n")
-        if not ventas_categoria.empty:
-            f.write(f"  - Ventas por categoría: {output_path}/ventas_categoria_{timestamp}.csv\n")
+            filas = estimados.head(10 if max_rows is None else min(10, max_rows))
+            nombres = filas['title'].where(filas['title'].notna(), "ID: " + filas['product_id'].astype(str))
+            f.write(_rows(
+                _text(nombres, 23, 21),
+                _number(filas['current_stock'].astype('int64'), "{:>7,}"),
+                *[_number(filas[c], "{:>9.2f}") for c in ventanas],
+                _number(filas['dias_stock'], "{:>7.1f}"),
+                filas['fecha_quiebre'].dt.strftime("%Y-%m-%d").str.rjust(10),
+            ))
+            f.write(f"\n  {len(estimados)} producto(s) con ventas recientes; se listan los que se agotan antes.\n")
+        else:
+            f.write("  Sin ventas en la ventana más corta: no se pueden estimar días de stock.\n")
         f.write("\n")
     
     # ============================================================
-    # EXPORTAR ARCHIVOS CSV
+    # EXPORTAR ARCHIVOS (en paralelo, formato según output.exports)
     # ============================================================
+    # Antes del pie, para listar solo los archivos que realmente se escribieron
+    if exported is None:
+        exported = export_results(results, output_path, timestamp, exports, export_workers)
     
-    # CSV 1: Stock crítico
-    if len(stock_critico) > 0:
-        stock_critico_export = stock_critico[['product_id', 'title', 'category', 'current_stock', 'min_stock']].copy()
-        stock_critico_export['deficit'] = stock_critico_export['min_stock'] - stock_critico_export['current_stock']
-        stock_critico_export.to_csv(
-            f"{output_path}/stock_critico_{timestamp}.csv", 
-            index=False, 
-            encoding='utf-8-sig'  # Para Excel
-        )
-    
-    # CSV 2: Top productos
-    top_productos.to_csv(
-        f"{output_path}/top_productos_{timestamp}.csv", 
-        index=False, 
-        encoding='utf-8-sig'
-    )
-    
-    # CSV 3: Ventas por categoría
-    if not ventas_categoria.empty:
-        ventas_categoria.to_csv(
-            f"{output_path}/ventas_categoria_{timestamp}.csv", 
-            index=False, 
-            encoding='utf-8-sig'
-        )
-    
-    # CSV 4: Dataset completo procesado (opcional, útil para análisis posteriores)
-    df.to_csv(
-        f"{output_path}/datos_procesados_{timestamp}.csv",
-        index=False,
-        encoding='utf-8-sig'
-    )
+    # --- PIE DE PÁGINA ---
+    f.write("=" * 70 + "\n")
+    f.write("FIN DEL REPORTE\n")
+    f.write("=" * 70 + "\n")
+    f.write(f"\nArchivos exportados:\n")
+    f.write(f"  - Reporte principal: {report_file}\n")
+    for name, label in FOOTER_EXPORTS.items():
+        if name in exported:
+            f.write(f"  - {label}: {exported[name]}\n")
+    f.write("\n")
+    
+    with open(report_file, 'w', encoding='utf-8') as out:
+        out.write(f.getvalue())
     
     # ============================================================
     # MENSAJE DE CONFIRMACIÓN EN CONSOLA
@@ -232,18 +432,266 @@ def generate_report(results, tests, output_path):
     print(f"{'=' * 70}")
     print(f" Reporte principal: {report_file}")
     print(f" Directorio de salida: {output_path}")
-    print(f" Archivos CSV exportados: 4")
+    print(f" Archivos exportados: {len(exported)} "
+          f"({', '.join(sorted({settings[name]['format'] for name in exported}))})")
     print(f"{'=' * 70}\n")
     
     return report_file
 
 
-def generate_html_report(results, tests, output_path):
+def generate_stock_report(stock_critico, output_path, threshold=1.0, total_productos=None, max_rows=None,
+                          exports=None):
+    """
+    Reporte breve de stock crítico calculado solo a partir del inventario
+    (ver src/inventory.py), pensado para ejecutarse con frecuencia.
+
+    Escribe stock_report_{timestamp}.txt y exporta el detalle como stock_critico en el
+    formato configurado en output.exports.
+
+    Returns:
+        str: Ruta del archivo de reporte generado
     """
-    [OPCIONAL] Genera un reporte en formato HTML con visualizaciones básicas.
-    Requiere que tengas los datos procesados.
+    os.makedirs(output_path, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    report_file = f"{output_path}/stock_report_{timestamp}.txt"
+    settings = export_settings(exports)
+    
+    f = io.StringIO()
+    f.write("=" * 70 + "\n")
+    f.write("         REPORTE DE STOCK CRÍTICO (SOLO INVENTARIO)\n")
+    f.write("=" * 70 + "\n")
+    f.write(f"Fecha de ejecución: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+    f.write(f"Umbral: stock actual < {threshold:g} x stock mínimo\n")
+    if total_productos is not None:
+        f.write(f"Productos en inventario: {total_productos:,}\n")
+    f.write("=" * 70 + "\n\n")
     
-    Esta función es una mejora futura que podrías implementar.
+    if len(stock_critico) > 0:
+        f.write(f"  ATENCIÓN: {len(stock_critico)} producto(s) por debajo del umbral\n\n")
+        f.write(f"{'Producto':<34} {'Actual':>8} {'Mínimo':>8} {'Umbral':>8} {'Cobertura':>9}\n")
+        f.write("-" * 70 + "\n")
+        filas, restantes = _capped(stock_critico, max_rows)
+        nombres = filas['title'].where(filas['title'].notna(), "ID: " + filas['product_id'].astype(str))
+        f.write(_rows(
+            _text(nombres, 34, 32),
+            _number(filas['current_stock'], "{:>8}"),
+            _number(filas['min_stock'], "{:>8}"),
+            _number(filas['umbral'], "{:>8.1f}"),
+            _number(filas['cobertura'], "{:>9.0%}"),
+        ))
+        f.write(_more_footer(restantes))
+    else:
+        f.write("✓ Ningún producto por debajo del umbral de stock.\n")
+    
+    exported = {}
+    if len(stock_critico) > 0 and settings["stock_critico"]["enabled"]:
+        cfg = settings["stock_critico"]
+        path = export_path(output_path, "stock_critico", timestamp, cfg["format"])
+        exported = export_frames({"stock_critico": stock_critico}, {"stock_critico": path}, settings)
+        f.write(f"\nDetalle exportado: {path}\n")
+    
+    with open(report_file, 'w', encoding='utf-8') as out:
+        out.write(f.getvalue())
+    
+    print(f" Reporte de stock: {report_file} ({len(stock_critico)} productos críticos, "
+          f"{len(exported)} archivo(s) exportado(s))")
+    return report_file
+
+
+# Filas por página en las tablas del reporte HTML
+HTML_PAGE_SIZE = 25
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<title>Reporte pipeline e-commerce - __TIMESTAMP__</title>
+<style>
+  body { font-family: system-ui, sans-serif; margin: 2rem; color: #222; }
+  h1 { font-size: 1.4rem; } h2 { font-size: 1.1rem; margin-top: 2rem; }
+  .stats { display: flex; flex-wrap: wrap; gap: 1rem; }
+  .stat { border: 1px solid #ddd; border-radius: 6px; padding: .6rem 1rem; }
+  .stat b { display: block; font-size: 1.2rem; }
+  table { border-collapse: collapse; width: 100%; font-size: .9rem; }
+  th, td { border-bottom: 1px solid #eee; padding: .3rem .6rem; text-align: left; }
+  th { cursor: pointer; background: #f6f6f6; user-select: none; }
+  td.num { text-align: right; font-variant-numeric: tabular-nums; }
+  .ok { color: #1a7f37; } .fail { color: #cf222e; }
+  .pager { margin: .4rem 0; font-size: .85rem; } .pager button { margin: 0 .3rem; }
+</style>
+</head>
+<body>
+<h1>Reporte de ejecución - pipeline e-commerce</h1>
+<p>Generado: __GENERATED__</p>
+<div id="stats" class="stats"></div>
+<h2>Tests de calidad</h2>
+<ul id="tests"></ul>
+<div id="tables"></div>
+<script id="report-data" type="application/json">__DATA__</script>
+<script>
+(function () {
+  var report = JSON.parse(document.getElementById("report-data").textContent);
+  var pageSize = report.page_size;
+  var fmt = new Intl.NumberFormat("es", { maximumFractionDigits: 2 });
+
+  report.stats.forEach(function (s) {
+    var div = document.createElement("div");
+    div.className = "stat";
+    div.innerHTML = "<b></b><span></span>";
+    div.firstChild.textContent = typeof s[1] === "number" ? fmt.format(s[1]) : s[1];
+    div.lastChild.textContent = s[0];
+    document.getElementById("stats").appendChild(div);
+  });
+
+  report.tests.forEach(function (t) {
+    var li = document.createElement("li");
+    li.className = t.passed ? "ok" : "fail";
+    li.textContent = (t.passed ? "✓ " : "✗ ") + t.name + (t.passed ? "" : " - " + t.detail + " (ej.: " + t.sample.join(", ") + ")");
+    document.getElementById("tests").appendChild(li);
+  });
+
+  // Cada tabla llega en formato columnar: {title, columns, data: {columna: [valores]}}
+  report.tables.forEach(function (table) {
+    var n = table.columns.length ? table.data[table.columns[0]].length : 0;
+    var order = Array.from({ length: n }, function (_, i) { return i; });
+    var state = { page: 0, sortCol: null, asc: true };
+
+    var section = document.createElement("section");
+    section.innerHTML = "<h2></h2><div class='pager'></div><table><thead><tr></tr></thead><tbody></tbody></table>";
+    section.querySelector("h2").textContent = table.title + " (" + n + ")";
+    var pager = section.querySelector(".pager");
+    var head = section.querySelector("thead tr");
+    var body = section.querySelector("tbody");
+
+    table.columns.forEach(function (col) {
+      var th = document.createElement("th");
+      th.textContent = col;
+      th.onclick = function () {
+        state.asc = state.sortCol === col ? !state.asc : false;
+        state.sortCol = col;
+        var values = table.data[col];
+        order.sort(function (a, b) {
+          var x = values[a], y = values[b];
+          if (x === y) return a - b;
+          if (x === null) return 1;
+          if (y === null) return -1;
+          return (x < y ? -1 : 1) * (state.asc ? 1 : -1);
+        });
+        state.page = 0;
+        render();
+      };
+      head.appendChild(th);
+    });
+
+    function render() {
+      var pages = Math.max(1, Math.ceil(n / pageSize));
+      var start = state.page * pageSize;
+      var rows = [];
+      order.slice(start, start + pageSize).forEach(function (i) {
+        var tr = document.createElement("tr");
+        table.columns.forEach(function (col) {
+          var td = document.createElement("td");
+          var v = table.data[col][i];
+          if (typeof v === "number") { td.className = "num"; v = fmt.format(v); }
+          td.textContent = v === null ? "" : v;
+          tr.appendChild(td);
+        });
+        rows.push(tr);
+      });
+      body.replaceChildren.apply(body, rows);
+      pager.innerHTML = "";
+      var prev = document.createElement("button"), next = document.createElement("button");
+      prev.textContent = "‹"; next.textContent = "›";
+      prev.disabled = state.page === 0; next.disabled = state.page >= pages - 1;
+      prev.onclick = function () { state.page--; render(); };
+      next.onclick = function () { state.page++; render(); };
+      pager.append(prev, "Página " + (state.page + 1) + " de " + pages, next);
+    }
+
+    render();
+    document.getElementById("tables").appendChild(section);
+  });
+})();
+</script>
+</body>
+</html>
+"""
+
+
+def _columnar(df, columns=None):
+    """Convierte un DataFrame en {'columns': [...], 'data': {columna: [valores]}} serializable a JSON."""
+    df = df if columns is None else df[[c for c in columns if c in df.columns]]
+    data = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_float_dtype(series):
+            series = series.round(2)
+        values = series.astype(object)
+        data[str(col)] = values.where(series.notna(), None).tolist()
+    return {"columns": [str(c) for c in df.columns], "data": data}
+
+
+def _json_default(value):
+    """Convierte escalares de numpy/pandas a tipos nativos para json.dumps."""
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def generate_html_report(results, tests, output_path):
     """
-    # Esta sería una extensión futura para generar reportes HTML más visuales
-    pass
\ No newline at end of file
+    Genera un reporte HTML autocontenido (un solo archivo, sin dependencias externas).
+
+    Las tablas (top productos, stock crítico, ventas por categoría y rentabilidad por
+    producto) se incrustan como JSON columnar y se paginan y ordenan en el navegador,
+    de modo que el generador nunca construye tablas HTML grandes y el archivo abre
+    rápido aunque haya cientos de miles de productos.
+
+    Returns:
+        str: Ruta del archivo HTML generado
+    """
+    os.makedirs(output_path, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    html_file = f"{output_path}/pipeline_report_{timestamp}.html"
+    
+    df = results["merged"]
+    stats = summary_stats(df, results.get("registros", len(df)))
+    stock_critico = results["stock_critico"]
+    if len(stock_critico) > 0:
+        stock_critico = stock_critico.assign(deficit=stock_critico["min_stock"] - stock_critico["current_stock"])
+    
+    tables = [
+        ("Top productos más vendidos", results["top_productos"], None),
+        ("Productos con stock crítico", stock_critico,
+         ["product_id", "title", "category", "current_stock", "min_stock", "deficit"]),
+        ("Ventas por categoría", results.get("ventas_categoria", pd.DataFrame()), None),
+    ]
+    agregados_producto = results.get("agregados_producto")
+    if agregados_producto is not None:
+        tables.append((
+            "Rentabilidad por producto",
+            agregados_producto.sort_values("rentabilidad", ascending=False),
+            ["product_id", "title", "category", "quantity", "total_sale_value", "rentabilidad"],
+        ))
+    
+    labels = {
+        "registros": "Registros procesados", "productos": "Productos únicos", "categorias": "Categorías",
+        "quantity": "Unidades vendidas", "total_sale_value": "Valor total de ventas",
+        "rentabilidad": "Rentabilidad total",
+    }
+    report = {
+        "page_size": HTML_PAGE_SIZE,
+        "stats": [[labels[k], v] for k, v in stats.items()],
+        "tests": [{"name": name, **result} for name, result in tests.items()],
+        "tables": [{"title": title, **_columnar(frame, columns)} for title, frame, columns in tables],
+    }
+    # '</' se escapa para que ningún valor pueda cerrar el <script> que contiene los datos
+    data = json.dumps(report, ensure_ascii=False, separators=(",", ":"), default=_json_default).replace("</", "<\\/")
+    
+    html = (HTML_TEMPLATE
+            .replace("__TIMESTAMP__", timestamp)
+            .replace("__GENERATED__", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            .replace("__DATA__", data))
+    with open(html_file, "w", encoding="utf-8") as f:
+        f.write(html)
+    
+    print(f" Reporte HTML: {html_file}")
+    return html_file
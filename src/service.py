@@ -0,0 +1,224 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from src.orchestador import EcommerceDataPipeline
+
+# Consultas servidas: ruta -> (clave en los resultados, columnas expuestas si existen)
+VIEWS = {
+    "top-productos": ("top_productos", ["product_id", "title", "total_vendido"]),
+    "stock-critico": ("stock_critico", ["tienda", "product_id", "title", "category", "current_stock",
+                                        "min_stock", "umbral", "deficit", "cobertura"]),
+    "ventas-categoria": ("ventas_categoria", ["category", "unidades_vendidas", "ventas_totales",
+                                              "rentabilidad_total"]),
+    "velocidad-productos": ("velocidad_productos", ["product_id", "title", "category", "current_stock",
+                                                    "velocidad_7d", "velocidad_30d", "dias_stock",
+                                                    "fecha_quiebre"]),
+}
+
+# Modos de ejecución que se pueden lanzar con POST /runs?mode=...
+RUN_MODES = {
+    "full": "run_pipeline",
+    "inventory": "run_inventory_check",
+    "batch": "run_batch",
+}
+
+
+def _records(df, columns):
+    """Filas de df como lista de dicts JSON (solo las columnas expuestas que existen)."""
+    columns = [c for c in columns if c in df.columns]
+    return json.loads(df[columns].to_json(orient="records", force_ascii=False, date_format="iso"))
+
+
+def _response(status, body, keep_alive=True):
+    """Respuesta HTTP/1.1 completa en bytes, con cuerpo JSON."""
+    status = HTTPStatus(status)
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def _json(payload):
+    return json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+
+
+class PipelineService:
+    """
+    Modo servicio: un proceso de larga duración alrededor de EcommerceDataPipeline.
+
+    Mantiene en memoria el catálogo y el inventario entre ejecuciones (solo se vuelven a
+    cargar si cambian) y los agregados de la última ejecución. Expone una API HTTP local
+    sobre asyncio:
+
+        GET  /health                      estado del proceso
+        GET  /status                      estado de la última ejecución
+        GET  /top-productos?limit=N       ranking de productos
+        GET  /stock-critico?limit=N       productos con stock crítico
+        GET  /ventas-categoria            ventas por categoría
+        POST /runs?mode=full|inventory|batch   lanza una ejecución (202, o 409 si hay una en curso)
+
+    Las ejecuciones corren en un hilo aparte, una a la vez; las consultas se responden
+    desde respuestas ya serializadas, sin tocar pandas.
+    """
+
+    def __init__(self, config_path, host=None, port=None):
+        self.pipeline = EcommerceDataPipeline(config_path)
+        self.pipeline.dimensions = {}
+        service_cfg = self.pipeline.config.get("service", {})
+        self.host = host or service_cfg.get("host", "127.0.0.1")
+        self.port = service_cfg.get("port", 8080) if port is None else port
+        self.run_on_start = service_cfg.get("run_on_start", True)
+        self.views = {}
+        self.status = {"state": "idle", "mode": None, "runs": 0, "last_run": None, "duration_s": None,
+                       "report_file": None, "error": None}
+        self._responses = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline")
+        self._run_task = None
+        self.server = None
+
+    # ------------------------------------------------------------------
+    # Resultados y ejecuciones
+    # ------------------------------------------------------------------
+    def update_views(self, results=None, stock_critico=None):
+        """Publica los agregados de una ejecución y descarta las respuestas serializadas anteriores."""
+        views = dict(self.views)
+        for name, (key, columns) in VIEWS.items():
+            if results is not None and key in results:
+                views[name] = _records(results[key], columns)
+        if stock_critico is not None:
+            views["stock-critico"] = _records(stock_critico, VIEWS["stock-critico"][1])
+        self.views = views
+        self._responses = {}
+
+    @property
+    def running(self):
+        return self._run_task is not None and not self._run_task.done()
+
+    def trigger(self, mode="full"):
+        """Lanza una ejecución en segundo plano; devuelve False si ya hay una en curso."""
+        if mode not in RUN_MODES:
+            raise ValueError(f" Modo de ejecución desconocido: {mode}. Opciones: {list(RUN_MODES)}")
+        if self.running:
+            return False
+        self.status.update(state="running", mode=mode, error=None)
+        self._run_task = asyncio.get_running_loop().create_task(self._run(mode))
+        return True
+
+    async def _run(self, mode):
+        start = time.perf_counter()
+        try:
+            output = await asyncio.get_running_loop().run_in_executor(
+                self._executor, getattr(self.pipeline, RUN_MODES[mode])
+            )
+        except Exception as e:
+            self.status.update(state="error", error=str(e))
+        else:
+            self.update_views(output.get("results"), output.get("stock_critico"))
+            self.status.update(state="idle", report_file=output["report_file"],
+                               last_run=datetime.now().isoformat(timespec="seconds"))
+        finally:
+            self.status["runs"] += 1
+            self.status["duration_s"] = round(time.perf_counter() - start, 3)
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+    def route(self, method, target):
+        """Resuelve una petición y devuelve (código HTTP, cuerpo JSON en bytes)."""
+        url = urlsplit(target)
+        path = url.path.strip("/")
+        query = parse_qs(url.query)
+
+        if method == "GET" and path in ("", "health"):
+            return 200, _json({"status": "ok", "running": self.running})
+        if method == "GET" and path == "status":
+            return 200, _json({**self.status, "views": sorted(self.views)})
+        if method == "GET" and path in VIEWS:
+            try:
+                limit = int(query.get("limit", ["0"])[0]) or None
+            except ValueError:
+                return 400, _json({"error": "limit debe ser un entero"})
+            cached = self._responses.get((path, limit))
+            if cached is None:
+                if path not in self.views:
+                    return 503, _json({"error": "sin resultados todavía: lanza una ejecución con POST /runs"})
+                rows = self.views[path]
+                cached = self._responses[(path, limit)] = _json({"total": len(rows), "data": rows[:limit]})
+            return 200, cached
+        if method == "POST" and path == "runs":
+            mode = query.get("mode", ["full"])[0]
+            if mode not in RUN_MODES:
+                return 400, _json({"error": f"modo desconocido: {mode}", "modos": list(RUN_MODES)})
+            if not self.trigger(mode):
+                return 409, _json({"error": "ya hay una ejecución en curso"})
+            return 202, _json({"accepted": True, "mode": mode})
+        return 404, _json({"error": f"ruta no encontrada: {method} /{path}"})
+
+    async def handle(self, reader, writer):
+        """Atiende una conexión HTTP/1.1 (con keep-alive) hasta que el cliente la cierre."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if int(headers.get("content-length") or 0):
+                    await reader.readexactly(int(headers["content-length"]))
+
+                status, body = self.route(method.upper(), target)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(_response(status, body, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        """Abre el servidor HTTP (con port=0 se elige un puerto libre, ver self.port)."""
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.pipeline.logger.info(f" Servicio escuchando en http://{self.host}:{self.port}")
+        if self.run_on_start:
+            self.trigger("full")
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self._run_task is not None:
+            await asyncio.gather(self._run_task, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+
+    async def serve(self):
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+
+def run_service(config_path, host=None, port=None):
+    """Ejecuta el servicio hasta Ctrl+C."""
+    service = PipelineService(config_path, host, port)
+    try:
+        asyncio.run(service.serve())
+    except KeyboardInterrupt:
+        pass
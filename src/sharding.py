@@ -0,0 +1,145 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from src.quality_checks import DEFAULT_QC_CONFIG
+
+# Columnas aditivas de los agregados por producto (se suman entre shards)
+SUM_COLUMNS = ["quantity", "total_sale_value", "rentabilidad"]
+
+
+def shard_output_path(proc_cfg, shard):
+    """Directorio Parquet propio de cada shard (por defecto {output_path}/shards/{name})."""
+    return shard.get("output_path") or f"{proc_cfg['output_path']}/shards/{shard['name']}"
+
+
+def process_shard(config, shard, df_api):
+    """
+    Ingiere, transforma y valida un shard (tienda o región) en el proceso actual.
+
+    Se ejecuta en un proceso del pool de run_shards. Usa el plan pre-agregado sin
+    materializar el frame a nivel de venta y devuelve solo agregados parciales, de
+    modo que al proceso principal nunca llegan las ventas de la tienda.
+
+    Returns:
+        dict: name, registros, agregados_producto, stock_critico, tests, passed y wall_s
+    """
+    from src.ingestion import IngestionPlan
+    from src.quality_checks import run_quality_checks
+    from src.tansformation import transform_preaggregated
+
+    start = time.perf_counter()
+    proc_cfg = config["processing"]
+    with IngestionPlan(None, shard["sales_file"], shard["inventory_file"], shard_output_path(proc_cfg, shard),
+                       chunk_size=proc_cfg.get("chunk_size"), partition_by=proc_cfg.get("partition_by"),
+                       sales_filters=proc_cfg.get("sales_window"),
+                       fast_path=proc_cfg.get("parquet_fast_path", False)) as plan:
+        df_sales = plan.load_sales(lambda: df_api)
+        df_inventory = plan.load_inventory()
+        plan.finish(df_sales, df_inventory)
+
+    # transform_preaggregated normaliza el catálogo en su lugar: se trabaja sobre una copia
+    catalogue = df_api.copy()
+    results = transform_preaggregated(catalogue, df_sales, df_inventory, materialize_merged=False)
+    passed, tests = run_quality_checks(
+        results["merged"], config.get("quality_checks", {}), sales=df_sales, catalogue=catalogue,
+        inventory=df_inventory
+    )
+    return {
+        "name": shard["name"],
+        "registros": results["registros"],
+        "agregados_producto": results["agregados_producto"],
+        "stock_critico": results["stock_critico"],
+        "tests": tests,
+        "passed": passed,
+        "wall_s": round(time.perf_counter() - start, 6),
+    }
+
+
+def run_shards(config, shards, df_api, max_workers=None):
+    """
+    Procesa cada shard en un proceso propio (hasta max_workers a la vez, por defecto
+    uno por CPU) y devuelve sus resultados parciales en el orden de shards.
+    """
+    names = [shard["name"] for shard in shards]
+    if len(set(names)) != len(names):
+        raise ValueError(f" Los shards deben tener nombres únicos: {names}")
+    max_workers = min(max_workers or os.cpu_count() or 1, len(shards))
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+        futures = [executor.submit(process_shard, config, shard, df_api) for shard in shards]
+        return [future.result() for future in futures]
+
+
+def merge_tests(partials, sample_size=DEFAULT_QC_CONFIG["sample_size"]):
+    """Combina los tests de calidad de cada shard: pasa si pasa en todos y suma las filas con error."""
+    tests = {}
+    for partial in partials:
+        for name, result in partial["tests"].items():
+            merged = tests.setdefault(name, {"passed": True, "failed_rows": 0, "sample": [], "detail": ""})
+            merged["passed"] = merged["passed"] and result["passed"]
+            merged["failed_rows"] += result.get("failed_rows", 0)
+            merged["sample"] = (merged["sample"] + list(result.get("sample", [])))[:sample_size]
+            if not result["passed"] and result.get("detail"):
+                detalle = f"{partial['name']}: {result['detail']}"
+                merged["detail"] = f"{merged['detail']}; {detalle}" if merged["detail"] else detalle
+    return tests
+
+
+def merge_shard_results(partials):
+    """
+    Fusiona los resultados parciales de los shards en resultados globales.
+
+    Los agregados por producto se suman entre tiendas y de ellos se derivan ranking y
+    ventas por categoría; el stock crítico es propio de cada tienda y se concatena con
+    una columna 'tienda'. 'merged' es el agregado global por producto (como en el plan
+    pre-agregado sin materializar).
+
+    Returns:
+        dict con las claves de transform_preaggregated más 'tiendas' (resumen por shard)
+    """
+    from src.tansformation import broadcast_category_totals, summarize_aggregates
+
+    productos = pd.concat([p["agregados_producto"] for p in partials], ignore_index=True)
+    agregados_producto = (
+        productos
+        .groupby("product_id", sort=False)
+        .agg(title=("title", "first"), category=("category", "first"),
+             **{col: (col, "sum") for col in SUM_COLUMNS})
+        .reset_index()
+    )
+    agregados_categoria, top_productos, ventas_categoria = summarize_aggregates(agregados_producto)
+
+    merged = agregados_producto.copy()
+    merged["ventas_totales_categoria"] = broadcast_category_totals(
+        merged["category"], agregados_categoria.set_index("category")["quantity"]
+    )
+    stock_critico = pd.concat(
+        [p["stock_critico"].assign(tienda=p["name"]) for p in partials], ignore_index=True
+    )
+    tiendas = pd.DataFrame([
+        {
+            "tienda": p["name"],
+            "registros": p["registros"],
+            "unidades": p["agregados_producto"]["quantity"].sum(),
+            "ventas": p["agregados_producto"]["total_sale_value"].sum(),
+            "stock_critico": len(p["stock_critico"]),
+            "calidad_ok": p["passed"],
+        }
+        for p in partials
+    ])
+
+    return {
+        "merged": merged,
+        "stock_critico": stock_critico,
+        "top_productos": top_productos,
+        "ventas_categoria": ventas_categoria,
+        "agregados_producto": agregados_producto,
+        "agregados_categoria": agregados_categoria,
+        "merged_materializado": False,
+        "registros": int(sum(p["registros"] for p in partials)),
+        "tiendas": tiendas,
+    }
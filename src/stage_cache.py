@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import pandas as pd
+
+META_FILE = "_meta.json"
+DEFAULT_MAX_SIZE_MB = 2048
+
+
+def _json_default(value):
+    """Escalares de numpy como tipos nativos; el resto (fechas, etc.) como texto."""
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def hash_frame(df):
+    """
+    Huella del contenido de un DataFrame (columnas, tipos y valores; sin el índice).
+
+    Las columnas con objetos no hasheables (p. ej. 'rating' del API, que son dicts)
+    se hashean a partir de su representación en texto.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode())
+    for col in df.columns:
+        try:
+            values = pd.util.hash_pandas_object(df[col], index=False)
+        except TypeError:
+            values = pd.util.hash_pandas_object(df[col].astype(str), index=False)
+        digest.update(values.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def code_version(*modules):
+    """Huella del código fuente de los módulos que implementan una etapa."""
+    digest = hashlib.sha256()
+    for module in modules:
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def stage_key(stage, inputs=(), config=None, code=""):
+    """
+    Clave de caché de una etapa: hash de su nombre, sus entradas, su sección de
+    configuración y la versión de su código.
+
+    inputs puede contener DataFrames (se hashea su contenido) o cadenas (p. ej. la
+    clave de una etapa anterior).
+    """
+    digest = hashlib.sha256(stage.encode())
+    for item in inputs:
+        digest.update((hash_frame(item) if isinstance(item, pd.DataFrame) else str(item)).encode())
+    digest.update(json.dumps(config, sort_keys=True, default=str).encode())
+    digest.update(code.encode())
+    return digest.hexdigest()
+
+
+class StageCache:
+    """
+    Caché en disco de resultados de etapas direccionada por contenido.
+
+    Cada entrada es un directorio <clave>/ con un Parquet por DataFrame y un
+    _meta.json con los valores no tabulares. El tamaño total se limita a
+    max_size_mb desalojando las entradas usadas hace más tiempo (LRU por mtime).
+    """
+
+    def __init__(self, cache_dir, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = None if max_size_mb is None else int(max_size_mb * 1024 * 1024)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def has(self, key):
+        return os.path.exists(os.path.join(self._entry(key), META_FILE))
+
+    def get(self, key):
+        """
+        Devuelve el dict guardado para key (DataFrames y valores JSON) o None si no existe.
+
+        Un acierto actualiza el mtime de la entrada para la política LRU.
+        """
+        meta_path = os.path.join(self._entry(key), META_FILE)
+        if not self.has(key):
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        result = dict(meta["values"])
+        for name in meta["frames"]:
+            result[name] = pd.read_parquet(os.path.join(self._entry(key), f"{name}.parquet"))
+        os.utime(self._entry(key))
+        return result
+
+    def put(self, key, result):
+        """
+        Guarda un dict de resultados: los DataFrames en Parquet y el resto en JSON.
+
+        La entrada se escribe en un directorio temporal y se renombra al final, de
+        modo que una escritura interrumpida nunca deja una entrada incompleta.
+        """
+        tmp = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp)
+        try:
+            frames = [name for name, value in result.items() if isinstance(value, pd.DataFrame)]
+            for name in frames:
+                result[name].to_parquet(os.path.join(tmp, f"{name}.parquet"))
+            values = {name: value for name, value in result.items() if name not in frames}
+            with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as f:
+                json.dump({"frames": frames, "values": values}, f, default=_json_default)
+            if os.path.exists(self._entry(key)):
+                shutil.rmtree(self._entry(key))
+            os.rename(tmp, self._entry(key))
+        finally:
+            if os.path.exists(tmp):
+                shutil.rmtree(tmp)
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith(".") or not os.path.isdir(path):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            entries.append((os.path.getmtime(path), size, path))
+        return sorted(entries)
+
+    def evict(self):
+        """Elimina las entradas menos usadas recientemente hasta respetar el tamaño máximo (None: sin límite)."""
+        if self.max_bytes is None:
+            return 0
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path)
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,194 @@
+import datetime
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.timeseries import parse_sale_days
+
+# Niveles de partición derivados de sale_date, en orden jerárquico
+DATE_LEVELS = ("year", "month", "day")
+DATE_LEVEL_DTYPES = {"year": "int16", "month": "int8", "day": "int8"}
+
+
+def _add_partition_columns(df, partition_by, catalogue=None):
+    """Agrega al DataFrame las columnas de partición pedidas (year/month/day y opcionalmente category)."""
+    df = df.copy()
+    # Mismo parseo que el filtro de read_sales (admite fechas con y sin hora)
+    dates = parse_sale_days(df["sale_date"])
+    for level in DATE_LEVELS:
+        if level in partition_by:
+            df[level] = getattr(dates.dt, level).astype(DATE_LEVEL_DTYPES[level].capitalize())
+
+    if "category" in partition_by and "category" not in df.columns:
+        if catalogue is None:
+            raise ValueError(" Para particionar por 'category' se requiere el catálogo del API")
+        categories = catalogue.set_index("product_id")["category"]
+        df["category"] = df["product_id"].map(categories)
+
+    unknown = [c for c in partition_by if c not in df.columns]
+    if unknown:
+        raise ValueError(f" Columnas de partición desconocidas: {unknown}")
+    return df
+
+
+def write_sales_dataset(df_sales, dataset_path, partition_by, basename, catalogue=None):
+    """
+    Escribe ventas en un dataset Parquet particionado estilo Hive (p. ej. year=2024/month=10/day=14).
+
+    Se puede llamar varias veces sobre el mismo dataset: cada llamada agrega archivos
+    nuevos con el prefijo basename (una llamada con el mismo basename los sobrescribe).
+
+    Returns:
+        list: Rutas de los archivos escritos
+    """
+    if df_sales.empty:
+        return []
+
+    written = []
+    table = pa.Table.from_pandas(_add_partition_columns(df_sales, partition_by, catalogue), preserve_index=False)
+    ds.write_dataset(
+        table,
+        dataset_path,
+        format="parquet",
+        partitioning=list(partition_by),
+        partitioning_flavor="hive",
+        basename_template=f"{basename}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        file_visitor=lambda written_file: written.append(written_file.path),
+    )
+    return written
+
+
+def reset_dataset(dataset_path):
+    """Elimina un dataset existente para reescribirlo completo."""
+    if os.path.isdir(dataset_path):
+        shutil.rmtree(dataset_path)
+    os.makedirs(dataset_path, exist_ok=True)
+
+
+def read_files(paths):
+    """Lee un conjunto de archivos Parquet concretos (sin columnas de partición)."""
+    if not paths:
+        return pd.DataFrame()
+    # partitioning=None: no se infieren year=/month=... a partir de la ruta de cada archivo
+    return pa.concat_tables([pq.read_table(p, partitioning=None) for p in paths]).to_pandas()
+
+
+def read_parquet_projected(path, columns):
+    """
+    Lee un Parquet plano con memory-map y solo con las columnas pedidas.
+
+    Las columnas se emparejan sin distinguir mayúsculas ni espacios; las que no
+    existen en el archivo se ignoran. Los tipos son los del DataFrame que se escribió
+    (metadatos de pandas del archivo), igual que al convertir el CSV.
+    """
+    wanted = {c.lower().strip() for c in columns}
+    names = [c for c in pq.read_schema(path).names if c.lower().strip() in wanted]
+    return pq.read_table(path, columns=names, memory_map=True).to_pandas()
+
+
+def _parse_bound(value, name):
+    """
+    Límite de un rango de fechas como Timestamp del día.
+
+    Se admiten fechas (date/datetime/Timestamp) y textos que pandas interpreta como
+    fecha; cualquier otro valor (p. ej. un entero, que pd.Timestamp tomaría como
+    nanosegundos) es un error de configuración.
+    """
+    parsed = pd.NaT
+    if isinstance(value, (str, datetime.date)):
+        try:
+            parsed = pd.Timestamp(value)
+        except ValueError:
+            pass
+    if pd.isna(parsed):
+        raise ValueError(f" {name} no es una fecha válida: {value!r}")
+    return parsed.normalize()
+
+
+def _date_bound(date, levels, lower):
+    """
+    Construye un filtro sobre las columnas de partición equivalente a fecha >= date (o <= date).
+
+    La comparación es lexicográfica sobre (year, month, day), de modo que el lector
+    descarta directorios completos sin abrir sus archivos.
+    """
+    parts = [(level, getattr(date, level)) for level in DATE_LEVELS if level in levels]
+    if not parts:
+        return None
+
+    expr = None
+    prefix = None
+    for i, (level, value) in enumerate(parts):
+        field = ds.field(level)
+        last = i == len(parts) - 1
+        if last:
+            cmp = field >= value if lower else field <= value
+        else:
+            cmp = field > value if lower else field < value
+        term = cmp if prefix is None else prefix & cmp
+        expr = term if expr is None else expr | term
+        prefix = (field == value) if prefix is None else prefix & (field == value)
+    return expr
+
+
+def read_sales(dataset_path, start_date=None, end_date=None, product_ids=None, columns=None):
+    """
+    Lee el dataset de ventas aplicando filtros y proyección en el propio lector.
+
+    Args:
+        dataset_path: Directorio del dataset particionado (o un Parquet plano)
+        start_date / end_date: Rango de sale_date inclusivo (fechas o textos de fecha; ValueError
+            si no lo son); poda particiones por fecha y compara sale_date como fecha
+        product_ids: Lista de product_id a conservar (usa estadísticas de row groups)
+        columns: Columnas a leer; None lee todas salvo las de partición por fecha
+
+    Returns:
+        DataFrame con las ventas seleccionadas
+    """
+    dataset = ds.dataset(dataset_path, format="parquet", partitioning="hive")
+    names = dataset.schema.names
+    levels = [level for level in DATE_LEVELS if level in names]
+
+    start = _parse_bound(start_date, "start_date") if start_date is not None else None
+    end = _parse_bound(end_date, "end_date") if end_date is not None else None
+    if start is not None and end is not None and start > end:
+        raise ValueError(f" start_date ({start.date()}) es posterior a end_date ({end.date()})")
+
+    # Poda por particiones (comparaciones enteras sobre year/month/day) y por product_id en el lector
+    filters = []
+    if start is not None:
+        filters.append(_date_bound(start, levels, lower=True))
+    if end is not None:
+        filters.append(_date_bound(end, levels, lower=False))
+    if product_ids is not None:
+        filters.append(ds.field("product_id").isin(list(product_ids)))
+
+    expr = None
+    for f in filters:
+        if f is not None:
+            expr = f if expr is None else expr & f
+
+    if columns is None:
+        columns = [c for c in names if c not in levels]
+    else:
+        columns = [c for c in columns if c in names]
+
+    bounded = start is not None or end is not None
+    read_columns = columns + ["sale_date"] if bounded and "sale_date" not in columns else columns
+    table = dataset.to_table(columns=read_columns, filter=expr)
+    if bounded:
+        # sale_date es texto: se compara como fecha (no como string) dentro de las particiones leídas;
+        # las fechas que no se pueden interpretar quedan fuera del rango
+        days = parse_sale_days(table.column("sale_date").to_pandas())
+        keep = days.notna()
+        if start is not None:
+            keep &= days >= start
+        if end is not None:
+            keep &= days <= end
+        table = table.filter(pa.array(keep.to_numpy())).select(columns)
+    return table.to_pandas()
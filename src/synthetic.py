@@ -0,0 +1,94 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+# Categorías base del catálogo (Fake Store API); si se piden más se numeran
+BASE_CATEGORIES = ["electronics", "jewelery", "men's clothing", "women's clothing"]
+
+
+def _categories(n_categories):
+    if n_categories <= len(BASE_CATEGORIES):
+        return BASE_CATEGORIES[:n_categories]
+    return BASE_CATEGORIES + [f"category {i}" for i in range(len(BASE_CATEGORIES) + 1, n_categories + 1)]
+
+
+def generate_dataset(n_sales, n_products=1_000, n_categories=4, popularity_skew=1.1,
+                     missing_inventory_ratio=0.1, days=365, start_date="2024-01-01", seed=42):
+    """
+    Genera catálogo, ventas e inventario sintéticos con los mismos esquemas que las fuentes reales.
+
+    Es determinista para una misma semilla y está vectorizado, de modo que sirve
+    para generar desde miles hasta decenas de millones de ventas.
+
+    Args:
+        n_sales: Número de filas de ventas
+        n_products: Productos del catálogo
+        n_categories: Categorías distintas
+        popularity_skew: Exponente de la ley de Zipf de popularidad (0 = uniforme)
+        missing_inventory_ratio: Proporción de productos sin fila de inventario
+        days: Días cubiertos por las ventas a partir de start_date
+        seed: Semilla del generador aleatorio
+
+    Returns:
+        tuple: (df_api, df_sales, df_inventory)
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, n_products + 1)
+
+    # --- 1. CATÁLOGO ---
+    categories = np.array(_categories(n_categories), dtype=object)
+    prices = rng.lognormal(mean=3.5, sigma=1.0, size=n_products).round(2)
+    df_api = pd.DataFrame({
+        "id": ids,
+        "title": [f"Producto {i}" for i in ids],
+        "price": prices,
+        "category": categories[rng.integers(0, len(categories), n_products)],
+    })
+
+    # --- 2. VENTAS CON POPULARIDAD SESGADA (ZIPF SOBRE UN ORDEN ALEATORIO) ---
+    weights = 1.0 / np.arange(1, n_products + 1) ** popularity_skew
+    weights = weights[rng.permutation(n_products)]
+    product_idx = rng.choice(n_products, size=n_sales, p=weights / weights.sum())
+    dates = pd.date_range(start_date, periods=days, freq="D").strftime("%Y-%m-%d").to_numpy(dtype=object)
+    df_sales = pd.DataFrame({
+        "product_id": ids[product_idx],
+        "quantity": rng.integers(1, 10, n_sales),
+        "sale_date": dates[np.sort(rng.integers(0, days, n_sales))],
+        "cost": (prices[product_idx] * rng.uniform(0.4, 0.8, n_sales)).round(2),
+    })
+
+    # --- 3. INVENTARIO CON PRODUCTOS FALTANTES ---
+    keep = rng.random(n_products) >= missing_inventory_ratio
+    df_inventory = pd.DataFrame({
+        "product_id": ids[keep],
+        "current_stock": rng.integers(0, 60, keep.sum()),
+        "min_stock": rng.integers(5, 20, keep.sum()),
+    })
+
+    return df_api, df_sales, df_inventory
+
+
+def write_dataset(output_dir, df_api, df_sales, df_inventory):
+    """
+    Escribe el conjunto sintético como products.json, sales.csv e inventory.csv.
+
+    Los CSV se escriben con el escritor de Arrow, mucho más rápido que to_csv para millones de filas.
+
+    Returns:
+        dict con las rutas de products, sales e inventory
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {
+        "products": os.path.join(output_dir, "products.json"),
+        "sales": os.path.join(output_dir, "sales.csv"),
+        "inventory": os.path.join(output_dir, "inventory.csv"),
+    }
+    with open(paths["products"], "w", encoding="utf-8") as f:
+        json.dump(df_api.to_dict(orient="records"), f, ensure_ascii=False)
+    pacsv.write_csv(pa.Table.from_pandas(df_sales, preserve_index=False), paths["sales"])
+    pacsv.write_csv(pa.Table.from_pandas(df_inventory, preserve_index=False), paths["inventory"])
+    return paths
@@ -1,16 +1,14 @@
+import numpy as np
 import pandas as pd
 
-def transform_data(df_api, df_sales, df_inventory):
+from src.instrumentation import step
+
+def prepare_inputs(df_api, df_sales, df_inventory):
     """
-    Une datos y genera métricas de negocio.
-    
-    Args:
-        df_api: DataFrame con productos de la API (id, title, price, category)
-        df_sales: DataFrame con ventas (product_id, quantity, sale_date, cost)
-        df_inventory: DataFrame con inventario (product_id, current_stock, [min_stock opcional])
-    
+    Normaliza y valida las tres fuentes antes de unirlas (pasos comunes a todos los motores).
+
     Returns:
-        dict con 'merged', 'stock_critico', 'top_productos', 'ventas_categoria'
+        tuple: (df_api, df_sales, df_inventory) listos para el merge
     """
     
     # --- 1. NORMALIZAR NOMBRES DE COLUMNAS ---
@@ -63,17 +61,34 @@ def transform_data(df_api, df_sales, df_inventory):
         print(f"  Eliminando columna 'category' de df_inventory (usaremos categoría del API)")
         df_inventory = df_inventory.drop(columns=["category"])
     
+    return df_api, df_sales, df_inventory
+
+
+def build_merged(df_api, df_sales, df_inventory):
+    """
+    Une ventas con inventario y catálogo (left joins) y calcula las métricas por fila.
+
+    Espera las entradas ya preparadas con prepare_inputs.
+
+    Returns:
+        DataFrame a nivel de venta con total_sale_value y rentabilidad
+    """
+    
     # --- 7. UNIR DATASETS ---
     # Primero: sales + inventory (left join para mantener todas las ventas)
-    df = df_sales.merge(df_inventory, on="product_id", how="left")
+    with step("merge_sales_inventory", rows_in=len(df_sales)) as record:
+        df = df_sales.merge(df_inventory, on="product_id", how="left")
+        record["rows_out"] = len(df)
     print(f"✓ Después de merge sales+inventory: {len(df)} registros")
     
     # Segundo: resultado + api (left join para mantener ventas incluso si falta info de API)
-    df = df.merge(
-        df_api[["product_id", "title", "category", "price"]], 
-        on="product_id", 
-        how="left"
-    )
+    with step("merge_api", rows_in=len(df)) as record:
+        df = df.merge(
+            df_api[["product_id", "title", "category", "price"]], 
+            on="product_id", 
+            how="left"
+        )
+        record["rows_out"] = len(df)
     print(f"✓ Después de merge con API: {len(df)} registros")
     print(f"✓ Columnas finales: {df.columns.tolist()}")
     
@@ -97,12 +112,25 @@ def transform_data(df_api, df_sales, df_inventory):
     # 10.2 Rentabilidad por producto (ventas - costo)
     df["rentabilidad"] = df["total_sale_value"] - (df["cost"] * df["quantity"])
     
-    # 10.3 Ventas totales por categoría
-    df["ventas_totales_categoria"] = df.groupby("category")["quantity"].transform("sum")
-    
-    print(f"✓ Métricas calculadas: total_sale_value, rentabilidad, ventas_totales_categoria")
-    
-    # --- 11. PRODUCTOS CON STOCK CRÍTICO ---
+    return df
+
+
+def broadcast_category_totals(category, totales):
+    """
+    Difunde a cada fila el total de su categoría.
+
+    Con category como Categorical se indexa por los códigos enteros, sin comparar
+    strings fila a fila; las filas sin categoría quedan nulas.
+    """
+    if isinstance(category.dtype, pd.CategoricalDtype):
+        valores = totales.reindex(category.cat.categories).array
+        codes = category.cat.codes.to_numpy()
+        return pd.Series(pd.api.extensions.take(valores, codes, allow_fill=True), index=category.index)
+    return category.map(totales)
+
+
+def critical_stock(df):
+    """Filas con current_stock por debajo de min_stock, una por producto (la primera)."""
     stock_critico = df[
         (df["current_stock"].notna()) & 
         (df["min_stock"].notna()) & 
@@ -110,54 +138,289 @@ def transform_data(df_api, df_sales, df_inventory):
     ].copy()
     
     # Remover duplicados en stock crítico (un producto solo debe aparecer una vez)
-    stock_critico = stock_critico.drop_duplicates(subset=["product_id"])
+    return stock_critico.drop_duplicates(subset=["product_id"])
+
+
+def transform_data(df_api, df_sales, df_inventory):
+    """
+    Une datos y genera métricas de negocio.
     
-    print(f" Productos con stock crítico: {len(stock_critico)}")
+    Args:
+        df_api: DataFrame con productos de la API (id, title, price, category)
+        df_sales: DataFrame con ventas (product_id, quantity, sale_date, cost)
+        df_inventory: DataFrame con inventario (product_id, current_stock, [min_stock opcional])
     
-    # --- 12. RANKING DE PRODUCTOS MÁS VENDIDOS ---
-    top_productos = (
-        df.groupby(["product_id", "title"])["quantity"]
-        .sum()
-        .sort_values(ascending=False)
-        .reset_index()
-        .rename(columns={"quantity": "total_vendido"})
-    )
+    Returns:
+        dict con 'merged', 'stock_critico', 'top_productos', 'ventas_categoria'
+    """
     
-    print(f"✓ Top productos calculado: {len(top_productos)} productos únicos")
+    # --- 1-6. NORMALIZAR, VALIDAR Y LIMPIAR ENTRADAS ---
+    df_api, df_sales, df_inventory = prepare_inputs(df_api, df_sales, df_inventory)
     
-    # --- 13. VENTAS POR CATEGORÍA ---
-    ventas_categoria = (
-        df.groupby("category")
-        .agg({
-            "quantity": "sum",
-            "total_sale_value": "sum",
-            "rentabilidad": "sum"
-        })
-        .sort_values("quantity", ascending=False)
-        .reset_index()
-        .rename(columns={
-            "quantity": "unidades_vendidas",
-            "total_sale_value": "ventas_totales",
-            "rentabilidad": "rentabilidad_total"
-        })
+    # --- 7-10. UNIR DATASETS Y CALCULAR MÉTRICAS POR FILA ---
+    df = build_merged(df_api, df_sales, df_inventory)
+    
+    # --- 11. AGREGACIÓN EN UNA SOLA PASADA (por producto y por categoría) ---
+    agregados_producto = aggregate_metrics(df)
+    agregados_categoria, top_productos, ventas_categoria = summarize_aggregates(agregados_producto)
+    
+    # 11.1 Ventas totales por categoría (difundidas a cada fila desde los agregados)
+    df["ventas_totales_categoria"] = broadcast_category_totals(
+        df["category"], agregados_categoria.set_index("category")["quantity"]
     )
     
+    print(f"✓ Métricas calculadas: total_sale_value, rentabilidad, ventas_totales_categoria")
+    print(f"✓ Top productos calculado: {len(top_productos)} productos únicos")
     print(f"✓ Ventas por categoría calculadas: {len(ventas_categoria)} categorías")
     
-    # --- 14. RESULTADO FINAL ---
+    # --- 12. PRODUCTOS CON STOCK CRÍTICO ---
+    stock_critico = critical_stock(df)
+    
+    print(f" Productos con stock crítico: {len(stock_critico)}")
+    
+    # --- 13. RESULTADO FINAL ---
     resultados = {
         "merged": df,
         "stock_critico": stock_critico,
         "top_productos": top_productos,
-        "ventas_categoria": ventas_categoria
+        "ventas_categoria": ventas_categoria,
+        "agregados_producto": agregados_producto,
+        "agregados_categoria": agregados_categoria
     }
     
     print(f"\n RESUMEN DE TRANSFORMACIÓN:")
     print(f"   - Registros finales: {len(df)}")
-    print(f"   - Productos únicos: {df['product_id'].nunique()}")
-    print(f"   - Categorías: {df['category'].nunique()}")
+    print(f"   - Productos únicos: {len(agregados_producto)}")
+    print(f"   - Categorías: {len(agregados_categoria)}")
     print(f"   - Stock crítico: {len(stock_critico)} productos")
     print(f"   - Ventas totales: {df['quantity'].sum():.0f} unidades")
     print(f"   - Rentabilidad total: ${df['rentabilidad'].sum():.2f}\n")
     
-    return resultados
\ No newline at end of file
+    return resultados
+
+
+def transform_preaggregated(df_api, df_sales, df_inventory, by_day=False, materialize_merged=False):
+    """
+    Plan optimizado: agrega las ventas por producto (y opcionalmente por día) antes de unirlas.
+
+    Inventario y catálogo se unen sobre el agregado, que tiene una fila por producto
+    (o por producto y día) en lugar de una por venta. Si materialize_merged=True (por
+    ejemplo, para exportar datos_procesados) hace falta el frame a nivel de venta: en ese
+    caso no se pre-agrega y los agregados se calculan sobre ese frame, igual que en el
+    plan por filas, en lugar de recorrer las ventas dos veces.
+
+    Las ventas sin costo no suman a la rentabilidad (como en el plan por filas, donde su
+    rentabilidad es nula): por eso se acumulan aparte las unidades con costo.
+
+    Returns:
+        dict con las mismas claves que transform_data. Si no se materializa, 'merged'
+        contiene el frame pre-agregado y 'merged_materializado' es False; 'registros'
+        indica siempre el número de ventas procesadas.
+    """
+    
+    # --- 1-6. NORMALIZAR, VALIDAR Y LIMPIAR ENTRADAS ---
+    df_api, df_sales, df_inventory = prepare_inputs(df_api, df_sales, df_inventory)
+    
+    if materialize_merged:
+        # --- 7-10. FRAME A NIVEL DE VENTA (una sola pasada sobre las ventas) ---
+        df = build_merged(df_api, df_sales, df_inventory)
+        registros = len(df)
+    else:
+        # --- 7. PRE-AGREGAR VENTAS ---
+        keys = ["product_id", "sale_date"] if by_day and "sale_date" in df_sales.columns else ["product_id"]
+        ventas = df_sales[df_sales["quantity"].notna()]
+        costo = ventas["cost"] * ventas["quantity"]
+        ventas = ventas[keys + ["quantity"]].assign(
+            cost_total=costo.fillna(0.0),
+            quantity_con_costo=ventas["quantity"].where(costo.notna(), 0),
+            num_ventas=1
+        )
+        with step("groupby_preagregado", rows_in=len(ventas)) as record:
+            pre = ventas.groupby(keys, sort=False, dropna=False, observed=True).sum().reset_index()
+            record["rows_out"] = len(pre)
+        print(f"✓ Ventas pre-agregadas por {keys}: {len(df_sales)} -> {len(pre)} filas")
+        
+        # --- 8. UNIR DIMENSIONES SOBRE EL AGREGADO ---
+        with step("merge_dimensiones", rows_in=len(pre)) as record:
+            df = pre.merge(df_inventory, on="product_id", how="left")
+            df = df.merge(df_api[["product_id", "title", "category", "price"]], on="product_id", how="left")
+            record["rows_out"] = len(df)
+        df = df[df["price"].notna()]
+        df["total_sale_value"] = df["quantity"] * df["price"]
+        df["rentabilidad"] = df["quantity_con_costo"] * df["price"] - df["cost_total"]
+        registros = int(df["num_ventas"].sum())
+        df = df.drop(columns=["cost_total", "quantity_con_costo"])
+    
+    # --- 9. AGREGADOS, RANKINGS Y STOCK CRÍTICO ---
+    agregados_producto = aggregate_metrics(df)
+    agregados_categoria, top_productos, ventas_categoria = summarize_aggregates(agregados_producto)
+    totales_categoria = agregados_categoria.set_index("category")["quantity"]
+    
+    df["ventas_totales_categoria"] = broadcast_category_totals(df["category"], totales_categoria)
+    stock_critico = critical_stock(df)
+    
+    print(f"✓ Plan pre-agregado: {registros} ventas, {len(agregados_producto)} productos, "
+          f"{len(ventas_categoria)} categorías, {len(stock_critico)} con stock crítico "
+          f"(merged {'materializado' if materialize_merged else 'no materializado'})")
+    
+    return {
+        "merged": df,
+        "stock_critico": stock_critico,
+        "top_productos": top_productos,
+        "ventas_categoria": ventas_categoria,
+        "agregados_producto": agregados_producto,
+        "agregados_categoria": agregados_categoria,
+        "merged_materializado": materialize_merged,
+        "registros": registros
+    }
+
+
+def aggregate_metrics(df):
+    """
+    Calcula en una sola pasada las métricas por producto sobre el frame unido.
+
+    Las filas se agrupan por un código entero de producto (pd.factorize), y
+    title/category se toman de la primera fila de cada producto, sin agruparlos.
+
+    Returns:
+        DataFrame con product_id, title, category, quantity, total_sale_value, rentabilidad
+    """
+    codes, _ = pd.factorize(df["product_id"])
+    valid = codes >= 0
+    codes = codes[valid]
+    n_products = codes.max() + 1 if len(codes) else 0
+
+    # Primera aparición de cada código (asignación en orden inverso: gana la primera fila)
+    rows = np.flatnonzero(valid)
+    first = np.empty(n_products, dtype=np.int64)
+    first[codes[::-1]] = rows[::-1]
+
+    with step("groupby_producto", rows_in=len(df)) as record:
+        sums = df.loc[valid, ["quantity", "total_sale_value", "rentabilidad"]].groupby(codes, sort=False).sum()
+        record["rows_out"] = len(sums)
+    agregados = df[["product_id", "title", "category"]].iloc[first].reset_index(drop=True)
+    return pd.concat([agregados, sums.sort_index().reset_index(drop=True)], axis=1)
+
+
+def summarize_aggregates(agregados_producto):
+    """
+    Deriva de los agregados por producto las vistas por categoría y los rankings.
+
+    Trabaja sobre una fila por producto, por lo que no vuelve a recorrer las ventas.
+
+    Returns:
+        tuple: (agregados_categoria, top_productos, ventas_categoria)
+    """
+    with step("groupby_categoria", rows_in=len(agregados_producto)) as record:
+        agregados_categoria = (
+            agregados_producto
+            .groupby("category", sort=False, observed=True)[["quantity", "total_sale_value", "rentabilidad"]]
+            .sum()
+            .reset_index()
+        )
+        record["rows_out"] = len(agregados_categoria)
+
+    top_productos = (
+        agregados_producto.loc[agregados_producto["title"].notna(), ["product_id", "title", "quantity"]]
+        .sort_values(["quantity", "product_id"], ascending=[False, True])
+        .reset_index(drop=True)
+        .rename(columns={"quantity": "total_vendido"})
+    )
+
+    ventas_categoria = (
+        agregados_categoria
+        .sort_values(["quantity", "category"], ascending=[False, True])
+        .reset_index(drop=True)
+        .rename(columns={
+            "quantity": "unidades_vendidas",
+            "total_sale_value": "ventas_totales",
+            "rentabilidad": "rentabilidad_total"
+        })
+    )
+
+    return agregados_categoria, top_productos, ventas_categoria
+
+
+def aggregate_sales_by_product(df_sales):
+    """
+    Agrega ventas por producto: unidades vendidas, costo total (cost * quantity) y
+    unidades con costo (las ventas sin costo no suman a la rentabilidad).
+
+    Estos agregados son aditivos, por lo que pueden acumularse entre ejecuciones.
+    """
+    df_sales = df_sales.rename(columns=lambda c: c.lower().strip())
+    cost = df_sales["cost"] if "cost" in df_sales.columns else 0.0
+    df = df_sales[df_sales["product_id"].notna() & df_sales["quantity"].notna()]
+    costo = cost * df["quantity"]
+    df = df.assign(cost_total=costo.fillna(0.0), quantity_con_costo=df["quantity"].where(costo.notna(), 0))
+    return (
+        df.groupby("product_id", as_index=False)
+        .agg(quantity=("quantity", "sum"), cost_total=("cost_total", "sum"),
+             quantity_con_costo=("quantity_con_costo", "sum"))
+        .astype({"product_id": "int64", "quantity": "int64", "cost_total": "float64", "quantity_con_costo": "int64"})
+    )
+
+
+def transform_incremental(df_api, df_sales_delta, df_inventory, previous_aggregates=None):
+    """
+    Transforma solo el delta de ventas y actualiza los agregados acumulados por producto.
+
+    'merged' contiene únicamente las ventas nuevas; 'top_productos', 'ventas_categoria' y
+    'stock_critico' se calculan sobre el histórico completo a partir de los agregados,
+    sin volver a leer las ventas anteriores.
+
+    Returns:
+        dict con las mismas claves que transform_data más 'agregados_incrementales'
+        (unidades y costo acumulados por producto, a persistir para la próxima ejecución)
+    """
+    resultados = transform_data(df_api, df_sales_delta, df_inventory)
+
+    # --- 1. ACUMULAR AGREGADOS POR PRODUCTO ---
+    delta = aggregate_sales_by_product(df_sales_delta)
+    if previous_aggregates is not None and not previous_aggregates.empty:
+        # Agregados guardados antes de registrar las unidades con costo: se asume que todas lo tenían
+        if "quantity_con_costo" not in previous_aggregates.columns:
+            previous_aggregates = previous_aggregates.assign(quantity_con_costo=previous_aggregates["quantity"])
+        delta = pd.concat([previous_aggregates, delta], ignore_index=True)
+    with step("groupby_acumulado", rows_in=len(delta)) as record:
+        agregados = delta.groupby("product_id", as_index=False)[["quantity", "cost_total", "quantity_con_costo"]].sum()
+        record["rows_out"] = len(agregados)
+
+    # --- 2. MÉTRICAS HISTÓRICAS A PARTIR DE LOS AGREGADOS ---
+    # transform_data ya normalizó columnas y renombró id -> product_id
+    with step("merge_acumulado_api", rows_in=len(agregados)) as record:
+        productos = agregados.merge(
+            df_api[["product_id", "title", "category", "price"]], on="product_id", how="inner"
+        )
+        record["rows_out"] = len(productos)
+    productos = productos[productos["price"].notna()]
+    productos["total_sale_value"] = productos["quantity"] * productos["price"]
+    productos["rentabilidad"] = productos["quantity_con_costo"] * productos["price"] - productos["cost_total"]
+
+    agregados_producto = productos[
+        ["product_id", "title", "category", "quantity", "total_sale_value", "rentabilidad"]
+    ].reset_index(drop=True)
+    agregados_categoria, top_productos, ventas_categoria = summarize_aggregates(agregados_producto)
+
+    # --- 3. STOCK CRÍTICO DE PRODUCTOS CON VENTAS EN EL HISTÓRICO ---
+    inventario = df_inventory.drop(columns=["category"], errors="ignore")
+    stock_critico = productos[["product_id", "title", "category", "price"]].merge(
+        inventario, on="product_id", how="inner"
+    )
+    stock_critico = stock_critico[
+        stock_critico["current_stock"].notna() &
+        stock_critico["min_stock"].notna() &
+        (stock_critico["current_stock"] < stock_critico["min_stock"])
+    ].drop_duplicates(subset=["product_id"])
+
+    print(f"✓ Agregados incrementales actualizados: {len(agregados)} productos en el histórico")
+
+    resultados.update({
+        "stock_critico": stock_critico,
+        "top_productos": top_productos,
+        "ventas_categoria": ventas_categoria,
+        "agregados_producto": agregados_producto,
+        "agregados_categoria": agregados_categoria,
+        "agregados_incrementales": agregados,
+    })
+    return resultados
@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import step
+from src.inventory import index_catalogue, index_inventory
+
+# Ventanas (en días) de la velocidad de ventas; la primera se usa para los días de stock
+DEFAULT_WINDOWS = (7, 30)
+
+# Claves del rollup diario por producto (aditivo: se puede acumular entre ejecuciones)
+DAILY_KEYS = ["day", "product_id"]
+
+
+def parse_sale_days(sale_date):
+    """
+    Convierte sale_date en un día datetime64[s] (sin hora), parseando cada valor distinto
+    una sola vez: las ventas repiten muy pocas fechas, así que se parsean los valores
+    únicos (o las categorías, si la columna ya es categórica) y se expanden por código.
+
+    Las fechas inválidas quedan como NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(sale_date):
+        return sale_date.dt.normalize().astype("datetime64[s]")
+    if isinstance(sale_date.dtype, pd.CategoricalDtype):
+        codes, uniques = sale_date.cat.codes.to_numpy(), sale_date.cat.categories
+    else:
+        codes, uniques = pd.factorize(sale_date)
+    # format="mixed" admite fechas con y sin hora; su costo es bajo porque solo se parsean los únicos
+    parsed = pd.to_datetime(pd.Index(uniques).astype(str), errors="coerce", format="mixed").normalize()
+    # El código -1 (nulo) toma el NaT agregado al final
+    values = np.append(parsed.to_numpy(dtype="datetime64[s]"), np.datetime64("NaT", "s"))[codes]
+    return pd.Series(values, index=sale_date.index, name="day")
+
+
+def daily_product_rollup(df_sales):
+    """
+    Ventas diarias por producto a partir de las ventas (una pasada, una fecha parseada por valor).
+
+    Returns:
+        DataFrame con day, product_id, quantity, num_ventas ordenado por día y producto
+    """
+    df_sales = df_sales.rename(columns=lambda c: c.lower().strip())
+    days = parse_sale_days(df_sales["sale_date"])
+    valid = days.notna() & df_sales["product_id"].notna() & df_sales["quantity"].notna()
+    if days.isna().any():
+        print(f"  Se omitieron {int(days.isna().sum())} ventas con sale_date inválida en el rollup diario")
+    ventas = pd.DataFrame({
+        "day": days[valid],
+        "product_id": df_sales.loc[valid, "product_id"].astype("int64"),
+        "quantity": df_sales.loc[valid, "quantity"].astype("int64"),
+        "num_ventas": np.ones(int(valid.sum()), dtype="int64"),
+    })
+    with step("groupby_diario", rows_in=len(ventas)) as record:
+        daily = ventas.groupby(DAILY_KEYS, sort=True).sum().reset_index()
+        record["rows_out"] = len(daily)
+    return daily
+
+
+def merge_daily(previous, delta):
+    """
+    Incorpora al rollup acumulado el rollup de las ventas nuevas.
+
+    Las ventas nuevas pueden caer en cualquier día (también anteriores al último ya
+    acumulado, si llegan tarde): solo se vuelven a agregar las filas de los días presentes
+    en el delta y el resto del histórico se conserva tal cual.
+    """
+    if previous is None or previous.empty:
+        return delta
+    if delta.empty:
+        return previous
+    touched = previous["day"].isin(delta["day"].unique())
+    recent = pd.concat([previous[touched], delta], ignore_index=True)
+    recent = recent.groupby(DAILY_KEYS, sort=False).sum()
+    return (pd.concat([previous[~touched], recent.reset_index()], ignore_index=True)
+            .sort_values(DAILY_KEYS, ignore_index=True))
+
+
+def _window_sums(daily, as_of, window, keys):
+    since = as_of - pd.Timedelta(days=window - 1)
+    recent = daily[(daily["day"] >= since) & (daily["day"] <= as_of)]
+    return recent.groupby(keys, observed=True)["quantity"].sum()
+
+
+def category_daily(daily, df_api, windows=DEFAULT_WINDOWS):
+    """
+    Ventas diarias por categoría con la velocidad móvil de cada ventana.
+
+    Los días sin ventas de una categoría cuentan como cero, de modo que la velocidad es
+    unidades de los últimos N días naturales / N.
+
+    Returns:
+        DataFrame con day, category, quantity, total_sale_value y velocidad_{N}d
+    """
+    catalogo = index_catalogue(df_api)[["category", "price"]]
+    df = daily.join(catalogo, on="product_id", how="inner")
+    df = df.assign(total_sale_value=df["quantity"] * df["price"].astype("float64"))
+    por_dia = df.groupby(["day", "category"], observed=True)[["quantity", "total_sale_value"]].sum()
+    if por_dia.empty:
+        return pd.DataFrame(columns=["day", "category", "quantity", "total_sale_value"]
+                            + [f"velocidad_{w}d" for w in windows])
+
+    # Una columna por categoría y una fila por día natural (los huecos valen 0)
+    unidades = por_dia["quantity"].unstack("category", fill_value=0)
+    unidades = unidades.reindex(pd.date_range(unidades.index.min(), unidades.index.max(), freq="D",
+                                              unit="s", name="day"), fill_value=0)
+    result = unidades.stack().rename("quantity").to_frame()
+    result["total_sale_value"] = por_dia["total_sale_value"].reindex(result.index, fill_value=0.0)
+    for window in windows:
+        result[f"velocidad_{window}d"] = (unidades.rolling(window, min_periods=1).sum() / window).stack()
+    return result.reset_index()
+
+
+def sales_velocity(daily, df_inventory, df_api=None, windows=DEFAULT_WINDOWS, as_of=None):
+    """
+    Velocidad de ventas por producto y días de stock restantes.
+
+    velocidad_{N}d son las unidades vendidas en los N días que terminan en as_of (por
+    defecto, el último día con ventas) divididas por N. dias_stock = current_stock /
+    velocidad de la primera ventana y fecha_quiebre es as_of + dias_stock; ambos quedan
+    vacíos si el producto no vendió en esa ventana.
+
+    Returns:
+        DataFrame con product_id, title, category, current_stock, velocidad_{N}d,
+        dias_stock y fecha_quiebre, ordenado por dias_stock (los vacíos al final)
+    """
+    inventario = index_inventory(df_inventory)
+    as_of = daily["day"].max() if as_of is None else pd.Timestamp(as_of)
+    if pd.isna(as_of):
+        velocidades = pd.DataFrame(columns=[f"velocidad_{w}d" for w in windows], dtype="float64")
+    else:
+        velocidades = pd.DataFrame({f"velocidad_{w}d": _window_sums(daily, as_of, w, "product_id") / w
+                                    for w in windows})
+
+    productos = inventario.index.union(velocidades.index).rename("product_id")
+    df = pd.DataFrame(index=productos).join(inventario[["current_stock"]]).join(velocidades).fillna(
+        {f"velocidad_{w}d": 0.0 for w in windows}
+    )
+    if df_api is not None:
+        df = df.join(index_catalogue(df_api)[["title", "category"]])
+    else:
+        df = df.assign(title=None, category=None)
+
+    velocidad = df[f"velocidad_{windows[0]}d"]
+    stock = df["current_stock"].astype("float64")
+    df["dias_stock"] = (stock / velocidad).where(velocidad > 0).round(1)
+    # Horizonte acotado a 100 años para que stocks enormes no desborden la fecha
+    dias = df["dias_stock"].fillna(0).clip(upper=36_500).to_numpy()
+    df["fecha_quiebre"] = pd.Series((as_of + pd.to_timedelta(dias, unit="D")).floor("D"), index=df.index)
+    df["fecha_quiebre"] = df["fecha_quiebre"].where(df["dias_stock"].notna())
+    df = df.reset_index().sort_values(["dias_stock", "product_id"], na_position="last").reset_index(drop=True)
+    return df[["product_id", "title", "category", "current_stock"] + [f"velocidad_{w}d" for w in windows]
+              + ["dias_stock", "fecha_quiebre"]]
+
+
+def build_timeseries(df_api, df_sales, df_inventory, previous_daily=None, windows=DEFAULT_WINDOWS):
+    """
+    Etapa de series temporales: rollups diarios, velocidad de ventas y días de stock.
+
+    Con previous_daily (modo incremental) df_sales son solo las ventas nuevas y el rollup
+    diario se actualiza sin volver a recorrer el histórico. No modifica las entradas.
+
+    Returns:
+        dict: ventas_diarias (por producto y día), ventas_diarias_categoria,
+        velocidad_productos y fecha_corte (último día con ventas)
+    """
+    windows = tuple(sorted(windows))
+    daily = merge_daily(previous_daily, daily_product_rollup(df_sales))
+    por_categoria = category_daily(daily, df_api, windows)
+    velocidad = sales_velocity(daily, df_inventory, df_api, windows)
+    fecha_corte = daily["day"].max() if not daily.empty else None
+
+    print(f"✓ Series temporales: {len(daily)} filas producto-día, {daily['day'].nunique()} días, "
+          f"{int(velocidad['dias_stock'].notna().sum())} productos con días de stock estimados")
+    return {
+        "ventas_diarias": daily,
+        "ventas_diarias_categoria": por_categoria,
+        "velocidad_productos": velocidad,
+        "fecha_corte": None if fecha_corte is None else fecha_corte.strftime("%Y-%m-%d"),
+    }
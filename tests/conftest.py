@@ -0,0 +1,43 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from helpers import CATALOGO
+
+
+@pytest.fixture
+def stub_api():
+    """Servidor HTTP local que imita el catálogo (ETag, fallos transitorios y /products/{id})."""
+    state = {"requests": 0, "fail_next": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state["requests"] += 1
+            if state["fail_next"] > 0:
+                state["fail_next"] -= 1
+                self.send_response(503)
+                self.end_headers()
+                return
+            if self.path.startswith("/products/"):
+                body = json.dumps(CATALOGO[int(self.path.rsplit("/", 1)[1]) - 1]).encode()
+            elif self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            else:
+                body = json.dumps(CATALOGO).encode()
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/products", state
+    server.shutdown()
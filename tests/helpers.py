@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+# Catálogo que sirve el fixture stub_api (ver conftest.py)
+CATALOGO = [{"id": i, "title": f"Producto {i}", "price": 10.0 * i, "category": "cat"} for i in range(1, 4)]
+
+
+def datos_generados(seed=7, n_products=60, n_sales=5000):
+    """Catálogo, ventas e inventario aleatorios con productos sin inventario y sin catálogo."""
+    rng = np.random.default_rng(seed)
+    api = pd.DataFrame({
+        "id": np.arange(1, n_products + 1),
+        "title": [f"Producto {i}" for i in range(1, n_products + 1)],
+        "price": rng.uniform(1, 500, n_products).round(2),
+        "category": rng.choice(["electronics", "jewelery", "men's clothing", "women's clothing"], n_products),
+    }).iloc[:-5]
+    sales = pd.DataFrame({
+        "product_id": rng.integers(1, n_products + 1, n_sales),
+        "quantity": rng.integers(1, 10, n_sales),
+        "sale_date": pd.date_range("2024-01-01", periods=n_sales, freq="h").strftime("%Y-%m-%d"),
+        "cost": rng.uniform(0, 100, n_sales).round(2),
+    })
+    inventory = pd.DataFrame({
+        "product_id": np.arange(1, n_products + 1),
+        "current_stock": rng.integers(0, 30, n_products),
+        "min_stock": rng.integers(5, 15, n_products),
+    }).sample(frac=0.8, random_state=seed)
+    return api, sales, inventory
+
+
+def normalizar(df, keys):
+    df = df.sort_values(keys).reset_index(drop=True)
+    return df.astype({c: "float64" for c in df.columns if pd.api.types.is_numeric_dtype(df[c])})
+
+
+def datos_sin_costo():
+    """Como datos_generados, con ventas sin costo (además de productos fuera del catálogo)."""
+    api, sales, inventory = datos_generados()
+    sales.loc[sales.index[::7], "cost"] = np.nan
+    return api, sales, inventory
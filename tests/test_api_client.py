@@ -0,0 +1,35 @@
+import json
+
+from helpers import CATALOGO
+from src.api_client import ProductCatalogClient
+
+
+# ============================================================
+# CLIENTE DEL CATÁLOGO CONTRA UN SERVIDOR HTTP LOCAL
+# ============================================================
+
+def test_catalog_client_reintenta_errores_transitorios(stub_api):
+    url, state = stub_api
+    state["fail_next"] = 2
+    with ProductCatalogClient(url, timeout=5, retries=3, backoff_factor=0.01) as client:
+        content, not_modified = client.fetch_catalog()
+    assert json.loads(content) == CATALOGO
+    assert not not_modified
+    assert state["requests"] == 3
+
+
+def test_catalog_client_usa_cache_con_etag(stub_api, tmp_path):
+    url, _ = stub_api
+    with ProductCatalogClient(url, timeout=5, cache_dir=str(tmp_path)) as client:
+        first, first_cached = client.fetch_catalog()
+        second, second_cached = client.fetch_catalog()
+    assert not first_cached
+    assert second_cached
+    assert first == second
+
+
+def test_catalog_client_descarga_por_id(stub_api):
+    url, _ = stub_api
+    with ProductCatalogClient(url, timeout=5) as client:
+        productos = client.fetch_products([3, 1])
+    assert [p["id"] for p in productos] == [3, 1]
@@ -0,0 +1,47 @@
+import pandas as pd
+
+from src.benchmark import compare_to_baseline
+from src.synthetic import generate_dataset, write_dataset
+
+
+# ============================================================
+# DATOS SINTÉTICOS Y BENCHMARKS
+# ============================================================
+
+def test_generador_sintetico_es_determinista(tmp_path):
+    api, sales, inventory = generate_dataset(20_000, n_products=200, missing_inventory_ratio=0.2, seed=3)
+    otra = generate_dataset(20_000, n_products=200, missing_inventory_ratio=0.2, seed=3)
+
+    pd.testing.assert_frame_equal(sales, otra[1])
+    assert len(sales) == 20_000 and api["id"].is_unique
+    assert 0.7 < len(inventory) / len(api) < 0.9
+    # Popularidad sesgada: el producto más vendido supera con creces al promedio
+    assert sales["product_id"].value_counts().iloc[0] > 10 * len(sales) / len(api)
+
+    paths = write_dataset(tmp_path, api, sales, inventory)
+    pd.testing.assert_frame_equal(pd.read_csv(paths["sales"]), sales, check_dtype=False)
+
+
+def test_benchmark_marca_regresiones():
+    baseline = {"1000": {"transformacion": {"wall_s": 1.0, "rss_peak_mb": 100.0}}}
+    actual = {"1000": {"transformacion": {"wall_s": 1.5, "rss_peak_mb": 110.0}},
+              "5000": {"transformacion": {"wall_s": 9.0, "rss_peak_mb": 900.0}}}
+
+    regresiones = compare_to_baseline(actual, baseline, tolerance=0.25)
+
+    assert [(r["size"], r["metric"]) for r in regresiones] == [("1000", "wall_s")]
+
+
+def test_benchmark_lee_lineas_base_antiguas_como_pico_del_proceso():
+    # Antes, rss_peak_mb guardaba ru_maxrss: se compara con process_rss_peak_mb
+    baseline = {"1000": {"ingesta": {"wall_s": 1.0, "rss_peak_mb": 200.0}},
+                "2000": {"ingesta": {"wall_s": 1.0, "rss_peak_mb": 50.0, "process_rss_peak_mb": 200.0}}}
+    actual = {size: {"ingesta": {"wall_s": 1.0, "rss_peak_mb": 70.0, "process_rss_peak_mb": 300.0}}
+              for size in ("1000", "2000")}
+
+    regresiones = compare_to_baseline(actual, baseline, tolerance=0.25)
+    assert [(r["size"], r["metric"], r["baseline"]) for r in regresiones] == [
+        ("1000", "process_rss_peak_mb", 200.0), ("2000", "process_rss_peak_mb", 200.0)]
+
+    regresiones = compare_to_baseline(actual, baseline, tolerance=0.25, metrics=("rss_peak_mb",))
+    assert [(r["size"], r["metric"]) for r in regresiones] == [("2000", "rss_peak_mb")]
@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+from src.dag import Checkpoints, Stage, run_dag
+
+
+# ============================================================================
+# ORQUESTACIÓN POR GRAFO Y REANUDACIÓN
+# ============================================================================
+
+def test_grafo_reanuda_desde_la_ultima_etapa_completada(tmp_path):
+    ejecutadas = []
+    fallar = {"reporte": True}
+    huella = {"sales.csv": "v1"}
+
+    def etapa(nombre, fn):
+        def run(inputs, record):
+            ejecutadas.append(nombre)
+            if fallar.get(nombre):
+                raise RuntimeError(f"fallo en {nombre}")
+            return fn(inputs)
+        return run
+
+    stages = [
+        Stage("ventas", etapa("ventas", lambda i: {"df": pd.DataFrame({"product_id": [1, 2, 2], "quantity": [3, 1, 4]})}),
+              fingerprint=lambda: huella),
+        Stage("agregado", etapa("agregado", lambda i: {"df": i["ventas"]["df"].groupby("product_id", as_index=False).sum()}),
+              deps=["ventas"]),
+        Stage("calidad", etapa("calidad", lambda i: {"passed": bool((i["agregado"]["df"]["quantity"] > 0).all())}),
+              deps=["agregado"]),
+        Stage("reporte", etapa("reporte", lambda i: {"total": int(i["agregado"]["df"]["quantity"].sum()),
+                                                     "passed": i["calidad"]["passed"]}),
+              deps=["agregado", "calidad"], config={"max_rows": 10}),
+    ]
+    checkpoints = Checkpoints(str(tmp_path / "checkpoints"))
+
+    with pytest.raises(RuntimeError):
+        run_dag(stages, max_workers=2, checkpoints=checkpoints)
+    assert sorted(ejecutadas) == ["agregado", "calidad", "reporte", "ventas"]
+
+    ejecutadas.clear()
+    fallar.clear()
+    salidas = run_dag(stages, checkpoints=checkpoints, resume=True)
+    assert ejecutadas == ["reporte"]
+    assert salidas["reporte"] == {"total": 8, "passed": True}
+    assert "ventas" not in salidas
+
+    # Cambiar la configuración de una etapa invalida su checkpoint
+    ejecutadas.clear()
+    stages[-1].config = {"max_rows": 20}
+    run_dag(stages, checkpoints=checkpoints, resume=True)
+    assert ejecutadas == ["reporte"]
+
+    # Si cambia una entrada externa, no se restaura nada que dependa de ella
+    ejecutadas.clear()
+    huella["sales.csv"] = "v2"
+    run_dag(stages, checkpoints=checkpoints, resume=True)
+    assert ejecutadas == ["ventas", "agregado", "calidad", "reporte"]
+
+    with pytest.raises(ValueError):
+        run_dag([Stage("a", etapa("a", dict), deps=["b"]), Stage("b", etapa("b", dict), deps=["a"])])
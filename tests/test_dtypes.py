@@ -0,0 +1,38 @@
+import pandas as pd
+
+from helpers import datos_generados, normalizar
+from src.dtypes import memory_usage_mb, optimize_dtypes
+from src.tansformation import transform_data
+
+
+# ============================================================
+# TIPOS COMPACTOS (optimize_dtypes)
+# ============================================================
+
+def test_tipos_compactos_reducen_memoria_y_se_conservan_tras_el_merge():
+    originales = datos_generados()
+    compactos = [optimize_dtypes(df) for df in originales]
+    for original, compacto in zip(originales, compactos):
+        assert memory_usage_mb(compacto) < memory_usage_mb(original)
+
+    esperado = transform_data(*originales)["merged"]
+    obtenido = transform_data(*compactos)["merged"]
+    assert memory_usage_mb(obtenido) < memory_usage_mb(esperado)
+    pd.testing.assert_frame_equal(
+        normalizar(obtenido, ["product_id", "sale_date"]).astype({"category": str, "sale_date": str}),
+        normalizar(esperado, ["product_id", "sale_date"]).astype({"category": str, "sale_date": str}),
+        check_dtype=False,
+    )
+    # Los enteros siguen siendo enteros nullable tras el left join (no float64 con NaN) y no bajan de Int32
+    for col in ("product_id", "quantity", "current_stock", "min_stock"):
+        assert obtenido[col].dtype in ("Int32", "Int64")
+    assert isinstance(obtenido["category"].dtype, pd.CategoricalDtype)
+
+
+def test_tipos_compactos_no_desbordan_en_la_aritmetica():
+    inventario = optimize_dtypes(pd.DataFrame({"product_id": [1, 2], "current_stock": [-100, 5],
+                                               "min_stock": [100, 20]}))
+    assert inventario["min_stock"].dtype == "Int32"
+    # Con Int8, 100 - (-100) daría -56
+    assert (inventario["min_stock"] - inventario["current_stock"]).tolist() == [200, 15]
+    assert optimize_dtypes(pd.DataFrame({"n": [2 ** 40]}))["n"].dtype == "Int64"
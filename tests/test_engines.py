@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from helpers import datos_generados, datos_sin_costo, normalizar
+from src.engines import TRANSFORM_ENGINES
+from src.tansformation import transform_preaggregated
+
+
+# ============================================================
+# PARIDAD ENTRE MOTORES DE TRANSFORMACIÓN
+# ============================================================
+
+@pytest.mark.parametrize("engine", [e for e in TRANSFORM_ENGINES if e != "pandas"])
+def test_motores_producen_los_mismos_resultados(engine):
+    pytest.importorskip(engine)
+    esperado = TRANSFORM_ENGINES["pandas"](*datos_generados())
+    obtenido = TRANSFORM_ENGINES[engine](*datos_generados())
+
+    claves = {
+        "merged": ["sale_date", "product_id", "quantity", "cost"],
+        "stock_critico": ["product_id"],
+        "top_productos": ["product_id"],
+        "ventas_categoria": ["category"],
+        "agregados_producto": ["product_id"],
+        "agregados_categoria": ["category"],
+    }
+    for nombre, keys in claves.items():
+        pd.testing.assert_frame_equal(
+            normalizar(obtenido[nombre], keys),
+            normalizar(esperado[nombre], keys),
+            check_dtype=False,
+            check_exact=False,
+        )
+
+
+@pytest.mark.parametrize("by_day, materialize", [(False, False), (True, False), (False, True)])
+def test_plan_preagregado_produce_los_mismos_agregados(by_day, materialize):
+    esperado = TRANSFORM_ENGINES["pandas"](*datos_sin_costo())
+    obtenido = transform_preaggregated(*datos_sin_costo(), by_day=by_day, materialize_merged=materialize)
+
+    assert obtenido["registros"] == len(esperado["merged"])
+    if materialize:
+        pd.testing.assert_frame_equal(obtenido["merged"], esperado["merged"])
+    # stock_critico se compara solo en columnas de producto: el resto son valores por venta
+    for nombre, keys, columnas in [
+        ("top_productos", ["product_id"], None),
+        ("ventas_categoria", ["category"], None),
+        ("agregados_producto", ["product_id"], None),
+        ("stock_critico", ["product_id"], ["product_id", "title", "category", "price", "current_stock", "min_stock"]),
+    ]:
+        columnas = columnas or list(esperado[nombre].columns)
+        pd.testing.assert_frame_equal(
+            normalizar(obtenido[nombre][columnas], keys),
+            normalizar(esperado[nombre][columnas], keys),
+            check_dtype=False,
+        )
@@ -0,0 +1,240 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from helpers import datos_generados, normalizar
+from src import ingestion, manifest as ingest_manifest
+from src.ingestion import (
+    INVENTORY_DTYPES, SALES_DTYPES, IngestionPlan, _ingest_sales_delta, _ingest_table, stream_csv_to_parquet
+)
+from src.tansformation import transform_data, transform_incremental
+
+
+# ============================================================
+# INGESTA PARALELA DE LAS TRES FUENTES
+# ============================================================
+
+def _fuentes_csv(tmp_path, n_sales=1000):
+    pd.DataFrame({"product_id": [1, 2, 3] * (n_sales // 3), "quantity": 1,
+                  "sale_date": "2024-01-01"}).to_csv(tmp_path / "sales.csv", index=False)
+    pd.DataFrame({"product_id": [1, 2, 3], "current_stock": [5, 0, 9],
+                  "min_stock": [2, 2, 2]}).to_csv(tmp_path / "inventory.csv", index=False)
+    return str(tmp_path / "sales.csv"), str(tmp_path / "inventory.csv"), str(tmp_path / "processed")
+
+
+def test_ingesta_paralela_carga_las_tres_fuentes_a_la_vez(stub_api, tmp_path, monkeypatch, capsys):
+    url, _ = stub_api
+    # Cada fuente espera a las otras dos: en serie la barrera vencería
+    barrier = threading.Barrier(3, timeout=5)
+    hilos = {}
+
+    def en_barrera(fn):
+        def run(*args):
+            hilos[threading.current_thread().name] = True
+            barrier.wait()
+            return fn(*args)
+        return run
+
+    monkeypatch.setattr(ingestion, "_ingest_api", en_barrera(ingestion._ingest_api))
+    monkeypatch.setattr(ingestion, "_fresh_or_ingest", en_barrera(ingestion._fresh_or_ingest))
+    timings = {}
+    df_api, df_sales, df_inventory = ingestion.ingest_data(url, *_fuentes_csv(tmp_path), chunk_size=100,
+                                                           parallel=True, timings=timings)
+
+    assert (len(df_api), len(df_sales), len(df_inventory)) == (3, 999, 3)
+    assert len(hilos) == 3 and all(name.startswith("ingesta") for name in hilos)
+    assert set(timings) == {"api", "sales", "inventory"} and all(t > 0 for t in timings.values())
+    salida = capsys.readouterr().out
+    assert all(f"{source}=" in salida for source in timings)
+
+
+def test_ingesta_paralela_propaga_el_error_y_cancela_las_demas(stub_api, tmp_path, monkeypatch):
+    url, _ = stub_api
+    sales_path, inventory_path, output_path = _fuentes_csv(tmp_path)
+
+    def api_caido(*args):
+        raise ConnectionError("catálogo caído")
+
+    def tras_el_fallo(fn):
+        def run(*args):
+            # Las otras fuentes siguen en curso cuando falla el API
+            assert ingestion._cancel.event.wait(5)
+            return fn(*args)
+        return run
+
+    monkeypatch.setattr(ingestion, "_ingest_api", api_caido)
+    monkeypatch.setattr(ingestion, "_fresh_or_ingest", tras_el_fallo(ingestion._fresh_or_ingest))
+    timings = {}
+    with pytest.raises(ConnectionError, match="catálogo caído"):
+        ingestion.ingest_data(url, sales_path, inventory_path, output_path, chunk_size=100, parallel=True,
+                              timings=timings)
+
+    # Ventas e inventario se detuvieron antes de escribir su primer bloque
+    assert not os.path.exists(os.path.join(output_path, "sales.parquet"))
+    assert not os.path.exists(os.path.join(output_path, "inventory.parquet"))
+    assert set(timings) == {"api", "sales", "inventory"}
+
+
+# ============================================================================
+# INGESTA INCREMENTAL (FILAS AGREGADAS AL FINAL DEL CSV)
+# ============================================================================
+
+def _ejecucion_incremental(sales_path, output_path, api, inventory, chunk_size, partition_by):
+    manifest = ingest_manifest.load_manifest(output_path)
+    delta = _ingest_sales_delta(sales_path, output_path, manifest, chunk_size, partition_by)
+    previos = ingest_manifest.load_aggregates(output_path, manifest)
+    resultados = transform_incremental(api.copy(), delta, inventory.copy(), previos)
+    ingest_manifest.commit(output_path, manifest, resultados["agregados_incrementales"])
+    return manifest, delta, resultados
+
+
+@pytest.mark.parametrize("chunk_size, partition_by", [(None, None), (700, None), (700, ["year", "month"])])
+def test_ingesta_incremental_incorpora_ventas_del_mismo_dia_y_tardias(tmp_path, chunk_size, partition_by):
+    api, sales, inventory = datos_generados(n_products=40, n_sales=3000)
+    sales.loc[sales.index[::7], "cost"] = np.nan
+    sales_path, output = tmp_path / "sales.csv", str(tmp_path / "processed")
+    os.makedirs(output)
+
+    # 1) Histórico inicial; 2) filas nuevas cuyo primer día es el último ya ingerido;
+    # 3) ventas que llegan tarde, con fecha anterior al watermark
+    tardias = sales.iloc[2500:].assign(sale_date="2024-01-05")
+    tramos = [sales.iloc[:2010], sales.iloc[2010:2500], tardias]
+    assert tramos[1]["sale_date"].iloc[0] == tramos[0]["sale_date"].iloc[-1]
+    tramos[0].to_csv(sales_path, index=False)
+    _ejecucion_incremental(sales_path, output, api, inventory, chunk_size, partition_by)
+    for tramo in tramos[1:]:
+        tramo.to_csv(sales_path, mode="a", header=False, index=False)
+        manifest, delta, resultados = _ejecucion_incremental(sales_path, output, api, inventory, chunk_size,
+                                                             partition_by)
+        assert len(delta) == len(tramo)
+
+    esperado = transform_data(api.copy(), pd.concat(tramos, ignore_index=True), inventory.copy())
+    pd.testing.assert_frame_equal(
+        normalizar(resultados["agregados_producto"], ["product_id"]),
+        normalizar(esperado["agregados_producto"], ["product_id"]),
+        check_exact=False,
+    )
+    assert manifest["watermark"] == pd.Timestamp(sales["sale_date"].iloc[2499]).isoformat()
+    # Cada confirmación escribe archivos nuevos y elimina los que ya no referencia el manifiesto
+    assert manifest["commits"] == 3
+    assert os.listdir(output).count(manifest["aggregates_file"]) == 1
+    assert len([f for f in os.listdir(output) if f.startswith("_sales_aggregates_")]) == 1
+
+    # Si el CSV se reescribe (no solo crece), el histórico se reconstruye desde cero
+    sales.iloc[:500].to_csv(sales_path, index=False)
+    manifest, delta, resultados = _ejecucion_incremental(sales_path, output, api, inventory, chunk_size, partition_by)
+    assert len(delta) == 500
+    esperado = transform_data(api.copy(), sales.iloc[:500].copy(), inventory.copy())
+    assert resultados["agregados_incrementales"]["quantity"].sum() == sales.iloc[:500]["quantity"].sum()
+    assert resultados["top_productos"]["total_vendido"].sum() == esperado["top_productos"]["total_vendido"].sum()
+
+
+# ============================================================================
+# INGESTA EN STREAMING (CSV -> PARQUET POR BLOQUES)
+# ============================================================================
+
+def test_streaming_escribe_un_row_group_por_bloque_sin_releer(tmp_path, monkeypatch):
+    _, sales, inventory = datos_generados(n_sales=2500)
+    csv_path, parquet_path = tmp_path / "sales.csv", str(tmp_path / "sales.parquet")
+    sales.to_csv(csv_path, index=False)
+
+    # Nunca se vuelve a leer el Parquet completo después de escribirlo
+    monkeypatch.setattr(pd, "read_parquet", lambda *a, **k: pytest.fail("se releyó el Parquet"))
+    df = _ingest_table(str(csv_path), parquet_path, SALES_DTYPES, 1000, None, "sales")
+    monkeypatch.undo()
+
+    metadata = pq.ParquetFile(parquet_path).metadata
+    assert metadata.num_row_groups == 3
+    assert [metadata.row_group(i).num_rows for i in range(3)] == [1000, 1000, 500]
+    pd.testing.assert_frame_equal(df, pd.read_parquet(parquet_path))
+    assert df["quantity"].sum() == sales["quantity"].sum()
+
+    # Proyección: solo se conservan en memoria las columnas pedidas
+    inventory.to_csv(tmp_path / "inventory.csv", index=False)
+    df = _ingest_table(str(tmp_path / "inventory.csv"), str(tmp_path / "inventory.parquet"), INVENTORY_DTYPES,
+                       10, None, "inventory", columns=["product_id", "current_stock"])
+    assert list(df.columns) == ["product_id", "current_stock"] and len(df) == len(inventory)
+
+
+def test_streaming_unifica_tipos_que_cambian_entre_bloques(tmp_path):
+    n = 250
+    df = pd.DataFrame({
+        "product_id": np.arange(n),
+        "quantity": np.ones(n, dtype=int),
+        # Enteros en el primer bloque, decimales después; enteros y luego texto
+        "descuento": [1] * 100 + [0.5] * (n - 100),
+        "canal": [7] * 200 + ["web"] * (n - 200),
+    })
+    csv_path, parquet_path = tmp_path / "sales.csv", str(tmp_path / "sales.parquet")
+    df.to_csv(csv_path, index=False)
+
+    assert stream_csv_to_parquet(str(csv_path), parquet_path, SALES_DTYPES, 100) == n
+    leido = pd.read_parquet(parquet_path)
+    assert pq.ParquetFile(parquet_path).metadata.num_row_groups == 3
+    assert leido["descuento"].dtype == "float64" and leido["descuento"].sum() == 100 + 0.5 * (n - 100)
+    assert leido["canal"].tolist() == ["7"] * 200 + ["web"] * (n - 200)
+
+
+@pytest.mark.parametrize("source, dtypes", [("sales", SALES_DTYPES), ("inventory", INVENTORY_DTYPES)])
+def test_lectura_por_bloques_y_de_una_vez_dan_el_mismo_frame(tmp_path, source, dtypes):
+    _, sales, inventory = datos_generados(n_sales=2500)
+    df = sales if source == "sales" else inventory
+    # Un valor faltante en un bloque posterior y una columna sin tipo explícito
+    df.loc[len(df) - 1, "quantity" if source == "sales" else "min_stock"] = None
+    df["canal"] = ["tienda"] * (len(df) - 1) + [3]
+    csv_path = tmp_path / f"{source}.csv"
+    df.to_csv(csv_path, index=False)
+
+    de_una_vez = _ingest_table(str(csv_path), str(tmp_path / "a.parquet"), dtypes, None, None, source)
+    por_bloques = _ingest_table(str(csv_path), str(tmp_path / "b.parquet"), dtypes, 7, None, source)
+
+    pd.testing.assert_frame_equal(por_bloques, de_una_vez)
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "b.parquet"), pd.read_parquet(tmp_path / "a.parquet"))
+
+
+# ============================================================================
+# RUTA RÁPIDA (PARQUET VIGENTE SIN PARSEAR EL CSV)
+# ============================================================================
+
+def _ingesta_rapida(tmp_path, partition_by=None, chunk_size=None):
+    with IngestionPlan(None, str(tmp_path / "sales.csv"), str(tmp_path / "inventory.csv"),
+                       str(tmp_path / "processed"), chunk_size=chunk_size, partition_by=partition_by,
+                       fast_path=True) as plan:
+        sales, inventory = plan.load_sales(lambda: None), plan.load_inventory()
+        plan.finish(sales, inventory)
+    return sales, inventory
+
+
+@pytest.mark.parametrize("partition_by, chunk_size", [(None, None), (None, 300), (["year", "month"], 300)])
+def test_ruta_rapida_reutiliza_parquet_vigente_con_los_mismos_tipos(tmp_path, monkeypatch, partition_by, chunk_size):
+    _, sales, inventory = datos_generados(n_sales=1000)
+    sales.assign(canal="web").to_csv(tmp_path / "sales.csv", index=False)
+    inventory.to_csv(tmp_path / "inventory.csv", index=False)
+    parseos = []
+    read_csv = pd.read_csv
+    monkeypatch.setattr(pd, "read_csv", lambda *a, **k: parseos.append(a[0]) or read_csv(*a, **k))
+
+    frio = _ingesta_rapida(tmp_path, partition_by, chunk_size)
+    assert parseos
+    parseos.clear()
+    tibio = _ingesta_rapida(tmp_path, partition_by, chunk_size)
+    assert parseos == []
+    # Mismas columnas (las que usa transform_data) y mismos tipos en los dos caminos
+    for df_frio, df_tibio in zip(frio, tibio):
+        pd.testing.assert_frame_equal(df_frio.reset_index(drop=True), df_tibio.reset_index(drop=True))
+    assert "canal" not in tibio[0].columns
+
+    # Si cambia el CSV solo se vuelve a ingerir esa fuente
+    sales.iloc[:10].to_csv(tmp_path / "sales.csv", mode="a", header=False, index=False)
+    ventas, _ = _ingesta_rapida(tmp_path, partition_by, chunk_size)
+    assert len(ventas) == len(sales) + 10
+    assert str(tmp_path / "inventory.csv") not in parseos and parseos
+
+    # Si cambia el layout del dataset (partition_by), también
+    parseos.clear()
+    _ingesta_rapida(tmp_path, ["year"] if partition_by is None else None, chunk_size)
+    assert str(tmp_path / "sales.csv") in parseos
@@ -0,0 +1,67 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from helpers import datos_generados
+from src.instrumentation import StageMetrics, inherit, step
+from src.tansformation import transform_data
+
+
+# ============================================================
+# INSTRUMENTACIÓN POR ETAPA
+# ============================================================
+
+def test_metricas_por_etapa_en_json_lines(tmp_path):
+    metrics_file = tmp_path / "metrics.jsonl"
+    with StageMetrics(str(metrics_file), trace_memory=True, profile_stages=["transformacion"],
+                      profile_dir=str(tmp_path)) as metrics:
+        with metrics.stage("transformacion", rows_in=5000) as stage:
+            stage["rows_out"] = len(transform_data(*datos_generados())["merged"])
+
+    registros = [json.loads(line) for line in metrics_file.read_text(encoding="utf-8").splitlines()]
+    por_etapa = {r["stage"]: r for r in registros}
+    assert por_etapa["merge_sales_inventory"]["parent"] == "transformacion"
+    assert por_etapa["merge_sales_inventory"]["rows_in"] == 5000
+    assert por_etapa["transformacion"]["tracemalloc_peak_mb"] >= por_etapa["merge_api"]["tracemalloc_peak_mb"]
+    assert os.path.exists(por_etapa["transformacion"]["profile"])
+    # Sin registrador activo, step no registra nada
+    with step("suelto") as record:
+        assert record == {}
+
+
+def test_metricas_de_etapas_en_paralelo_no_mezclan_el_proceso():
+    barrier = threading.Barrier(2)
+
+    def etapa(name):
+        with step(name):
+            barrier.wait(timeout=5)
+            sum(range(200_000))
+
+    def auxiliar():
+        with step("auxiliar"):
+            return [bytes(1024) for _ in range(1000)]
+
+    with StageMetrics(metrics_file=None, trace_memory=True, rss_interval=0.01) as metrics:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(etapa, ["a", "b"]))
+        with metrics.stage("serie"):
+            bloque = [bytes(1024) for _ in range(2000)]
+            # Un sub-paso en un hilo auxiliar cuelga de la etapa sin volverla concurrente
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                executor.submit(inherit(auxiliar)).result()
+            del bloque
+
+    por_etapa = {r["stage"]: r for r in metrics.records}
+    for name in ("a", "b"):
+        assert por_etapa[name]["concurrent"]
+        assert por_etapa[name]["process_cpu_s"] is None
+        assert por_etapa[name]["tracemalloc_peak_mb"] is None
+        assert por_etapa[name]["cpu_s"] <= por_etapa[name]["wall_s"] + 0.05
+    serie = por_etapa["serie"]
+    assert not serie["concurrent"] and serie["process_cpu_s"] >= 0
+    assert por_etapa["auxiliar"]["parent"] == "serie" and not por_etapa["auxiliar"]["concurrent"]
+    assert serie["tracemalloc_peak_mb"] >= por_etapa["auxiliar"]["tracemalloc_peak_mb"] > 0
+    # RSS muestreada durante la etapa, aparte del pico de toda la vida del proceso
+    assert serie["rss_peak_mb"] > 0 and serie["rss_delta_mb"] is not None
+    assert serie["process_rss_peak_mb"] > 0
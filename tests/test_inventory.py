@@ -0,0 +1,27 @@
+import pandas as pd
+import pytest
+
+from src.inventory import critical_stock_from_inventory
+
+
+# ============================================================================
+# STOCK CRÍTICO SOLO CON INVENTARIO
+# ============================================================================
+
+def test_stock_critico_por_inventario_con_umbral():
+    inventario = pd.DataFrame({
+        "product_id": [1, 2, 3, 3, 4, 5],
+        "current_stock": pd.array([10, 5, 11, 0, None, 2], dtype="Int64"),
+        "min_stock": [5, 10, 10, 10, 3, 2],
+    })
+    catalogo = pd.DataFrame({"id": [1, 2, 3], "title": ["A", "B", "C"], "category": ["x", "y", "z"]})
+
+    # Con umbral 1.0 solo el producto 2 (el 3 aparece dos veces: cuenta la primera fila)
+    assert critical_stock_from_inventory(inventario, catalogo)["product_id"].tolist() == [2]
+
+    criticos = critical_stock_from_inventory(inventario, catalogo, threshold=1.2)
+    # El producto 5 no tiene catálogo ni ventas, pero se alerta igual; orden por cobertura
+    assert criticos["product_id"].tolist() == [2, 5, 3]
+    assert criticos["title"].tolist()[:1] == ["B"] and pd.isna(criticos.loc[1, "title"])
+    assert criticos["deficit"].tolist() == [5, 0, -1]
+    assert criticos["umbral"].tolist() == pytest.approx([12.0, 2.4, 12.0])
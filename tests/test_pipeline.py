@@ -1,4 +1,17 @@
+import os
+import subprocess
+import sys
+
 import pandas as pd
+import yaml
+
+from src.config import (
+    ENGINES, EXPORT_FORMATS as CONFIG_EXPORT_FORMATS, RULE_TYPES as CONFIG_RULE_TYPES, validate_config
+)
+from src.engines import TRANSFORM_ENGINES
+from src.exports import EXPORT_FORMATS
+from src.quality_checks import RULE_TYPES
+
 
 def run_quality_checks(df: pd.DataFrame):
 
@@ -49,3 +62,63 @@ def run_quality_checks(df: pd.DataFrame):
                 print(f"   {test}")
 
     return passed, tests
+
+
+# ============================================================================
+# CLI E IMPORTACIONES DIFERIDAS
+# ============================================================================
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_cli_ligera_no_importa_dependencias_pesadas(tmp_path):
+    config = tmp_path / "config.yaml"
+    config.write_text(yaml.safe_dump({
+        "api": {"url": "http://localhost/products"},
+        "data_sources": {"sales_file": "sales.csv", "inventory_file": "inventory.csv"},
+        "processing": {"output_path": "processed"},
+    }), encoding="utf-8")
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "from src.cli import main\n"
+        f"code = main(['validate-config', '--config', {str(config)!r}])\n"
+        "elapsed = time.perf_counter() - start\n"
+        "import src.orchestador\n"
+        "heavy = sorted(m for m in ('pandas', 'numpy', 'pyarrow', 'requests') if m in sys.modules)\n"
+        "print(code, round(elapsed, 4), ','.join(heavy))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", script], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    code, elapsed, heavy = (out.stdout.strip().splitlines()[-1].split(" ") + [""])[:3]
+    assert code == "0"
+    assert heavy == ""
+    # Presupuesto de arranque para los subcomandos ligeros (sin contar el intérprete)
+    assert float(elapsed) < 0.1
+
+
+def test_validacion_de_configuracion():
+    assert set(ENGINES) == set(TRANSFORM_ENGINES)
+    assert set(CONFIG_EXPORT_FORMATS) == set(EXPORT_FORMATS)
+    assert set(CONFIG_RULE_TYPES) == set(RULE_TYPES)
+
+    with open(os.path.join(REPO_ROOT, "config", "pipeline_config.yaml"), encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    errors, _ = validate_config(config)
+    assert errors == []
+    # Las opciones que cambian la salida vienen desactivadas en la configuración de ejemplo
+    proc_cfg = config["processing"]
+    assert not any(proc_cfg.get(k) for k in ("incremental", "partition_by", "parallel_ingestion",
+                                             "parquet_fast_path", "optimize_dtypes"))
+    assert not config["output"].get("html_report") and not config["timeseries"].get("enabled")
+    assert not config["dag"].get("checkpoints")
+    assert config["output"]["exports"]["datos_procesados"]["format"] == "csv"
+
+    errors, warnings = validate_config({
+        "api": {"url": "x", "timeout": 0},
+        "data_sources": {"sales_file": "no_existe.csv"},
+        "processing": {"output_path": "p", "engine": "spark"},
+        "output": {"exports": {"top_productos": {"format": "xlsx"}}},
+        "batch": {"shards": [{"name": "a", "sales_file": "s", "inventory_file": "i"}, {"name": "a"}]},
+    })
+    assert len(errors) == 7
+    assert warnings == [" data_sources.sales_file: no existe no_existe.csv"]
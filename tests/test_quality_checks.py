@@ -0,0 +1,53 @@
+import pytest
+
+from helpers import datos_generados
+from src import quality_checks
+
+
+# ============================================================
+# MOTOR DE REGLAS DE CALIDAD
+# ============================================================
+
+def test_reglas_de_calidad_cuentan_filas_y_claves():
+    api, sales, inventory = datos_generados()
+    sales.loc[[3, 10], "sale_date"] = "2024-13-45"
+    sales.loc[20, "product_id"] = 999
+    merged = sales.merge(inventory, on="product_id", how="left").merge(
+        api.rename(columns={"id": "product_id"}), on="product_id", how="inner"
+    )
+    merged.loc[merged.index[:4], "price"] = -1.0
+
+    passed, tests = quality_checks.run_quality_checks(
+        merged,
+        {"rules": [{"name": "cantidad_positiva", "type": "range", "table": "sales", "column": "quantity", "min": 1}]},
+        sales=sales, catalogue=api, inventory=inventory,
+    )
+
+    assert not passed
+    assert tests["fechas_validas"]["failed_rows"] == 2
+    assert tests["fechas_validas"]["sample"] == sales.loc[[3, 10], "product_id"].tolist()
+    assert tests["precios_no_negativos"]["failed_rows"] == 4
+    assert tests["ventas_con_producto_en_catalogo"]["failed_rows"] == (~sales["product_id"].isin(api["id"])).sum()
+    assert tests["stock_valido"]["failed_rows"] == merged["current_stock"].isna().sum()
+    assert tests["producto_unico_en_catalogo"]["passed"]
+    assert tests["cantidad_positiva"]["passed"]
+    assert tests["columnas_requeridas"]["passed"]
+
+
+@pytest.mark.parametrize("dtype", [object, "category"])
+def test_regla_de_fechas_admite_fechas_con_y_sin_hora(dtype):
+    api, sales, inventory = datos_generados()
+    # La primera fecha sin hora no debe fijar el formato de las demás
+    sales["sale_date"] = sales["sale_date"].where(sales.index % 50 != 1, sales["sale_date"] + " 10:30:00")
+    sales.loc[7, "sale_date"] = "no-es-fecha"
+    sales["sale_date"] = sales["sale_date"].astype(dtype)
+
+    _, tests = quality_checks.run_quality_checks(
+        sales.merge(api.rename(columns={"id": "product_id"}), on="product_id"),
+        {"rules": [{"name": "fecha_es_fecha", "type": "dtype", "table": "sales", "column": "sale_date",
+                    "dtype": "datetime"}]},
+        sales=sales, catalogue=api, inventory=inventory,
+    )
+
+    assert tests["fechas_validas"]["failed_rows"] == 1
+    assert tests["fecha_es_fecha"]["failed_rows"] == 1
@@ -0,0 +1,138 @@
+import json
+import os
+import re
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from helpers import datos_generados
+from src import history
+from src.exports import export_frame
+from src.reporting import generate_html_report, generate_report, summary_stats
+from src.synthetic import generate_dataset
+from src.tansformation import transform_data
+from src.timeseries import build_timeseries
+
+
+# ============================================================
+# REPORTE DE TEXTO
+# ============================================================
+
+def test_reporte_limita_filas_por_seccion(tmp_path):
+    api, sales, inventory = generate_dataset(20_000, n_products=500, seed=5)
+    resultados = transform_data(api, sales, inventory)
+    tests = {"precios_no_negativos": {"passed": True, "failed_rows": 0, "sample": [], "detail": ""}}
+
+    reporte = open(generate_report(resultados, tests, str(tmp_path), max_rows=3), encoding="utf-8").read()
+
+    seccion = reporte.split("3. ALERTA")[1].split("4. TOP")[0]
+    filas = [l for l in seccion.splitlines() if l.endswith(tuple("0123456789")) and not l.startswith("  ")]
+    assert len(filas) == 3
+    assert f"... y {len(resultados['stock_critico']) - 3:,} más" in seccion
+    assert "Total de unidades vendidas: " + f"{sales['quantity'].sum():,.0f}" in reporte
+
+
+def test_reporte_numera_las_secciones_sin_huecos(tmp_path):
+    api, sales, inventory = generate_dataset(2_000, n_products=50, seed=5)
+    resultados = {**transform_data(api, sales, inventory), **build_timeseries(api, sales, inventory)}
+    tests = {"precios_no_negativos": {"passed": True, "failed_rows": 0, "sample": [], "detail": ""}}
+
+    # Sin historial ni tiendas: la sección de velocidad sigue a la de rentabilidad
+    reporte = open(generate_report(resultados, tests, str(tmp_path), exports={
+        name: {"enabled": False} for name in ("datos_procesados", "velocidad_productos", "ventas_diarias_categoria")
+    }), encoding="utf-8").read()
+    numeros = [int(n) for n in re.findall(r"^(\d+)\. ", reporte, flags=re.MULTILINE)]
+    assert numeros == list(range(1, len(numeros) + 1))
+    assert "7. VELOCIDAD DE VENTAS Y DÍAS DE STOCK" in reporte
+
+
+def test_pie_del_reporte_lista_solo_archivos_escritos(tmp_path):
+    api, sales, inventory = generate_dataset(2_000, n_products=50, seed=5)
+    resultados = {**transform_data(api, sales, inventory), **build_timeseries(api, sales, inventory)}
+    tests = {"precios_no_negativos": {"passed": True, "failed_rows": 0, "sample": [], "detail": ""}}
+
+    reporte = open(generate_report(resultados, tests, str(tmp_path), exports={
+        name: {"enabled": False} for name in ("stock_critico", "velocidad_productos")
+    }), encoding="utf-8").read()
+    pie = reporte.split("Archivos exportados:")[1]
+    rutas = [l.split(": ", 1)[1] for l in pie.splitlines() if l.startswith("  - ")]
+    assert "Stock crítico" not in pie and "Velocidad de ventas" not in pie
+    assert "Top productos" in pie and "Ventas por categoría" in pie
+    assert all(os.path.exists(ruta) for ruta in rutas)
+
+
+@pytest.mark.parametrize("formato", ["csv.gz", "csv.zst", "parquet"])
+def test_exportaciones_configurables(tmp_path, formato):
+    resultados = transform_data(*generate_dataset(5_000, n_products=100, seed=9))
+    tests = {"precios_no_negativos": {"passed": True, "failed_rows": 0, "sample": [], "detail": ""}}
+    exports = {"top_productos": {"format": formato}, "datos_procesados": {"enabled": False}}
+
+    generate_report(resultados, tests, str(tmp_path), exports=exports, export_workers=2)
+
+    (ruta,) = tmp_path.glob(f"top_productos_*.{formato}")
+    if formato == "parquet":
+        leido = pd.read_parquet(ruta)
+    else:
+        codec = {"csv.gz": "gzip", "csv.zst": "zstd"}[formato]
+        leido = pd.read_csv(pa.CompressedInputStream(str(ruta), codec), encoding="utf-8-sig")
+    pd.testing.assert_frame_equal(leido, resultados["top_productos"], check_dtype=False)
+    assert not list(tmp_path.glob("datos_procesados_*"))
+    assert list(tmp_path.glob("ventas_categoria_*.csv"))
+
+
+def test_exportacion_parquet_por_bloques(tmp_path, monkeypatch):
+    merged = transform_data(*datos_generados())["merged"]
+    escritas = []
+    write_table = pq.ParquetWriter.write_table
+    monkeypatch.setattr(pq.ParquetWriter, "write_table",
+                        lambda self, table, *a, **k: escritas.append(table.num_rows) or write_table(self, table, *a, **k))
+
+    ruta = export_frame(merged, str(tmp_path / "datos.parquet"), "parquet", chunk_size=1000)
+
+    # Nunca se escribe (ni se convierte a Arrow) el frame completo de una vez: un row group por bloque
+    assert max(escritas) == 1000 and sum(escritas) == len(merged)
+    assert pq.ParquetFile(ruta).metadata.num_row_groups == -(-len(merged) // 1000)
+    pd.testing.assert_frame_equal(pd.read_parquet(ruta), merged.reset_index(drop=True))
+
+
+def test_reporte_html_incrusta_tablas_columnares(tmp_path):
+    api, sales, inventory = generate_dataset(5_000, n_products=100, seed=11)
+    api.loc[0, "title"] = "</script><b>x</b>"
+    resultados = transform_data(api, sales, inventory)
+    tests = {"fechas_validas": {"passed": False, "failed_rows": 1, "sample": [3], "detail": "1 de 5000 filas"}}
+
+    html = open(generate_html_report(resultados, tests, str(tmp_path)), encoding="utf-8").read()
+
+    assert html.count("</script>") == 2
+    datos = json.loads(re.search(r'type="application/json">(.*?)</script>', html, re.S).group(1))
+    tablas = {t["title"]: t for t in datos["tables"]}
+    top = tablas["Top productos más vendidos"]
+    assert top["columns"] == list(resultados["top_productos"].columns)
+    assert top["data"]["total_vendido"] == resultados["top_productos"]["total_vendido"].tolist()
+    assert len(tablas["Rentabilidad por producto"]["data"]["product_id"]) == len(resultados["agregados_producto"])
+    assert datos["tests"][0]["name"] == "fechas_validas" and not datos["tests"][0]["passed"]
+
+
+def test_historial_calcula_cambios_entre_ejecuciones(tmp_path):
+    db = str(tmp_path / "historial.sqlite")
+    tests = {"precios_no_negativos": {"passed": True, "failed_rows": 0, "sample": [], "detail": ""}}
+    ejecuciones = {}
+    for run_id, n_sales in (("20240101_000000", 4_000), ("20240102_000000", 6_000)):
+        resultados = transform_data(*generate_dataset(n_sales, n_products=50, seed=1))
+        history.record_run(db, run_id, summary_stats(resultados["merged"], n_sales), resultados, tests)
+        ejecuciones[run_id] = resultados
+
+    assert history.previous_run_id(db, "20240102_000000") == "20240101_000000"
+    assert history.previous_run_id(db, "20240101_000000") is None
+
+    deltas = history.category_deltas(db, "20240102_000000", "20240101_000000").set_index("category")
+    antes = ejecuciones["20240101_000000"]["ventas_categoria"].set_index("category")["unidades_vendidas"]
+    ahora = ejecuciones["20240102_000000"]["ventas_categoria"].set_index("category")["unidades_vendidas"]
+    pd.testing.assert_series_equal(deltas["delta_unidades"].sort_index(), (ahora - antes).astype(float).sort_index(),
+                                   check_names=False)
+
+    top = history.top_product_deltas(db, "20240102_000000", "20240101_000000", limit=5)
+    assert top["rank"].tolist() == [1, 2, 3, 4, 5]
+    assert top["product_id"].tolist() == ejecuciones["20240102_000000"]["top_productos"]["product_id"].head(5).tolist()
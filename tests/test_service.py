@@ -0,0 +1,65 @@
+import asyncio
+import http.client
+import json
+import threading
+
+import pandas as pd
+import yaml
+
+from helpers import datos_generados
+from src.service import PipelineService
+from src.tansformation import transform_data
+
+
+# ============================================================================
+# MODO SERVICIO (API HTTP LOCAL)
+# ============================================================================
+
+def test_servicio_sirve_agregados_y_lanza_ejecuciones(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pd.DataFrame({"product_id": [1, 2], "current_stock": [1, 50], "min_stock": [5, 5]}).to_csv(
+        "inventory.csv", index=False)
+    config = {
+        "data_sources": {"inventory_file": "inventory.csv"},
+        "processing": {"output_path": "processed", "critical_stock_threshold": 1.0},
+        "output": {"reports_path": "reports"},
+        "instrumentation": {"enabled": False},
+        "service": {"port": 0, "run_on_start": False},
+    }
+    (tmp_path / "config.yaml").write_text(yaml.safe_dump(config), encoding="utf-8")
+
+    service = PipelineService("config.yaml")
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    asyncio.run_coroutine_threadsafe(service.start(), loop).result(timeout=10)
+
+    conn = http.client.HTTPConnection("127.0.0.1", service.port, timeout=10)
+
+    def call(method, path):
+        conn.request(method, path)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+
+    try:
+        assert call("GET", "/health")[0] == 200
+        assert call("GET", "/top-productos")[0] == 503
+        assert call("GET", "/nada")[0] == 404
+        assert call("POST", "/runs?mode=otro")[0] == 400
+
+        api, sales, inventory = datos_generados(n_products=20, n_sales=300)
+        service.update_views(transform_data(api, sales, inventory))
+        status, body = call("GET", "/top-productos?limit=3")
+        assert status == 200 and len(body["data"]) == 3 and body["total"] > 3
+        assert set(body["data"][0]) == {"product_id", "title", "total_vendido"}
+
+        # Ejecución solo de inventario lanzada por la API; el inventario queda en memoria
+        assert call("POST", "/runs?mode=inventory")[0] == 202
+        asyncio.run_coroutine_threadsafe(asyncio.wait_for(asyncio.shield(service._run_task), 30), loop).result()
+        status, body = call("GET", "/stock-critico")
+        assert status == 200 and [r["product_id"] for r in body["data"]] == [1]
+        assert call("GET", "/status")[1]["state"] == "idle"
+        assert "inventory" in service.pipeline.dimensions
+    finally:
+        conn.close()
+        asyncio.run_coroutine_threadsafe(service.stop(), loop).result(timeout=10)
+        loop.call_soon_threadsafe(loop.stop)
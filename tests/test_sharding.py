@@ -0,0 +1,42 @@
+import pandas as pd
+
+from src.sharding import merge_shard_results, merge_tests, process_shard
+from src.synthetic import generate_dataset, write_dataset
+from src.tansformation import transform_data
+
+
+# ============================================================================
+# MODO POR LOTES (SHARDS POR TIENDA)
+# ============================================================================
+
+def test_fusion_de_shards_equivale_a_procesar_todo_junto(tmp_path):
+    api, sales, inventory = generate_dataset(9_000, n_products=60, seed=11)
+    shards = []
+    for i, nombre in enumerate(["norte", "sur", "centro"]):
+        paths = write_dataset(str(tmp_path / nombre), api, sales.iloc[i::3], inventory)
+        shards.append({"name": nombre, "sales_file": paths["sales"], "inventory_file": paths["inventory"]})
+
+    config = {"processing": {"output_path": str(tmp_path / "processed")}}
+    parciales = [process_shard(config, shard, api) for shard in shards]
+    assert all(len(p["agregados_producto"]) <= 60 for p in parciales)
+
+    global_ = merge_shard_results(parciales)
+    referencia = transform_data(api.copy(), sales.copy(), inventory.copy())
+
+    assert global_["registros"] == len(sales)
+    pd.testing.assert_frame_equal(
+        global_["top_productos"][["product_id", "total_vendido"]].astype("int64"),
+        referencia["top_productos"][["product_id", "total_vendido"]].astype("int64"),
+    )
+    pd.testing.assert_series_equal(
+        global_["ventas_categoria"].set_index("category")["ventas_totales"].sort_index(),
+        referencia["ventas_categoria"].set_index("category")["ventas_totales"].sort_index(),
+    )
+    assert set(global_["stock_critico"]["tienda"]) <= {"norte", "sur", "centro"}
+    assert global_["tiendas"]["registros"].sum() == len(sales)
+
+    tests = merge_tests([
+        {"name": "norte", "tests": {"t": {"passed": False, "failed_rows": 2, "sample": [1, 2], "detail": "2 filas"}}},
+        {"name": "sur", "tests": {"t": {"passed": True, "failed_rows": 0, "sample": [], "detail": ""}}},
+    ])
+    assert tests["t"] == {"passed": False, "failed_rows": 2, "sample": [1, 2], "detail": "norte: 2 filas"}
@@ -0,0 +1,78 @@
+import json
+import os
+
+import pandas as pd
+import yaml
+
+from helpers import datos_generados
+from src.orchestador import EcommerceDataPipeline
+from src.stage_cache import StageCache, stage_key
+from src.synthetic import generate_dataset
+from src.tansformation import transform_data
+
+
+# ============================================================================
+# CACHÉ DE ETAPAS
+# ============================================================================
+
+def test_cache_de_etapas_por_contenido_y_lru(tmp_path):
+    api, sales, inventory = generate_dataset(3_000, n_products=40, seed=3)
+    clave = stage_key("transformacion", (api, sales, inventory), {"engine": "pandas"}, "v1")
+    assert clave == stage_key("transformacion", (api.copy(), sales.copy(), inventory.copy()), {"engine": "pandas"}, "v1")
+    assert clave != stage_key("transformacion", (api, sales, inventory), {"engine": "polars"}, "v1")
+    assert clave != stage_key("transformacion", (api, sales, inventory), {"engine": "pandas"}, "v2")
+    assert clave != stage_key("transformacion", (api, sales.head(-1), inventory), {"engine": "pandas"}, "v1")
+
+    cache = StageCache(str(tmp_path / "cache"))
+    assert cache.get(clave) is None
+    resultados = transform_data(api, sales, inventory)
+    cache.put(clave, {**resultados, "passed": True})
+    restaurado = cache.get(clave)
+    assert restaurado["passed"] is True
+    pd.testing.assert_frame_equal(restaurado["top_productos"], resultados["top_productos"])
+
+    # Con un límite de entrada y media solo sobrevive la entrada más reciente
+    pequena = StageCache(str(tmp_path / "pequena"))
+    for i in range(3):
+        if i == 1:
+            pequena.max_bytes = int(pequena._entries()[0][1] * 1.5)
+        pequena.put(f"k{i}", {"datos": sales.head(2_000)})
+        os.utime(os.path.join(pequena.cache_dir, f"k{i}"), (i, i))
+    assert pequena.get("k2") is not None
+    assert pequena.get("k0") is None and pequena.get("k1") is None
+
+
+def test_cache_acierta_en_la_primera_ejecucion_repetida(tmp_path, monkeypatch, stub_api):
+    monkeypatch.chdir(tmp_path)
+    _, sales, inventory = datos_generados(n_products=5, n_sales=400)
+    sales.to_csv("sales.csv", index=False)
+    inventory.to_csv("inventory.csv", index=False)
+    config = {
+        "api": {"url": stub_api[0], "cache_dir": "http_cache"},
+        "data_sources": {"sales_file": "sales.csv", "inventory_file": "inventory.csv"},
+        "processing": {"output_path": "processed", "chunk_size": 100, "parquet_fast_path": True},
+        "output": {"reports_path": "reports"},
+        "cache": {"enabled": True, "path": "stage_cache"},
+        "instrumentation": {"metrics_file": "metrics.jsonl"},
+    }
+    (tmp_path / "config.yaml").write_text(yaml.safe_dump(config), encoding="utf-8")
+
+    def ejecutar():
+        inicio = len(open("metrics.jsonl").readlines()) if os.path.exists("metrics.jsonl") else 0
+        resultados = EcommerceDataPipeline("config.yaml").run_pipeline()["results"]
+        registros = [json.loads(line) for line in open("metrics.jsonl").readlines()[inicio:]]
+        return resultados, {r["stage"]: r.get("cache") for r in registros if r["parent"] is None}
+
+    frio, cache = ejecutar()
+    assert cache["transformacion"] == "miss"
+    # La segunda ejecución (ruta rápida incluida) acierta en ingesta, transformación y calidad
+    tibio, cache = ejecutar()
+    etapas = ("ingesta_api", "ingesta_sales", "ingesta_inventory", "transformacion", "calidad")
+    assert [cache[etapa] for etapa in etapas] == ["hit"] * len(etapas)
+    pd.testing.assert_frame_equal(tibio["top_productos"], frio["top_productos"])
+
+    # Si cambia una fuente, solo fallan su ingesta y las etapas que dependen de ella
+    sales.iloc[:10].to_csv("sales.csv", mode="a", header=False, index=False)
+    _, cache = ejecutar()
+    assert cache["ingesta_sales"] == cache["transformacion"] == "miss"
+    assert cache["ingesta_inventory"] == cache["ingesta_api"] == "hit"
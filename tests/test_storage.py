@@ -0,0 +1,61 @@
+import datetime
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from src.storage import read_sales, write_sales_dataset
+
+
+# ============================================================
+# DATASET DE VENTAS PARTICIONADO (PUSHDOWN Y PODA)
+# ============================================================
+
+def _ventas_por_mes(tmp_path):
+    """Ventas de enero a abril con fechas con hora y sin ceros a la izquierda, particionadas por año y mes."""
+    sales = pd.DataFrame({
+        "product_id": [1, 2, 3, 1, 2, 3, 1],
+        "quantity": [1, 2, 3, 4, 5, 6, 7],
+        "sale_date": ["2024-01-15", "2024-02-01", "2024-3-5", "2024-03-31 23:00:00", "2024-03-10",
+                      "2024-04-01", "2024-02-29 08:15:00"],
+    })
+    dataset = tmp_path / "sales"
+    written = write_sales_dataset(sales, str(dataset), ["year", "month"], "part-0")
+    return sales, dataset, written
+
+
+def test_dataset_particionado_escribe_una_carpeta_por_mes(tmp_path):
+    sales, dataset, written = _ventas_por_mes(tmp_path)
+
+    assert sorted(os.path.relpath(os.path.dirname(p), dataset) for p in written) == [
+        os.path.join("year=2024", f"month={m}") for m in (1, 2, 3, 4)
+    ]
+    leido = read_sales(str(dataset)).sort_values("quantity", ignore_index=True)
+    pd.testing.assert_frame_equal(leido, sales, check_dtype=False)
+
+
+def test_lectura_de_ventas_poda_particiones_y_compara_fechas(tmp_path):
+    sales, dataset, written = _ventas_por_mes(tmp_path)
+    # Un archivo ilegible en abril: si el rango no podara esa partición, la lectura fallaría
+    abril = next(p for p in written if "month=4" in p)
+    with open(abril, "wb") as f:
+        f.write(b"no es parquet")
+    with pytest.raises(pa.ArrowInvalid):
+        read_sales(str(dataset))
+
+    leido = read_sales(str(dataset), start_date="2024-02-01", end_date="2024-03-31")
+    # Extremos inclusivos aunque tengan hora, y "2024-3-5" se compara como fecha (no como texto)
+    assert sorted(leido["quantity"]) == [2, 3, 4, 5, 7]
+    leido = read_sales(str(dataset), start_date=pd.Timestamp("2024-01-01"), end_date=datetime.date(2024, 3, 5),
+                       product_ids=[1, 3], columns=["product_id", "quantity"])
+    assert list(leido.columns) == ["product_id", "quantity"]
+    assert sorted(leido["quantity"]) == [1, 3, 7]
+
+
+@pytest.mark.parametrize("start_date, end_date", [(20240301, None), ("no-es-fecha", None),
+                                                  ("2024-04-01", "2024-03-01")])
+def test_lectura_de_ventas_valida_los_limites_de_fecha(tmp_path, start_date, end_date):
+    _, dataset, _ = _ventas_por_mes(tmp_path)
+    with pytest.raises(ValueError):
+        read_sales(str(dataset), start_date=start_date, end_date=end_date)
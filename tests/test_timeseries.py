@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+
+from helpers import datos_generados
+from src.timeseries import build_timeseries, daily_product_rollup, merge_daily, parse_sale_days
+
+
+# ============================================================================
+# SERIES TEMPORALES (ROLLUPS DIARIOS Y VELOCIDAD DE VENTAS)
+# ============================================================================
+
+def test_series_temporales_incrementales_y_dias_de_stock():
+    fechas = pd.Series(["2024-03-01", "2024-03-01 10:30:00", None, "no-es-fecha"], dtype="category")
+    dias = parse_sale_days(fechas)
+    assert dias.dtype == "datetime64[s]"
+    assert dias[:2].tolist() == [pd.Timestamp("2024-03-01")] * 2 and dias[2:].isna().all()
+
+    api, sales, inventory = datos_generados(n_products=20, n_sales=2000)
+    completo = daily_product_rollup(sales)
+    # Acumular por tramos (con un día solapado en el corte) da el mismo rollup que todo junto
+    corte = 1234
+    incremental = merge_daily(daily_product_rollup(sales.iloc[:corte]), daily_product_rollup(sales.iloc[corte:]))
+    pd.testing.assert_frame_equal(incremental, completo)
+    assert completo["quantity"].sum() == sales["quantity"].sum()
+    # Con ventas tardías el delta cae en días ya acumulados, no solo en el último
+    mezcla = sales.sample(frac=1, random_state=3)
+    tardio = merge_daily(daily_product_rollup(mezcla.iloc[:corte]), daily_product_rollup(mezcla.iloc[corte:]))
+    pd.testing.assert_frame_equal(tardio, completo)
+
+    resultado = build_timeseries(api, sales.iloc[corte:], inventory,
+                                 previous_daily=daily_product_rollup(sales.iloc[:corte]), windows=[30, 7])
+    velocidad = resultado["velocidad_productos"]
+    # La velocidad de 7 días es la suma de las unidades de los últimos 7 días naturales / 7
+    ultimo = completo["day"].max()
+    recientes = completo[completo["day"] > ultimo - pd.Timedelta(days=7)].groupby("product_id")["quantity"].sum()
+    fila = velocidad[velocidad["product_id"] == recientes.idxmax()].iloc[0]
+    assert fila["velocidad_7d"] == pytest.approx(recientes.max() / 7)
+    assert fila["dias_stock"] == pytest.approx(round(fila["current_stock"] / fila["velocidad_7d"], 1))
+    assert velocidad["dias_stock"].dropna().is_monotonic_increasing
+    assert set(velocidad["product_id"]) >= set(inventory["product_id"])
+    assert resultado["fecha_corte"] == ultimo.strftime("%Y-%m-%d")
+
+    # Por categoría: un día natural por fila (sin huecos) y mismas unidades totales con catálogo
+    por_categoria = resultado["ventas_diarias_categoria"]
+    assert por_categoria["day"].nunique() == (por_categoria["day"].max() - por_categoria["day"].min()).days + 1
+    con_catalogo = completo[completo["product_id"].isin(api["id"])]
+    assert por_categoria["quantity"].sum() == con_catalogo["quantity"].sum()
+    # Las entradas no se modifican (id sigue sin renombrar)
+    assert "id" in api.columns